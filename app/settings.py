@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files
+    'main_app.middleware.CacheMetricsMiddleware',  # Cache counters per view (/admin/cache-stats/)
     'django.middleware.gzip.GZipMiddleware',  # Compress responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -51,6 +52,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main_app.context_processors.code_highlighting',
             ],
             'builtins': [
                 'main_app.templatetags.custom_filters',
@@ -91,16 +93,93 @@ else:
     }
 
 # Cache Configuration
-CACHES = {
-    'default': {
+# The shared cache is file based, so all gunicorn workers on the box share
+# it. Entries depending on models are invalidated through generation counters
+# bumped by signals (see main_app/caching.py), not by short timeouts.
+if 'test' in sys.argv:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
         'OPTIONS': {
             'MAX_ENTRIES': 1000
         }
     }
+    GENERATION_STORE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'generations',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000
+        }
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("DJANGO_CACHE_DIR", "/tmp/szybkie-kursiki-cache"),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000
+        }
+    }
+    GENERATION_STORE = {
+        'BACKEND': 'main_app.cache_backends.CounterFileCache',
+        'LOCATION': os.getenv("DJANGO_GENERATION_DIR", "/tmp/szybkie-kursiki-generations"),
+    }
+
+# The default cache adds a per-worker LRU bounded by bytes in front of the
+# shared one (main_app/cache_backends.py). Only self-validating keys are kept
+# locally. Generation counters have their own store: the shared file cache
+# culls entries at random and its add() is not atomic, while losing a counter
+# would invalidate everything and workers must agree on its first value.
+CACHES = {
+    'default': {
+        'BACKEND': 'main_app.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'LOCAL_MAX_BYTES': int(os.getenv("DJANGO_LOCAL_CACHE_BYTES", 32 * 1024 * 1024)),
+            'LOCAL_KEYS': {
+                'page:': 60,
+                'stamp:': 60,
+                'card:': 300,
+                'highlight:': 300,
+                'lesson_section:': 300,
+                'home_stats': 60,
+                'quiz:': 60,
+            },
+        },
+    },
+    'shared': SHARED_CACHE,
+    'generations': GENERATION_STORE,
 }
 
+# Lifetime of values cached with caching.get_or_set; edits invalidate them sooner
+GENERATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Stale values cached with caching.get_or_refresh are recomputed in a
+# background thread; tests recompute them inline to stay deterministic
+CACHE_REFRESH_IN_BACKGROUND = 'test' not in sys.argv
+
+# Lock files making sure a single process refreshes a stale value (caching.try_lock)
+CACHE_LOCK_DIR = os.getenv("DJANGO_CACHE_LOCK_DIR", "/tmp/szybkie-kursiki-locks")
+
+# Home page statistics are recomputed after this long even without edits
+HOME_STATS_SOFT_TIMEOUT = 60 * 15
+
+# Whole pages served to anonymous visitors, purged on edits (main_app/page_cache.py)
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Unknown slugs answered with 404 without a query, dropped sooner when such an object is saved
+NEGATIVE_CACHE_TIMEOUT = 60 * 5
+
+# Rendered course/post/playlist/project cards, keyed by the object's updated_at
+CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Courses per page of the catalog (/courses/ and /api/courses/)
+COURSES_PAGE_SIZE = 12
+
+# Each worker publishes its cache counters this often (main_app/cache_metrics.py)
+CACHE_METRICS_FLUSH_INTERVAL = 10
+CACHE_METRICS_TIMEOUT = 60 * 60 * 24
+
 # Session optimization
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
@@ -145,6 +224,22 @@ MARKDOWN_EXTENSIONS = [
 
 PYGMENTS_STYLE = 'monokai'
 
+# Lessons whose rendered HTML is larger than this are delivered in sections:
+# the first LESSON_INITIAL_SECTIONS come with the page, the rest are fetched
+# from the section endpoint while the reader scrolls.
+LESSON_SECTION_THRESHOLD = int(os.getenv("LESSON_SECTION_THRESHOLD", 64 * 1024))
+LESSON_INITIAL_SECTIONS = int(os.getenv("LESSON_INITIAL_SECTIONS", 3))
+LESSON_SECTION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Code snippets are addressed by the hash of their content and never change
+CODE_SNIPPET_MAX_AGE = 60 * 60 * 24 * 365
+
+# 'monaco' boots the Monaco editor for every code block, 'static' highlights
+# blocks with Pygments on the server and loads Monaco only when a reader
+# makes a block editable.
+CODE_HIGHLIGHT_MODE = os.getenv("CODE_HIGHLIGHT_MODE", "monaco")
+CODE_HIGHLIGHT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
 JAZZMIN_SETTINGS = {
     "site_title": "Szybkie Kurski Admin",
     "site_header": "Szybkie Kurski",
@@ -3,8 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from main_app.admin import cache_stats_view
+
 
 urlpatterns = [
+    path("admin/cache-stats/", admin.site.admin_view(cache_stats_view), name="cache_stats"),
     path("admin/", admin.site.urls),
     path("", include("main_app.urls")),
 ]
@@ -35,6 +35,10 @@ docker compose -f docker-compose.production.yml exec -T web python manage.py mig
 echo "Collecting static files..."
 docker compose -f docker-compose.production.yml exec -T web python manage.py collectstatic --noinput
 
+# Fill the shared cache before visitors hit cold pages
+echo "Warming cache..."
+docker compose -f docker-compose.production.yml exec -T web python manage.py warm_cache --time-budget 120 || echo "Cache warming failed, continuing"
+
 # Clean up unused Docker resources
 echo "Cleaning up Docker resources..."
 docker system prune -f
@@ -1,9 +1,11 @@
 from django.contrib import admin
 from .models import Tag, Course, Lesson, LessonContent, Quiz, PracticalTask, Question, Answer, BlogPost, VideoPlaylist, Project
 from .forms import CourseForm
+from .caching import bump_generation, bump_tags
+from . import cache_metrics
 from django.utils.html import format_html
 from django import forms
-from django.db import models
+from django.db import models, transaction
 from django.shortcuts import render, redirect
 from django.urls import path
 from django.contrib import messages
@@ -262,8 +264,8 @@ class QuizAdmin(admin.ModelAdmin):
                     messages.error(request, 'Nieprawidłowy format XML. Element główny musi być <questions>.')
                     return render(request, 'admin/quiz_import_xml.html', {'quiz': quiz, 'xml_content': xml_content})
 
-                # Count questions to be imported
-                question_count = 0
+                # Parse everything first, then render and write the questions in one batch
+                pending = []
 
                 # Process each question
                 for question_elem in root.findall('question'):
@@ -282,41 +284,43 @@ class QuizAdmin(admin.ModelAdmin):
                     explanation_elem = question_elem.find('explanation')
                     explanation = explanation_elem.text.strip() if explanation_elem is not None and explanation_elem.text else ''
 
-                    # Create question
-                    question = Question.objects.create(
-                        quiz=quiz,
-                        text=text,
-                        order=order,
-                        explanation=explanation
-                    )
-
                     # Process answers
                     answers_elem = question_elem.find('answers')
                     if answers_elem is None:
                         messages.warning(request, f'Pytanie "{text[:50]}..." nie ma odpowiedzi.')
-                        question.delete()
                         continue
 
-                    answer_count = 0
-                    for answer_elem in answers_elem.findall('answer'):
-                        if answer_elem.text:
-                            answer_text = answer_elem.text.strip()
-                            is_correct = answer_elem.get('correct', 'false').lower() == 'true'
-                            answer_order = int(answer_elem.get('order', 0))
-
-                            Answer.objects.create(
-                                question=question,
-                                text=answer_text,
-                                is_correct=is_correct,
-                                order=answer_order
-                            )
-                            answer_count += 1
-
-                    if answer_count == 0:
+                    answers = [
+                        Answer(
+                            text=answer_elem.text.strip(),
+                            is_correct=answer_elem.get('correct', 'false').lower() == 'true',
+                            order=int(answer_elem.get('order', 0))
+                        )
+                        for answer_elem in answers_elem.findall('answer')
+                        if answer_elem.text
+                    ]
+
+                    if not answers:
                         messages.warning(request, f'Pytanie "{text[:50]}..." nie ma odpowiedzi. Pytanie zostało usunięte.')
-                        question.delete()
-                    else:
-                        question_count += 1
+                        continue
+
+                    question = Question(quiz=quiz, text=text, order=order, explanation=explanation)
+                    question.refresh_rendered_html()
+                    pending.append((question, answers))
+
+                with transaction.atomic():
+                    new_answers = []
+                    for question, answers in pending:
+                        question.save()
+                        for answer in answers:
+                            answer.question = question
+                        new_answers.extend(answers)
+                    Answer.objects.bulk_create(new_answers)
+                    # bulk_create sends no post_save signals
+                    bump_generation(Answer)
+                    bump_tags(f'quiz:{quiz.pk}')
+
+                question_count = len(pending)
 
                 if question_count > 0:
                     messages.success(request, f'Pomyślnie zaimportowano {question_count} pytań do quizu "{quiz.title}".')
@@ -561,6 +565,40 @@ class ProjectAdmin(admin.ModelAdmin):
     has_links.short_description = 'Linki'
 
 
+def cache_stats_view(request):
+    """Staff page with cache counters of all workers, per view and key prefix"""
+    stats = cache_metrics.merged()
+    views = []
+    for name, counters in sorted(stats['views'].items()):
+        prefixes = []
+        for prefix, c in sorted(counters['prefixes'].items()):
+            lookups = c.get('hits', 0) + c.get('misses', 0)
+            prefixes.append({
+                'name': prefix,
+                'hits': c.get('hits', 0),
+                'misses': c.get('misses', 0),
+                'hit_ratio': c.get('hits', 0) * 100 / lookups if lookups else None,
+                'sets': c.get('sets', 0),
+                'bytes': c.get('bytes', 0),
+                'avg_fill_ms': c['fill_ms'] / c['fills'] if c.get('fills') else None,
+                'fill_ms': c.get('fill_ms', 0),
+            })
+        views.append({
+            'name': name,
+            'requests': counters['requests'],
+            'avg_ms': counters['time_ms'] / counters['requests'] if counters['requests'] else None,
+            # Most expensive fills first, that is where caching pays off or not
+            'prefixes': sorted(prefixes, key=lambda p: -p['fill_ms']),
+        })
+    return render(request, 'admin/cache_stats.html', {
+        **admin.site.each_context(request),
+        'title': 'Statystyki cache',
+        'workers': stats['workers'],
+        'tiers': stats['tiers'],
+        'views': views,
+    })
+
+
 admin.site.register(Quiz, QuizAdmin)
 admin.site.register(Question, QuestionAdmin)
 admin.site.register(Lesson, LessonAdmin)
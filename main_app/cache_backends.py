@@ -0,0 +1,315 @@
+"""
+Cache backends: a two-tier cache with a small per-process LRU in front of
+the cache shared by all gunicorn workers, and a file store for generation
+counters that never loses them.
+
+The local tier is bounded by the pickled size of its values rather than by
+an entry count, so one huge lesson page cannot push out hundreds of small
+hot entries. Only keys with a prefix listed in ``LOCAL_KEYS`` are kept
+locally, each with its own short TTL. Those should be values that validate
+themselves (generation-checked entries, content digests, versioned keys).
+Writes and deletes always go to the shared tier, so locks and sessions
+behave as before.
+
+Every lookup and write is also reported to ``cache_metrics``.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import cache_metrics
+
+_MISSING = object()
+
+
+class LocalTier:
+    """Thread-safe LRU of pickled values bounded by their total size"""
+
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()  # key -> (expires, pickled)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counts = {'local_hits': 0, 'local_misses': 0, 'shared_hits': 0, 'shared_misses': 0}
+
+    def get(self, key, default=_MISSING):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.counts['local_misses'] += 1
+                return default
+            self.entries.move_to_end(key)
+            self.counts['local_hits'] += 1
+        return pickle.loads(entry[1])
+
+    def set(self, key, value, timeout):
+        """Stores the value and returns its pickled size"""
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self._remove(key)
+            if len(pickled) > self.max_entry_bytes:
+                return len(pickled)
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.size += len(pickled)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+        return len(pickled)
+
+    def delete(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counts,
+                'local_entries': len(self.entries),
+                'local_bytes': self.size,
+                'local_max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+# Backend instances are per thread, the local tier is per process
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    ``LOCATION`` is the alias of the shared cache. Options:
+
+    - ``LOCAL_KEYS``: ``{key prefix: local TTL in seconds}``
+    - ``LOCAL_MAX_BYTES``: size of the local tier (default 32 MB)
+    - ``LOCAL_MAX_ENTRY_BYTES``: larger values stay shared only
+      (default an eighth of the local tier)
+    - ``LOCAL_ONLY_MAX_BYTES``: size of a separate per-process LRU for
+      values never written to the shared cache (``set_local``, default 1 MB)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_keys = tuple(options.get('LOCAL_KEYS', {}).items())
+        max_bytes = options.get('LOCAL_MAX_BYTES', 32 * 1024 * 1024)
+        local_only_bytes = options.get('LOCAL_ONLY_MAX_BYTES', 1024 * 1024)
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = (
+                    LocalTier(max_bytes, options.get('LOCAL_MAX_ENTRY_BYTES', max_bytes // 8)),
+                    LocalTier(local_only_bytes, local_only_bytes // 64),
+                )
+            self.local, self.local_only = _tiers[location]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def local_timeout(self, key, timeout=DEFAULT_TIMEOUT):
+        """Local TTL of a key, 0 when it is not kept locally"""
+        for prefix, local_timeout in self.local_keys:
+            if key.startswith(prefix):
+                timeout = self.shared.get_backend_timeout(timeout)
+                return local_timeout if timeout is None else max(0, min(local_timeout, timeout - time.time()))
+        return 0
+
+    def stats(self):
+        """Hit and miss counts of both tiers in this process"""
+        return self.local.stats()
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        local_timeout = self.local_timeout(key)
+        if local_timeout:
+            value = self.local.get(local_key)
+            if value is not _MISSING:
+                cache_metrics.record_lookup(key, True)
+                return value
+
+        value = self.shared.get(key, _MISSING, version)
+        cache_metrics.record_lookup(key, value is not _MISSING)
+        if value is _MISSING:
+            self.local.count('shared_misses')
+            return default
+        self.local.count('shared_hits')
+        if local_timeout:
+            self.local.set(local_key, value, local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            value = self.local.get(self.make_and_validate_key(key, version)) if self.local_timeout(key) else _MISSING
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            fetched = self.shared.get_many(remote, version)
+            self.local.count('shared_hits', len(fetched))
+            self.local.count('shared_misses', len(remote) - len(fetched))
+            for key, value in fetched.items():
+                local_timeout = self.local_timeout(key)
+                if local_timeout:
+                    self.local.set(self.make_and_validate_key(key, version), value, local_timeout)
+            found.update(fetched)
+        for key in keys:
+            cache_metrics.record_lookup(key, key in found)
+        return found
+
+    def get_local(self, key, default=None, version=None):
+        return self.local_only.get(self.make_and_validate_key(key, version), default)
+
+    def set_local(self, key, value, timeout, version=None):
+        """
+        Keeps a value in this process only, in an LRU of its own: for cheap
+        values written at a rate the shared cache must not see, such as
+        cached 404s of made-up URLs, which would also evict hot entries
+        """
+        self.local_only.set(self.make_and_validate_key(key, version), value, timeout)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        cache_metrics.record_set(key, value, self._set_local(key, value, timeout, version))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                cache_metrics.record_set(key, value, self._set_local(key, value, timeout, version))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            cache_metrics.record_set(key, value, self._set_local(key, value, timeout, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.make_and_validate_key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version) is not _MISSING
+
+    def clear(self):
+        self.local.clear()
+        self.local_only.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def _set_local(self, key, value, timeout, version):
+        """Returns the pickled size when the value is kept locally, otherwise None"""
+        local_key = self.make_and_validate_key(key, version)
+        local_timeout = self.local_timeout(key, timeout)
+        if local_timeout:
+            return self.local.set(local_key, value, local_timeout)
+        self.local.delete(local_key)
+        return None
+
+
+class CounterFileCache(BaseCache):
+    """
+    Store for the generation counters shared by the workers of one box: a
+    file per key that is never culled and never expires (timeouts are
+    ignored). ``set()`` writes a temporary file and renames it over the key
+    and ``add()`` hard-links it to the key, which fails if the key exists,
+    so both are atomic across processes and readers never see a partial
+    value.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.directory = os.path.abspath(location)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, version):
+        key = self.make_and_validate_key(key, version)
+        return os.path.join(self.directory, hashlib.md5(key.encode('utf-8')).hexdigest() + '.counter')
+
+    def _write_temp(self, value):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return temp_path
+
+    def get(self, key, default=None, version=None):
+        try:
+            with open(self._path(key, version), 'rb') as f:
+                return pickle.loads(f.read())
+        except FileNotFoundError:
+            return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        os.replace(self._write_temp(value), self._path(key, version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        temp_path = self._write_temp(value)
+        try:
+            os.link(temp_path, self._path(key, version))
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(temp_path)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.has_key(key, version)
+
+    def delete(self, key, version=None):
+        try:
+            os.remove(self._path(key, version))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def has_key(self, key, version=None):
+        return os.path.exists(self._path(key, version))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.counter'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
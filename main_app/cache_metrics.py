@@ -0,0 +1,166 @@
+"""
+Cache hit/miss and fill-cost counters per view and key prefix.
+
+``TwoTierCache`` reports every lookup and write here and
+``CacheMetricsMiddleware`` tells which view is running and how long it
+took. The counters live in each worker process and are flushed into the
+shared cache every ``CACHE_METRICS_FLUSH_INTERVAL`` seconds; ``merged()``
+sums the snapshots of all workers.
+
+Written bytes are the pickled size of values kept in the local tier, which
+pickles them anyway, and an estimate for the others rather than pickling
+every value once more.
+
+The fill time of a key is the time between its miss and the following write
+of the same key in the same thread, i.e. what computing the value cost.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+KEY_PREFIX = 'cache_metrics:'
+WORKERS_KEY = f'{KEY_PREFIX}workers'
+
+# Lookups made outside of a request (commands, background refreshes)
+NO_VIEW = '-'
+
+_lock = threading.Lock()
+_state = threading.local()
+_views = {}  # view name -> {'requests': ..., 'time_ms': ..., 'prefixes': {prefix: Counter}}
+_last_flush = time.monotonic()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def key_prefix(key):
+    """Groups keys like ``page:pl:...`` or ``home_stats``; per-object keys without a colon go to ``other``"""
+    if ':' in key:
+        return key.split(':', 1)[0]
+    return key if len(key) <= 32 and key.replace('_', '').isalnum() else 'other'
+
+
+def _view_counters(view):
+    return _views.setdefault(view, {'requests': 0, 'time_ms': 0.0, 'prefixes': {}})
+
+
+def _count(key, **amounts):
+    view = getattr(_state, 'view', None) or NO_VIEW
+    with _lock:
+        _view_counters(view)['prefixes'].setdefault(key_prefix(key), Counter()).update(amounts)
+
+
+def record_lookup(key, hit):
+    if key.startswith(KEY_PREFIX):
+        return
+    if hit:
+        _count(key, hits=1)
+        return
+    _count(key, misses=1)
+    missed = getattr(_state, 'missed', None)
+    if missed is None or len(missed) > 1000:
+        missed = _state.missed = {}
+    missed[key] = time.perf_counter()
+
+
+def approximate_size(value, depth=0):
+    """Cheap stand-in for the pickled size: text and pages by length, containers summed"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, HttpResponse):
+        return len(value.content)
+    if depth < 3 and isinstance(value, (tuple, list)):
+        return sum(approximate_size(item, depth + 1) for item in value)
+    if depth < 3 and isinstance(value, dict):
+        return sum(approximate_size(k, depth + 1) + approximate_size(v, depth + 1) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+def record_set(key, value, size=None):
+    """``size`` is the pickled size when the caller has it, otherwise it is estimated"""
+    if key.startswith(KEY_PREFIX):
+        return
+    amounts = {'sets': 1, 'bytes': approximate_size(value) if size is None else size}
+    missed_at = getattr(_state, 'missed', {}).pop(key, None)
+    if missed_at is not None:
+        amounts['fills'] = 1
+        amounts['fill_ms'] = (time.perf_counter() - missed_at) * 1000
+    _count(key, **amounts)
+
+
+def start_request():
+    _state.view = None
+    _state.missed = {}
+
+
+def set_view(name):
+    _state.view = name
+
+
+def finish_request(elapsed):
+    view = getattr(_state, 'view', None) or NO_VIEW
+    with _lock:
+        counters = _view_counters(view)
+        counters['requests'] += 1
+        counters['time_ms'] += elapsed * 1000
+    _state.view = None
+    if time.monotonic() - _last_flush >= settings.CACHE_METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def snapshot():
+    """Counters of this process"""
+    with _lock:
+        views = {
+            view: {**counters, 'prefixes': {prefix: dict(c) for prefix, c in counters['prefixes'].items()}}
+            for view, counters in _views.items()
+        }
+    return {'views': views, 'tiers': cache.stats() if hasattr(cache, 'stats') else {}}
+
+
+def flush():
+    """Publishes this process' counters for ``merged()``"""
+    global _last_flush
+    _last_flush = time.monotonic()
+    worker = worker_id()
+    cache.set(f'{KEY_PREFIX}{worker}', snapshot(), settings.CACHE_METRICS_TIMEOUT)
+    # Racy read-modify-write: a worker lost here is re-added by its next flush
+    workers = cache.get(WORKERS_KEY) or {}
+    now = time.time()
+    workers = {w: seen for w, seen in workers.items() if now - seen < settings.CACHE_METRICS_TIMEOUT}
+    workers[worker] = now
+    cache.set(WORKERS_KEY, workers, settings.CACHE_METRICS_TIMEOUT)
+
+
+def _add(total, counters):
+    for name, value in counters.items():
+        if isinstance(value, dict):
+            _add(total.setdefault(name, {}), value)
+        else:
+            total[name] = total.get(name, 0) + value
+
+
+def merged():
+    """Sum of the last published counters of every worker"""
+    flush()
+    workers = sorted(cache.get(WORKERS_KEY) or {})
+    snapshots = cache.get_many([f'{KEY_PREFIX}{worker}' for worker in workers])
+    total = {'workers': len(snapshots), 'views': {}, 'tiers': {}}
+    for data in snapshots.values():
+        _add(total['views'], data['views'])
+        _add(total['tiers'], data['tiers'])
+    return total
+
+
+def reset():
+    """Drops this process' counters"""
+    with _lock:
+        _views.clear()
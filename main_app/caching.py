@@ -0,0 +1,150 @@
+"""
+Cache helpers shared by every gunicorn worker.
+
+Each model has a generation counter, kept in the ``generations`` cache (a
+store that never culls them, see ``cache_backends.CounterFileCache``) and
+bumped by the ``post_save``/``post_delete`` signals in ``signals.py``.
+Values cached through ``get_or_set`` are stored together with the generations of the models they
+were computed from, so an edit invalidates them in every worker at once and
+they can be cached for much longer than a fixed expiry would allow.
+
+Generations are ``time.time_ns()`` values instead of incremented integers:
+a counter that was deleted or cleared is recreated with a value it never
+had before, so stale entries can never match it again.
+"""
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+
+
+def generation_key(model):
+    return f'generation:{model._meta.label_lower}'
+
+
+def tag_generation_key(tag):
+    return f'generation:tag:{tag}'
+
+
+def get_counters(keys):
+    """Returns the current values of generation counters, creating missing ones"""
+    counters = caches['generations']
+    generations = counters.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Atomic add() so that concurrent workers agree on the first value
+            counters.add(key, time.time_ns(), None)
+            generations[key] = counters.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def bump_counters(keys):
+    caches['generations'].set_many({key: time.time_ns() for key in keys}, None)
+
+
+def get_generations(*models):
+    """Returns the current generations of the models, creating missing counters"""
+    return get_counters([generation_key(model) for model in models])
+
+
+def bump_generation(*models):
+    """Invalidates every cached value computed from these models"""
+    bump_counters([generation_key(model) for model in models])
+
+
+def get_tag_generations(*tags):
+    """Like get_generations, for free-form tags such as ``lesson:12``"""
+    return get_counters([tag_generation_key(tag) for tag in tags])
+
+
+def bump_tags(*tags):
+    bump_counters([tag_generation_key(tag) for tag in tags])
+
+
+def get_or_set(key, models, compute, timeout=None):
+    """
+    Returns the cached value for ``key`` if it was computed while the models
+    had their current generations, otherwise stores and returns ``compute()``.
+    """
+    generations = get_generations(*models)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == generations:
+        return entry[1]
+
+    # Generations are read before computing, so an edit made meanwhile
+    # leaves an entry that is already out of date
+    value = compute()
+    cache.set(key, (generations, value), settings.GENERATION_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def try_lock(name):
+    """
+    Takes a non-blocking exclusive lock shared by the processes of this box,
+    or returns None when another holder has it. The lock is a ``flock`` on a
+    file in ``CACHE_LOCK_DIR``: taking it is atomic and the kernel releases
+    it when the holder closes the returned descriptor or dies.
+    """
+    os.makedirs(settings.CACHE_LOCK_DIR, exist_ok=True)
+    path = os.path.join(settings.CACHE_LOCK_DIR, hashlib.md5(name.encode('utf-8')).hexdigest() + '.lock')
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def get_or_refresh(key, models, compute, soft_timeout, timeout=None):
+    """
+    Stale-while-revalidate variant of ``get_or_set``. Once the value is
+    older than ``soft_timeout`` seconds or its models changed, readers keep
+    getting the stale value while a single worker recomputes it in a
+    background thread. Only a missing value is computed in the request.
+
+    A background refresh bumps the tag named ``key``, so cached pages
+    tagged with it (see ``page_cache.tag_page``) drop the stale value too.
+    """
+    generations = get_generations(*models)
+    timeout = settings.GENERATION_CACHE_TIMEOUT if timeout is None else timeout
+
+    def refresh():
+        value = compute()
+        cache.set(key, (generations, time.time() + soft_timeout, value), timeout)
+        return value
+
+    entry = cache.get(key)
+    if entry is None:
+        return refresh()
+
+    stored_generations, fresh_until, value = entry
+    if stored_generations == generations and time.time() < fresh_until:
+        return value
+
+    lock = try_lock(f'refresh:{key}')
+    if lock is None:
+        return value  # another worker is already refreshing
+
+    if not settings.CACHE_REFRESH_IN_BACKGROUND:
+        try:
+            return refresh()
+        finally:
+            os.close(lock)
+
+    def refresh_in_background():
+        try:
+            refresh()
+            bump_tags(key)
+        finally:
+            os.close(lock)
+            # The thread opened its own database connection
+            connections.close_all()
+
+    threading.Thread(target=refresh_in_background, daemon=True).start()
+    return value
@@ -0,0 +1,6 @@
+from .highlighting import static_highlighting_enabled
+
+
+def code_highlighting(request):
+    """Tells base.html whether Monaco has to be loaded up front"""
+    return {'static_code_highlighting': static_highlighting_enabled()}
@@ -0,0 +1,107 @@
+"""
+Static server-side highlighting of code blocks.
+
+The stored HTML always contains empty Monaco containers. With
+``CODE_HIGHLIGHT_MODE = 'static'`` they are filled with Pygments markup when
+the page is served, so readers get coloured code without downloading and
+booting Monaco; the editor is only loaded when a block is made editable.
+Highlighted blocks are cached by language and code digest, so a snippet is
+highlighted once no matter how many pages show it.
+"""
+import html
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import TextLexer, get_lexer_by_name
+from pygments.util import ClassNotFound
+
+from .markdown_extensions import snippet_digest
+
+# Containers as emitted by markdown_extensions.monaco_container()
+CODE_BLOCK_RE = re.compile(
+    r'<div class="monaco-code-block" data-language="(?P<language>[^"]*)" '
+    r'(?:data-snippet="(?P<digest>[0-9a-f]{64})"|data-code="(?P<code>[^"]*)")></div>'
+)
+
+# Monaco language IDs Pygments knows under another name
+PYGMENTS_LEXERS = {
+    'plaintext': 'text',
+    'shell': 'bash',
+}
+
+# Bump when the highlighted markup changes
+HIGHLIGHT_CACHE_VERSION = 1
+
+
+def static_highlighting_enabled():
+    return settings.CODE_HIGHLIGHT_MODE == 'static'
+
+
+@lru_cache(maxsize=None)
+def get_formatter():
+    return HtmlFormatter(style=settings.PYGMENTS_STYLE)
+
+
+@lru_cache(maxsize=1)
+def get_style_css():
+    """Pygments CSS for the highlighted blocks"""
+    return get_formatter().get_style_defs('.static-code-block .highlight')
+
+
+def highlight_code(language, code):
+    """Returns the Pygments markup of a snippet, falling back to plain text"""
+    try:
+        lexer = get_lexer_by_name(PYGMENTS_LEXERS.get(language, language))
+    except ClassNotFound:
+        lexer = TextLexer()
+    return highlight(code, lexer, get_formatter())
+
+
+def _cache_key(language, digest):
+    return f'highlight:{HIGHLIGHT_CACHE_VERSION}:{language}:{digest}'
+
+
+def highlight_code_blocks(rendered_html, snippets=None):
+    """
+    Replaces the Monaco containers in rendered HTML with statically
+    highlighted blocks. ``snippets`` maps digests to code for containers that
+    reference a ``CodeSnippet``; containers whose snippet is missing are left
+    for the browser to load.
+    """
+    blocks = {}
+    for m in CODE_BLOCK_RE.finditer(rendered_html or ""):
+        language = html.unescape(m.group('language'))
+        if m.group('digest'):
+            digest = m.group('digest')
+            code = (snippets or {}).get(digest)
+        else:
+            code = html.unescape(m.group('code'))
+            digest = snippet_digest(code)
+        if code is not None:
+            blocks[m.group(0)] = (_cache_key(language, digest), language, digest, code)
+    if not blocks:
+        return rendered_html
+
+    highlighted = cache.get_many([key for key, *_ in blocks.values()])
+    missing = {}
+    for key, language, _, code in blocks.values():
+        if key not in highlighted:
+            highlighted[key] = missing[key] = highlight_code(language, code)
+    if missing:
+        cache.set_many(missing, settings.CODE_HIGHLIGHT_CACHE_TIMEOUT)
+
+    def replace(m):
+        block = blocks.get(m.group(0))
+        if block is None:
+            return m.group(0)
+        key, language, digest, _ = block
+        return (
+            f'<div class="monaco-code-block static-code-block" data-language="{html.escape(language)}" '
+            f'data-snippet="{digest}">{highlighted[key]}</div>'
+        )
+
+    return CODE_BLOCK_RE.sub(replace, rendered_html)
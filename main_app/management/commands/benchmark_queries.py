@@ -0,0 +1,192 @@
+import json
+import platform
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main_app.models import Answer, BlogPost, Course, Lesson, Project, Question, Quiz, VideoPlaylist
+
+from .benchmark_rendering import percentile
+
+# Lessons per course and questions per quiz, as in the largest real courses
+LESSONS_PER_COURSE = 1000
+QUESTIONS_PER_QUIZ = 10
+ANSWERS_PER_QUESTION = 4
+
+BATCH_SIZE = 5000
+
+
+def _bench_course():
+    return Course.objects.filter(slug='bench-0').values_list('pk', flat=True).first()
+
+
+def _bench_quiz():
+    return Quiz.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+# Query name -> function returning the queryset a view runs
+QUERIES = {
+    'home_courses': lambda: Course.objects.filter(is_active=True).order_by('-created_at')[:3],
+    'home_posts': lambda: BlogPost.objects.filter(is_published=True).order_by('-published_date')[:6],
+    'home_playlists': lambda: VideoPlaylist.objects.filter(is_active=True).order_by('order', '-created_at')[:6],
+    'home_projects': lambda: Project.objects.filter(is_active=True).order_by('order', '-created_at')[:6],
+    'course_lessons': lambda: Lesson.objects.filter(course_id=_bench_course()).order_by('order').only(
+        'title', 'slug', 'order', 'course_id'
+    ),
+    'quiz_questions': lambda: Question.objects.filter(quiz_id=_bench_quiz()).order_by('order'),
+    'quiz_answers': lambda: Answer.objects.filter(
+        question__in=list(Question.objects.filter(quiz_id=_bench_quiz()).values_list('pk', flat=True))
+    ).order_by('order'),
+}
+
+INDEXED_MODELS = (Course, BlogPost, Lesson, Question, Answer, VideoPlaylist, Project)
+
+
+def seed(rows, log):
+    """Fills every benchmarked table with ``rows`` rows"""
+    def create(model, objects):
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        log(f"  {model._meta.verbose_name_plural}: {model.objects.count()}")
+
+    # A tenth of the rows inactive/unpublished, orders shuffled by a prime stride
+    create(Course, (
+        Course(
+            title=f"Kurs {i}", slug=f"bench-{i}", short_description="Opis", description="Opis",
+            is_active=i % 10 != 0,
+        )
+        for i in range(rows)
+    ))
+    course_ids = list(Course.objects.order_by('pk').values_list('pk', flat=True)[:max(1, rows // LESSONS_PER_COURSE)])
+    create(Lesson, (
+        Lesson(
+            course_id=course_ids[i % len(course_ids)], title=f"Lekcja {i}", slug=f"lekcja-{i}",
+            order=(i * 7919) % rows, content_markdown="Treść"
+        )
+        for i in range(rows)
+    ))
+
+    lesson_ids = Lesson.objects.order_by('pk').values_list('pk', flat=True)[:max(1, rows // QUESTIONS_PER_QUIZ)]
+    create(Quiz, (Quiz(lesson_id=lesson_id, title="Quiz") for lesson_id in lesson_ids))
+    quiz_ids = list(Quiz.objects.values_list('pk', flat=True))
+    create(Question, (
+        Question(quiz_id=quiz_ids[i % len(quiz_ids)], text=f"Pytanie {i}?", order=(i * 7919) % rows)
+        for i in range(rows)
+    ))
+    question_ids = list(Question.objects.order_by('pk').values_list('pk', flat=True)[:max(1, rows // ANSWERS_PER_QUESTION)])
+    create(Answer, (
+        Answer(question_id=question_ids[i % len(question_ids)], text=f"Odpowiedź {i}", order=i % ANSWERS_PER_QUESTION)
+        for i in range(rows)
+    ))
+
+    create(BlogPost, (
+        BlogPost(
+            title=f"Post {i}", slug=f"bench-{i}", short_description="Opis", author_name="Autor",
+            published_date=date.today() - timedelta(days=(i * 7919) % 3650), content_markdown="Treść",
+            is_published=i % 10 != 0,
+        )
+        for i in range(rows)
+    ))
+    create(VideoPlaylist, (
+        VideoPlaylist(
+            title=f"Playlista {i}", slug=f"bench-{i}", description="Opis", thumbnail="playlists/bench.jpg",
+            youtube_playlist_url="https://www.youtube.com/playlist?list=bench", order=i % 100,
+            is_active=i % 10 != 0,
+        )
+        for i in range(rows)
+    ))
+    create(Project, (
+        Project(
+            title=f"Projekt {i}", description="Opis", technologies="Python", order=i % 100,
+            is_active=i % 10 != 0,
+        )
+        for i in range(rows)
+    ))
+
+
+def measure(queryset_for, iterations):
+    list(queryset_for())  # warm-up
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        list(queryset_for())
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'mean_ms': statistics.mean(timings),
+        'plan': queryset_for().explain(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the hot filter/order queries on large tables with and without the composite "
+        "indexes. Runs in a separate, temporary test database that is destroyed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help="Rows per benchmarked table")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed executions per query")
+        parser.add_argument('--query', action='append', choices=sorted(QUERIES), help="Only this query (repeatable)")
+        parser.add_argument('--output', help="Write results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError("--rows and --iterations must be at least 1")
+
+        # Never fill or re-index the real database: benchmark in a throwaway copy of the schema
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'vendor': connection.vendor,
+                    'python': platform.python_version(),
+                    'rows': options['rows'],
+                    'iterations': options['iterations'],
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run(self, options):
+        self.stdout.write(f"Seeding {options['rows']} rows per table ({connection.vendor})")
+        seed(options['rows'], self.stdout.write)
+        names = options['query'] or list(QUERIES)
+        indexes = [(model, index) for model in INDEXED_MODELS for index in model._meta.indexes]
+
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        try:
+            before = {name: measure(QUERIES[name], options['iterations']) for name in names}
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+        after = {name: measure(QUERIES[name], options['iterations']) for name in names}
+
+        results = {}
+        for name in names:
+            old, new = before[name], after[name]
+            speedup = old['p50_ms'] / new['p50_ms'] if new['p50_ms'] else 0
+            results[name] = {'before': old, 'after': new, 'speedup': speedup}
+            self.stdout.write(
+                f"\n{name:<16} p50 {old['p50_ms']:8.3f} ms -> {new['p50_ms']:8.3f} ms  ({speedup:.1f}x)"
+            )
+            self.stdout.write(f"  plan before: {old['plan']}\n  plan after:  {new['plan']}")
+        return results
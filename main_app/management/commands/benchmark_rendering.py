@@ -0,0 +1,214 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import markdown
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main_app import rendering
+from main_app.models import Lesson, PracticalTask, Question
+
+SAMPLE_SNIPPET = '''def fibonacci(n):
+    """Zwraca n-ty wyraz ciągu Fibonacciego"""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+print([fibonacci(i) for i in range(10)])  # <wynik> & "cudzysłów"'''
+
+PROSE = (
+    "Ten akapit opisuje temat lekcji z **pogrubieniem**, *kursywą*, `kodem w linii` "
+    "oraz [linkiem](https://example.com). Kolejne zdanie dodaje trochę objętości, "
+    "żeby akapit przypominał prawdziwą treść wygenerowaną przez n8n."
+)
+
+SIZES = {'small': 5, 'medium': 50, 'large': 300}
+
+
+def _prose_section(i):
+    return f"## Sekcja {i}\n\n{PROSE}\n\n- punkt pierwszy\n- punkt drugi\n\n{PROSE}"
+
+
+def _code_section(i):
+    return f"## Krok {i}\n\nZobacz przykład poniżej:\n\n```py\n{SAMPLE_SNIPPET}\n```"
+
+
+def _table_section(i):
+    rows = "\n".join(f"| `wiersz_{r}` | {r * i} | opis **{r}** |" for r in range(10))
+    return f"## Tabela {i}\n\n| Nazwa | Wartość | Opis |\n|-------|---------|------|\n{rows}"
+
+
+def _callout_section(i):
+    kind = ('NOTE', 'WARNING', 'DANGER')[i % 3]
+    return f"## Uwaga {i}\n\n> [!{kind}]\n> {PROSE}\n\n{PROSE}"
+
+
+CONTENT_KINDS = {
+    'prose': _prose_section,
+    'code': _code_section,
+    'table': _table_section,
+    'callout': _callout_section,
+}
+
+
+def build_markdown(kind, sections):
+    """Builds a synthetic markdown document of the given kind and size"""
+    parts = ["# Lekcja testowa\n\n" + PROSE]
+    parts.extend(CONTENT_KINDS[kind](i + 1) for i in range(sections))
+    return "\n\n".join(parts)
+
+
+def _render_lesson(source):
+    return Lesson().render_markdown(source, snippets={}, toc_tokens=[])
+
+
+def _render_question(source):
+    return Question().render_markdown(source)
+
+
+def _render_task(source):
+    task = PracticalTask(**{field: source for field in PracticalTask.get_source_fields()})
+    task.refresh_rendered_html()
+    return "".join(getattr(task, field) for field in PracticalTask.MARKDOWN_FIELDS.values())
+
+
+# Questions are short by nature, large documents are not worth measuring there
+TARGETS = {
+    'lesson': (_render_lesson, ('small', 'medium', 'large')),
+    'question': (_render_question, ('small', 'medium')),
+    'task': (_render_task, ('small', 'medium')),
+}
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def measure(render, source, iterations):
+    render(source)  # warm-up, builds the per-thread Markdown instances
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        output = render(source)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        render(source)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'input_bytes': len(source.encode('utf-8')),
+        'output_bytes': len(output.encode('utf-8')),
+        'iterations': iterations,
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': timings[-1],
+        'peak_alloc_bytes': peak - before,
+        'retained_bytes': after - before,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the markdown/Monaco rendering pipeline on synthetic lessons, questions and tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Timed renders per case")
+        parser.add_argument('--target', action='append', choices=sorted(TARGETS), help="Only this target (repeatable)")
+        parser.add_argument('--kind', action='append', choices=sorted(CONTENT_KINDS), help="Only this content kind (repeatable)")
+        parser.add_argument('--size', action='append', choices=list(SIZES), help="Only this size (repeatable)")
+        parser.add_argument('--output', help="Write results as JSON to this file")
+        parser.add_argument('--compare', help="Compare against a JSON file written by an earlier --output run")
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help="Percent slowdown of p50 (or growth of peak allocations) reported as a regression"
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error when regressions are found")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+
+        results = {}
+        for target in options['target'] or TARGETS:
+            render, target_sizes = TARGETS[target]
+            for kind in options['kind'] or CONTENT_KINDS:
+                for size in options['size'] or target_sizes:
+                    if size not in target_sizes:
+                        continue
+                    source = build_markdown(kind, SIZES[size])
+                    case = f"{target}/{kind}/{size}"
+                    results[case] = stats = measure(render, source, options['iterations'])
+                    self.stdout.write(
+                        f"{case:<24} p50 {stats['p50_ms']:8.3f} ms  p90 {stats['p90_ms']:8.3f} ms  "
+                        f"p99 {stats['p99_ms']:8.3f} ms  peak {stats['peak_alloc_bytes'] / 1024:8.1f} KiB  "
+                        f"out {stats['output_bytes'] / 1024:8.1f} KiB"
+                    )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'renderer_version': rendering.RENDERER_VERSION,
+                'markdown_version': markdown.__version__,
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            regressions = self.compare(options['compare'], results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} regression(s) above {options['threshold']}%")
+
+    def compare(self, path, results, threshold):
+        try:
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read baseline {path}: {e}")
+
+        self.stdout.write(f"\nCompared with {path}:")
+        regressions = 0
+        for case, stats in results.items():
+            old = baseline.get(case)
+            if not old:
+                self.stdout.write(f"{case:<24} (no baseline)")
+                continue
+
+            changes = {
+                'p50': _change(old['p50_ms'], stats['p50_ms']),
+                'peak': _change(old['peak_alloc_bytes'], stats['peak_alloc_bytes']),
+                'out': _change(old['output_bytes'], stats['output_bytes']),
+            }
+            line = f"{case:<24} " + "  ".join(f"{name} {value:+7.1f}%" for name, value in changes.items())
+            if changes['p50'] > threshold or changes['peak'] > threshold:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            else:
+                self.stdout.write(line)
+        return regressions
+
+
+def _change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) * 100 / old
@@ -0,0 +1,159 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main_app import page_cache, rendering
+from main_app.caching import bump_generation
+from main_app.models import CodeSnippet
+
+# model option -> (model label, lookup from the model to the course slug)
+RENDERED_MODELS = {
+    'lesson': ('main_app.Lesson', 'course__slug'),
+    'question': ('main_app.Question', 'quiz__lesson__course__slug'),
+    'task': ('main_app.PracticalTask', 'lesson__course__slug'),
+    'blogpost': ('main_app.BlogPost', None),
+}
+
+
+def _init_worker():
+    django.setup()
+
+
+def render_rows(label, rows):
+    """
+    Renders a chunk of ``(pk, {source_field: text})`` rows and returns
+    ``(pk, {rendered_field: value})`` pairs together with the code snippets
+    they reference. Runs inside pool workers, so it only touches unsaved
+    instances and never the database.
+    """
+    model = apps.get_model(label)
+    results = []
+    snippets = {}
+    for pk, sources in rows:
+        obj = model(pk=pk, **sources)
+        obj.refresh_rendered_html()
+        snippets.update(obj.code_snippets)
+        results.append((pk, {field: getattr(obj, field) for field in model.RENDERED_FIELDS}))
+    return results, snippets
+
+
+class Command(BaseCommand):
+    help = "Re-renders stored markdown HTML in bulk across a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', choices=sorted(RENDERED_MODELS),
+            help="Only re-render this model (can be repeated, default: all)"
+        )
+        parser.add_argument('--course', help="Only rows belonging to the course with this slug")
+        parser.add_argument(
+            '--stale', action='store_true',
+            help=f"Only rows rendered by a renderer older than version {rendering.RENDERER_VERSION}"
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Rendering processes (1 renders in this process)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=200, help="Rows per fetch, render and bulk_update batch")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        names = options['model'] or list(RENDERED_MODELS)
+        if options['course']:
+            names = [name for name in names if RENDERED_MODELS[name][1]]
+
+        pool = None
+        if options['workers'] > 1:
+            # Forked workers must not share the parent's database sockets. The pool
+            # forks lazily, so start the workers now, before any query reconnects.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker)
+            pool.submit(os.getpid).result()
+
+        try:
+            started = time.perf_counter()
+            total = sum(self.rerender_model(name, pool, options) for name in names)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-rendered {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+    def get_queryset(self, name, options):
+        label, course_lookup = RENDERED_MODELS[name]
+        model = apps.get_model(label)
+        queryset = model.objects.all()
+        if options['course']:
+            queryset = queryset.filter(**{course_lookup: options['course']})
+        if options['stale']:
+            queryset = queryset.exclude(renderer_version=rendering.RENDERER_VERSION)
+        # Foreign keys too, for the page tags purged after the update
+        foreign_keys = [field.attname for field in model._meta.concrete_fields if field.is_relation]
+        return model, queryset.only('pk', *model.get_source_fields(), *foreign_keys).order_by('pk')
+
+    def rerender_model(self, name, pool, options):
+        model, queryset = self.get_queryset(name, options)
+        label = model._meta.label
+        count = queryset.count()
+        self.stdout.write(f"{model._meta.verbose_name_plural}: {count} rows")
+        if not count:
+            return 0
+
+        chunk_size = options['chunk_size']
+        source_fields = model.get_source_fields()
+        done = 0
+        started = time.perf_counter()
+        chunk = []
+
+        def flush(chunk):
+            rows = [(obj.pk, {field: getattr(obj, field) for field in source_fields}) for obj in chunk]
+            if pool:
+                # Split the chunk so every worker gets a share of it
+                step = max(1, len(rows) // options['workers'])
+                parts = [rows[i:i + step] for i in range(0, len(rows), step)]
+                outputs = list(pool.map(render_rows, [label] * len(parts), parts))
+            else:
+                outputs = [render_rows(label, rows)]
+
+            rendered, snippets = {}, {}
+            for pairs, part_snippets in outputs:
+                rendered.update(pairs)
+                snippets.update(part_snippets)
+            CodeSnippet.store(snippets)
+
+            for obj in chunk:
+                for field, value in rendered[obj.pk].items():
+                    setattr(obj, field, value)
+            model.objects.bulk_update(chunk, model.RENDERED_FIELDS, batch_size=chunk_size)
+            # bulk_update sends no signals: drop the cached pages showing these rows
+            page_cache.purge_many(model, chunk)
+            return len(chunk)
+
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) == chunk_size:
+                done += flush(chunk)
+                chunk = []
+                self.report(done, count, started)
+        if chunk:
+            done += flush(chunk)
+            self.report(done, count, started)
+
+        # And the values cached under the model's generation
+        bump_generation(model)
+        return done
+
+    def report(self, done, count, started):
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f"  {done}/{count} ({done * 100 // count}%) {rate:.0f} rows/s")
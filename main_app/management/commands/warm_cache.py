@@ -0,0 +1,155 @@
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from main_app.models import BlogPost, Course, Lesson
+
+# Request path and status of a line in nginx's "main"/combined log format
+ACCESS_LOG_RE = re.compile(r'"(?:GET|HEAD) (?P<path>/[^ ?"]*)[^"]*" (?P<status>\d{3}) ')
+
+
+def public_urls():
+    """Every public page worth warming, in the order they are linked from the site"""
+    urls = [reverse('home'), reverse('courses')]
+    for slug in Course.objects.filter(is_active=True).order_by('pk').values_list('slug', flat=True):
+        urls += [reverse('course_detail', args=[slug]), reverse('course_lessons', args=[slug])]
+
+    lessons = Lesson.objects.filter(course__is_active=True).order_by('course_id', 'order').values_list(
+        'course__slug', 'slug', 'quiz', 'practicaltask'
+    )
+    for course_slug, slug, quiz, task in lessons:
+        urls.append(reverse('lesson_detail', args=[course_slug, slug]))
+        if quiz:
+            urls.append(reverse('quiz_detail', args=[course_slug, slug]))
+        if task:
+            urls.append(reverse('practical_task_detail', args=[course_slug, slug]))
+
+    posts = BlogPost.objects.filter(is_published=True).order_by('-published_date').values_list('slug', flat=True)
+    urls += [reverse('blog_post_detail', args=[slug]) for slug in posts]
+    return urls
+
+
+def read_hits(path):
+    """Counts successful GETs per path in an nginx access log"""
+    hits = Counter()
+    with open(path, encoding='utf-8', errors='replace') as log:
+        for line in log:
+            m = ACCESS_LOG_RE.search(line)
+            if m and m.group('status') in ('200', '304'):
+                hits[m.group('path')] += 1
+    return hits
+
+
+# Test client of this process, set up by _set_client
+_client = None
+
+
+def _set_client(host):
+    global _client
+    _client = Client(HTTP_HOST=host)
+
+
+def _init_worker(host):
+    django.setup()
+    _set_client(host)
+
+
+def warm_page(url, deadline):
+    """
+    Requests one page with this process' client and returns ``(url, status,
+    seconds)``; the status is None when the time budget (a ``time.time()``
+    deadline) ran out before the page was started.
+    """
+    if deadline is not None and time.time() >= deadline:
+        return url, None, 0
+    started = time.perf_counter()
+    try:
+        status = _client.get(url, secure=True).status_code
+    except Exception as e:
+        status = repr(e)
+    return url, status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the public pages after a deploy, so that the page, card, section and "
+        "highlighting caches shared by the workers are filled before visitors arrive"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4, help="Pages rendered at the same time, each in its own process"
+        )
+        parser.add_argument(
+            '--time-budget', type=float,
+            help="Stop starting new pages after this many seconds (default: no limit)"
+        )
+        parser.add_argument(
+            '--access-log',
+            help="nginx access log used to warm the most visited pages first"
+        )
+        parser.add_argument('--host', help="Host header of the requests (default: first ALLOWED_HOSTS entry)")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        urls = public_urls()
+        if options['access_log']:
+            try:
+                hits = read_hits(options['access_log'])
+            except OSError as e:
+                raise CommandError(f"Cannot read the access log: {e}")
+            # Stable sort: pages without hits keep the site order
+            urls.sort(key=lambda url: -hits[url])
+
+        host = options['host'] or next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost'
+        )
+        deadline = time.time() + options['time_budget'] if options['time_budget'] is not None else None
+
+        results = []
+        started = time.perf_counter()
+
+        def record(result):
+            url, status, seconds = result
+            if status is None:
+                return
+            results.append(result)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {status} {url} ({seconds * 1000:.0f} ms)")
+
+        if options['concurrency'] == 1:
+            _set_client(host)
+            for url in urls:
+                record(warm_page(url, deadline))
+        else:
+            # Rendering is CPU bound, so pages are rendered in separate processes
+            # (filling the shared cache tier), not threads held back by the GIL.
+            # Forked workers must not share the parent's database sockets.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['concurrency'], initializer=_init_worker, initargs=(host,)
+            ) as pool:
+                for result in pool.map(warm_page, urls, repeat(deadline)):
+                    record(result)
+
+        elapsed = time.perf_counter() - started
+        failed = [(url, status) for url, status, _ in results if status != 200]
+        for url, status in failed:
+            self.stderr.write(f"{status} {url}")
+        skipped = len(urls) - len(results)
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Time budget exhausted, {skipped} pages left cold"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {len(results) - len(failed)}/{len(urls)} pages in {elapsed:.2f}s"
+        ))
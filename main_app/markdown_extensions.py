@@ -0,0 +1,169 @@
+"""
+Markdown extensions producing the markup our lesson pages expect directly
+while the document is parsed, so no post-processing pass over the final
+HTML is needed.
+"""
+import hashlib
+import html
+import re
+import xml.etree.ElementTree as etree
+from collections import Counter
+
+from markdown.extensions import Extension
+from markdown.extensions.attr_list import get_attrs_and_remainder
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+from markdown.treeprocessors import Treeprocessor
+
+
+def snippet_digest(code):
+    """Returns the content address of a code snippet"""
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def monaco_container(language, code, snippets=None):
+    """
+    Returns the Monaco editor container for a code block. When a
+    ``snippets`` dict is given the code goes there under its digest and the
+    container only references it, otherwise it is inlined in ``data-code``.
+    """
+    if snippets is None:
+        payload = f'data-code="{html.escape(code)}"'
+    else:
+        digest = snippet_digest(code)
+        snippets[digest] = code
+        payload = f'data-snippet="{digest}"'
+    return f'<div class="monaco-code-block" data-language="{html.escape(language)}" {payload}></div>'
+
+
+class MonacoFencedBlockPreprocessor(FencedBlockPreprocessor):
+    """
+    Fenced code preprocessor that stashes a Monaco editor container for
+    blocks with a language instead of a ``<pre><code>`` element. Blocks
+    without a language keep the default markup.
+
+    Snippets are collected into ``md.code_snippets`` when the caller sets it
+    to a dict before converting.
+    """
+
+    def __init__(self, md, config, language_map):
+        super().__init__(md, config)
+        self.language_map = language_map
+
+    def run(self, lines):
+        text = "\n".join(lines)
+        index = 0
+        while True:
+            m = self.FENCED_BLOCK_RE.search(text, index)
+            if not m:
+                break
+
+            lang, id = m.group('lang'), ''
+            if m.group('attrs'):
+                attrs, remainder = get_attrs_and_remainder(m.group('attrs'))
+                if remainder:  # Unbalanced braces, not a fenced block
+                    index = m.end('attrs')
+                    continue
+                id, classes, _ = self.handle_attrs(attrs)
+                lang = classes[0] if classes else None
+
+            if lang:
+                lang = lang.lower()
+                block = monaco_container(
+                    self.language_map.get(lang, lang),
+                    m.group('code'),
+                    getattr(self.md, 'code_snippets', None),
+                )
+            else:
+                id_attr = f' id="{html.escape(id)}"' if id else ''
+                block = f'<pre{id_attr}><code>{self._escape(m.group("code"))}</code></pre>'
+
+            placeholder = self.md.htmlStash.store(block)
+            text = f'{text[:m.start()]}\n{placeholder}\n{text[m.end():]}'
+            index = m.start() + 1 + len(placeholder)
+        return text.split("\n")
+
+
+class CalloutTreeprocessor(Treeprocessor):
+    """
+    Turns blockquotes opening with ``[!NOTE]``, ``[!WARNING]`` or
+    ``[!DANGER]`` into ``<div class="callout ...">`` elements.
+    """
+    MARKER_RE = re.compile(r'^\s*\[!(NOTE|WARNING|DANGER)\][ \t]*\n?')
+
+    def run(self, root):
+        for blockquote in root.iter('blockquote'):
+            first = blockquote[0] if len(blockquote) else None
+            if first is None or first.tag != 'p' or not first.text:
+                continue
+            m = self.MARKER_RE.match(first.text)
+            if not m:
+                continue
+
+            blockquote.tag = 'div'
+            blockquote.set('class', f'callout {m.group(1).lower()}')
+            first.text = first.text[m.end():]
+            if not first.text.strip() and not len(first):
+                blockquote.remove(first)
+
+
+class SectionBreakTreeprocessor(Treeprocessor):
+    """
+    Marks where a long document can be split into sections: a comment is
+    inserted before every top-level heading of the shallowest level that
+    occurs at least twice (usually ``##`` under a single ``#`` title).
+    Headings nested in blockquotes, callouts or lists never split.
+    """
+    HEADING_RE = re.compile(r'^h([1-6])$')
+
+    def __init__(self, md, marker):
+        super().__init__(md)
+        self.marker = marker
+
+    def run(self, root):
+        levels = Counter()
+        for child in root:
+            m = self.HEADING_RE.match(child.tag) if isinstance(child.tag, str) else None
+            if m:
+                levels[m.group(1)] += 1
+
+        split_levels = sorted(level for level, count in levels.items() if count >= 2)
+        if not split_levels:
+            return
+        split_tag = f'h{split_levels[0]}'
+
+        for index in range(len(root) - 1, 0, -1):
+            if root[index].tag == split_tag:
+                comment = etree.Comment(self.marker)
+                comment.tail = '\n'
+                root.insert(index, comment)
+
+
+class SectionBreakExtension(Extension):
+    def __init__(self, **kwargs):
+        self.config = {
+            'marker': ['section', "Text of the comment marking a section break"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        # After 'prettify', which would otherwise re-indent the comments
+        md.treeprocessors.register(SectionBreakTreeprocessor(md, self.getConfig('marker')), 'section_break', 1)
+
+
+class MonacoExtension(Extension):
+    def __init__(self, **kwargs):
+        self.config = {
+            'language_map': [{}, "Language alias to Monaco language ID map"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        # Same name as the fenced_code preprocessor, so it replaces it
+        md.preprocessors.register(
+            MonacoFencedBlockPreprocessor(md, {}, self.getConfig('language_map')),
+            'fenced_code_block',
+            25,
+        )
+        # Before 'inline' so the marker is still plain text
+        md.treeprocessors.register(CalloutTreeprocessor(md), 'callout', 25)
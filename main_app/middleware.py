@@ -0,0 +1,21 @@
+import time
+
+from . import cache_metrics
+
+
+class CacheMetricsMiddleware:
+    """Attributes cache lookups and request time to the view being served"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cache_metrics.start_request()
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            cache_metrics.finish_request(time.perf_counter() - started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        cache_metrics.set_view(request.resolver_match.view_name)
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0002_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Wyrenderowany HTML'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='renderer_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Wersja renderera'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Hash źródła'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Wyrenderowany HTML'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='renderer_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Wersja renderera'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Hash źródła'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Wyrenderowany HTML'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='renderer_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Wersja renderera'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Hash źródła'),
+        ),
+    ]
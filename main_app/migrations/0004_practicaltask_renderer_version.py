@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_rendered_markdown_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practicaltask',
+            name='renderer_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Wersja renderera'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_practicaltask_renderer_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSnippet',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Hash')),
+                ('code', models.TextField(verbose_name='Kod')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+            ],
+            options={
+                'verbose_name': 'Fragment kodu',
+                'verbose_name_plural': 'Fragmenty kodu',
+            },
+        ),
+    ]
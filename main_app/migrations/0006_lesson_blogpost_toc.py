@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_codesnippet'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Spis treści'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Spis treści'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:46
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_similarities(apps, schema_editor):
+    # Same scores as main_app.similarity, on the historical models only
+    Course = apps.get_model('main_app', 'Course')
+    CourseSimilarity = apps.get_model('main_app', 'CourseSimilarity')
+    tag_sets = defaultdict(set)
+    for course_id, tag_id in Course.tags.through.objects.filter(
+        course__is_active=True
+    ).values_list('course_id', 'tag_id'):
+        tag_sets[course_id].add(tag_id)
+
+    rows = []
+    for course_id, tags in tag_sets.items():
+        for other_id, other_tags in tag_sets.items():
+            if other_id != course_id and tags & other_tags:
+                rows.append(CourseSimilarity(
+                    course_id=course_id,
+                    similar_id=other_id,
+                    score=len(tags & other_tags) / len(tags | other_tags),
+                ))
+    CourseSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Podobieństwo')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='main_app.course', verbose_name='Kurs')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main_app.course', verbose_name='Podobny kurs')),
+            ],
+            options={
+                'verbose_name': 'Podobieństwo kursów',
+                'verbose_name_plural': 'Podobieństwa kursów',
+                'indexes': [models.Index(fields=['course', '-score', 'similar'], name='similarity_course_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'similar'), name='unique_course_similarity')],
+            },
+        ),
+        migrations.RunPython(fill_similarities, migrations.RunPython.noop),
+    ]
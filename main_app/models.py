@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.db import models
 from django.urls import reverse
 from ckeditor.fields import RichTextField
-import markdown
-import re
 from django.utils.text import slugify
 
+from . import rendering
+from .caching import bump_generation
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="Nazwa")
     slug = models.SlugField(max_length=50, unique=True, verbose_name="Slug")
@@ -37,14 +39,148 @@ class Course(models.Model):
         verbose_name = "Kurs"
         verbose_name_plural = "Kursy"
         ordering = ['-created_at']
+        # Active courses, newest first (home page, course list)
+        indexes = [models.Index(fields=['is_active', '-created_at'], name='course_active_created_idx')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        course = super().from_db(db, field_names, values)
+        # Lets a save tell whether it changed the activity without a query (see signals)
+        course._was_active = course.__dict__.get('is_active')
+        return course
 
     def __str__(self):
         return self.title
 
     def get_absolute_url(self):
         return reverse('course_detail', args=[self.slug])
-    
-class Lesson(models.Model):
+
+class CourseSimilarity(models.Model):
+    """
+    Tag similarity of two active courses sharing at least one tag, stored in
+    both directions and kept up to date by ``similarity.rebuild_course``.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='similarities', verbose_name="Kurs")
+    similar = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+', verbose_name="Podobny kurs")
+    score = models.FloatField(verbose_name="Podobieństwo")
+
+    class Meta:
+        verbose_name = "Podobieństwo kursów"
+        verbose_name_plural = "Podobieństwa kursów"
+        constraints = [models.UniqueConstraint(fields=['course', 'similar'], name='unique_course_similarity')]
+        # Most similar courses first (course detail suggestions)
+        indexes = [models.Index(fields=['course', '-score', 'similar'], name='similarity_course_score_idx')]
+
+    def __str__(self):
+        return f"{self.course_id} -> {self.similar_id} ({self.score:.2f})"
+
+class CodeSnippet(models.Model):
+    """
+    Code of a markdown code block stored under the hash of its content.
+    Rendered HTML only references snippets, so code shared between lessons
+    is stored and downloaded once. Rows are immutable and never updated.
+    """
+    digest = models.CharField(max_length=64, primary_key=True, verbose_name="Hash")
+    code = models.TextField(verbose_name="Kod")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+
+    class Meta:
+        verbose_name = "Fragment kodu"
+        verbose_name_plural = "Fragmenty kodu"
+
+    def __str__(self):
+        return self.digest[:12]
+
+    @classmethod
+    def store(cls, snippets):
+        """Saves ``{digest: code}`` pairs, skipping the ones already stored"""
+        if snippets:
+            cls.objects.bulk_create(
+                [cls(digest=digest, code=code) for digest, code in snippets.items()],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def for_html(cls, *html_parts):
+        """Returns ``{digest: code}`` for every snippet referenced by the HTML"""
+        digests = [digest for part in html_parts for digest in rendering.snippet_digests(part)]
+        if not digests:
+            return {}
+        return dict(cls.objects.filter(digest__in=digests).values_list('digest', 'code'))
+
+class RenderedMarkdownModel(models.Model):
+    """
+    Abstract base for models that keep their markdown source rendered to HTML
+    on the row. The stored HTML is re-rendered only when the source hash or
+    the global renderer version no longer match.
+    """
+    markdown_source_field = 'content_markdown'
+
+    rendered_html = models.TextField(editable=False, blank=True, verbose_name="Wyrenderowany HTML")
+    source_hash = models.CharField(max_length=64, editable=False, blank=True, verbose_name="Hash źródła")
+    renderer_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Wersja renderera")
+
+    RENDERED_FIELDS = ('rendered_html', 'source_hash', 'renderer_version')
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_source_fields(cls):
+        return (cls.markdown_source_field,)
+
+    def render_markdown(self, markdown_text, snippets=None, toc_tokens=None):
+        """
+        Converts the markdown source to the HTML that gets stored, collecting
+        code blocks into ``snippets`` when the model stores them separately
+        and the table of contents into ``toc_tokens`` when it has a ``toc`` field
+        """
+        raise NotImplementedError
+
+    def get_markdown_source(self):
+        return getattr(self, self.markdown_source_field) or ""
+
+    def rendered_is_stale(self):
+        return (
+            self.renderer_version != rendering.RENDERER_VERSION
+            or self.source_hash != rendering.source_hash(self.get_markdown_source())
+        )
+
+    def refresh_rendered_html(self):
+        """Renders the source; code snippets wait in ``code_snippets`` until stored"""
+        source = self.get_markdown_source()
+        self.code_snippets = {}
+        toc_tokens = []
+        self.rendered_html = self.render_markdown(source, self.code_snippets, toc_tokens) if source else ""
+        if 'toc' in self.RENDERED_FIELDS:
+            self.toc = toc_tokens
+        self.source_hash = rendering.source_hash(source)
+        self.renderer_version = rendering.RENDERER_VERSION
+
+    def get_rendered_html(self):
+        """Returns the stored HTML, re-rendering it first if it is out of date"""
+        if self.rendered_is_stale():
+            self.refresh_rendered_html()
+            if self.pk:
+                CodeSnippet.store(self.code_snippets)
+                # Write back without save() so updated_at and signals stay untouched
+                type(self).objects.filter(pk=self.pk).update(
+                    **{field: getattr(self, field) for field in self.RENDERED_FIELDS}
+                )
+                bump_generation(type(self))
+        return self.rendered_html
+
+    def save(self, *args, **kwargs):
+        if self.rendered_is_stale():
+            self.refresh_rendered_html()
+            # Snippets first, so stored HTML never references a missing one
+            CodeSnippet.store(self.code_snippets)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.RENDERED_FIELDS)
+        super().save(*args, **kwargs)
+
+class Lesson(RenderedMarkdownModel):
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='lessons', verbose_name="Kurs")
     title = models.CharField(max_length=200, verbose_name="Tytuł")
     slug = models.SlugField(max_length=200, verbose_name="Slug")
@@ -52,99 +188,55 @@ class Lesson(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
     content_markdown = models.TextField(blank=True, null=True, verbose_name="Treść (Markdown)")
+    toc = models.JSONField(default=list, editable=False, blank=True, verbose_name="Spis treści")
+
+    RENDERED_FIELDS = RenderedMarkdownModel.RENDERED_FIELDS + ('toc',)
 
     class Meta:
         ordering = ['order']
         unique_together = ('course', 'slug')
+        indexes = [models.Index(fields=['course', 'order'], name='lesson_course_order_idx')]
         verbose_name = "Lekcja"
         verbose_name_plural = "Lekcje"
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        lesson = super().from_db(db, field_names, values)
+        # A lesson moved to another course purges the old course's pages too (see page_cache)
+        lesson._saved_course_id = lesson.__dict__.get('course_id')
+        return lesson
+
     def get_absolute_url(self):
         return reverse('lesson_detail', args=[self.course.slug, self.slug])
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
-            
-        self.content_markdown = self._process_special_blocks(self.content_markdown)
+
         super().save(*args, **kwargs)
-    
-    def _process_special_blocks(self, markdown_text):
-        if not markdown_text:
-            return markdown_text
-        markdown_text = re.sub(
-            r'^>\s*\[!(NOTE|WARNING|DANGER)\](.*?)(?=\n{2,}|\Z)',
-            self._replace_callout,
-            markdown_text,
-            flags=re.MULTILINE|re.DOTALL
-        )
-        return markdown_text
-    
-    def _replace_callout(self, match):
-        callout_type = match.group(1).lower()
-        content = match.group(2).strip()
-        return f'<div class="callout {callout_type}">{content}</div>'
-    
+        self._saved_course_id = self.course_id
+
     @property
     def content_html(self):
-        if not self.content_markdown:
-            return ""
-        
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.fenced_code',  # Zamienione codehilite na fenced_code
-            'markdown.extensions.toc'
-        ]
-
-        html = markdown.markdown(self.content_markdown, extensions=extensions)
-        
-        pattern = re.compile(r'<pre><code class="language-(.*?)">(.*?)</code></pre>', re.DOTALL)
-        html = pattern.sub(self._highlight_code, html)
-        
-        return html
-    
-    def _highlight_code(self, match):
-        language = match.group(1)
-        code = match.group(2)
-
-        # Unescape HTML entities in code
-        import html
-        code = html.unescape(code)
-
-        # Map language aliases to Monaco language IDs
-        language_map = {
-            'py': 'python',
-            'js': 'javascript',
-            'ts': 'typescript',
-            'html': 'html',
-            'css': 'css',
-            'bash': 'shell',
-            'sh': 'shell',
-            'shell': 'shell',
-            'sql': 'sql',
-            'yaml': 'yaml',
-            'yml': 'yaml',
-            'json': 'json',
-            'xml': 'xml',
-            'dockerfile': 'dockerfile',
-            'docker': 'dockerfile',
-            'csharp': 'csharp',
-            'cs': 'csharp',
-            'cpp': 'cpp',
-            'c++': 'cpp',
-            'php': 'php',
-        }
-
-        monaco_language = language_map.get(language.lower(), language.lower())
-
-        # Escape code for HTML attribute
-        escaped_code = html.escape(code)
-
-        # Return Monaco editor container
-        return f'<div class="monaco-code-block" data-language="{monaco_language}" data-code="{escaped_code}"></div>'
+        return self.get_rendered_html()
+
+    def render_markdown(self, markdown_text, snippets=None, toc_tokens=None):
+        return rendering.render_markdown(markdown_text, toc=True, snippets=snippets, toc_tokens=toc_tokens)
+
+    @property
+    def section_version(self):
+        """
+        Changes whenever the served sections change, used in section cache
+        keys and URLs: with the stored HTML or the code highlighting mode
+        """
+        return f"{self.renderer_version}-{self.source_hash[:12]}-{settings.CODE_HIGHLIGHT_MODE}"
+
+    def get_sections(self):
+        """Returns the rendered lesson split at its top-level headings"""
+        return rendering.split_sections(self.content_html)
 
 class LessonContent(models.Model):
     lesson = models.OneToOneField('Lesson', on_delete=models.CASCADE, related_name='content', verbose_name="Lekcja")
@@ -174,7 +266,7 @@ class Quiz(models.Model):
     def __str__(self):
         return self.title
 
-class Question(models.Model):
+class Question(RenderedMarkdownModel):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions', verbose_name="Quiz")
     text = models.TextField(
         verbose_name="Treść pytania",
@@ -183,8 +275,11 @@ class Question(models.Model):
     order = models.PositiveIntegerField(default=0, verbose_name="Kolejność")
     explanation = models.TextField(blank=True, verbose_name="Wyjaśnienie", help_text="Wyjaśnienie poprawnych odpowiedzi")
 
+    markdown_source_field = 'text'
+
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['quiz', 'order'], name='question_quiz_order_idx')]
         verbose_name = "Pytanie"
         verbose_name_plural = "Pytania"
 
@@ -193,65 +288,13 @@ class Question(models.Model):
 
     @property
     def text_html(self):
+        return self.get_rendered_html()
+
+    def render_markdown(self, markdown_text, snippets=None, toc_tokens=None):
         """Renders text as HTML with markdown support, especially for code blocks"""
-        if not self.text:
-            return ""
-
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.fenced_code',  # Removed codehilite for Monaco
-        ]
-
-        html = markdown.markdown(self.text, extensions=extensions)
-
-        # Apply Pygments syntax highlighting with VS Code style
-        pattern = re.compile(r'<pre><code class="language-(.*?)">(.*?)</code></pre>', re.DOTALL)
-        html = pattern.sub(self._highlight_code, html)
-
-        # Sanitize HTML to prevent XSS attacks while allowing safe markdown tags
-        import bleach
-        allowed_tags = [
-            'p', 'br', 'strong', 'em', 'u', 'code', 'pre', 'blockquote',
-            'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'a', 'div', 'span', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
-        ]
-        allowed_attrs = {
-            'a': ['href', 'title'],
-            'div': ['class'],
-            'span': ['class'],
-            'code': ['class'],
-            'pre': ['class'],
-        }
-        # Add monaco-code-block to allowed tags since we generate it
-        allowed_tags.append('div')
-        allowed_attrs['div'] = ['class', 'data-language', 'data-code']
-
-        html = bleach.clean(html, tags=allowed_tags, attributes=allowed_attrs, strip=False)
-
-        return html
-
-    def _highlight_code(self, match):
-        language = match.group(1)
-        code = match.group(2)
-
-        # Unescape HTML entities in code
-        import html
-        code = html.unescape(code)
-
-        # Map language aliases to Monaco language IDs
-        language_map = {
-            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-            'html': 'html', 'css': 'css', 'bash': 'shell', 'sh': 'shell',
-            'shell': 'shell', 'sql': 'sql', 'yaml': 'yaml', 'yml': 'yaml',
-            'json': 'json', 'xml': 'xml', 'dockerfile': 'dockerfile',
-            'docker': 'dockerfile', 'csharp': 'csharp', 'cs': 'csharp',
-            'cpp': 'cpp', 'c++': 'cpp', 'php': 'php',
-        }
-
-        monaco_language = language_map.get(language.lower(), language.lower())
-        escaped_code = html.escape(code)
-
-        return f'<div class="monaco-code-block" data-language="{monaco_language}" data-code="{escaped_code}"></div>'
+        # Sanitized once here, the stored HTML is safe to output as is.
+        # Questions are short, their code stays inline instead of in snippets.
+        return rendering.sanitize_html(rendering.render_markdown(markdown_text))
 
 class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers', verbose_name="Pytanie")
@@ -261,6 +304,7 @@ class Answer(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [models.Index(fields=['question', 'order'], name='answer_question_order_idx')]
         verbose_name = "Odpowiedź"
         verbose_name_plural = "Odpowiedzi"
 
@@ -292,10 +336,25 @@ class PracticalTask(models.Model):
     solution_markdown = models.TextField(blank=True, verbose_name="Rozwiązanie (Markdown)")
     solution_html = models.TextField(editable=False, blank=True, verbose_name="Rozwiązanie (HTML)")
 
+    renderer_version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Wersja renderera")
+
+    MARKDOWN_FIELDS = {
+        'content_markdown': 'content_html',
+        'instructions_markdown': 'instructions_html',
+        'example_markdown': 'example_html',
+        'hints_markdown': 'hints_html',
+        'solution_markdown': 'solution_html',
+    }
+    RENDERED_FIELDS = tuple(MARKDOWN_FIELDS.values()) + ('renderer_version',)
+
     class Meta:
         verbose_name = "Zadanie praktyczne"
         verbose_name_plural = "Zadania praktyczne"
 
+    @classmethod
+    def get_source_fields(cls):
+        return tuple(cls.MARKDOWN_FIELDS)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.title)
@@ -305,63 +364,22 @@ class PracticalTask(models.Model):
                 self.slug = f"{base_slug}-{counter}"
                 counter += 1
 
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.fenced_code',  # Removed codehilite for Monaco
-            'markdown.extensions.tables',
-            'markdown.extensions.toc'
-        ]
-
-        # Convert markdown to HTML and apply Monaco code highlighting
-        self.content_html = self._convert_markdown_with_monaco(self.content_markdown, extensions)
-        self.instructions_html = self._convert_markdown_with_monaco(self.instructions_markdown, extensions)
-        self.example_html = self._convert_markdown_with_monaco(self.example_markdown, extensions)
-        self.hints_html = self._convert_markdown_with_monaco(self.hints_markdown, extensions)
-        self.solution_html = self._convert_markdown_with_monaco(self.solution_markdown, extensions)
-
+        self.refresh_rendered_html()
+        CodeSnippet.store(self.code_snippets)
         super().save(*args, **kwargs)
 
-    def _convert_markdown_with_monaco(self, markdown_text, extensions):
-        """Convert markdown to HTML and replace code blocks with Monaco editor containers"""
-        if not markdown_text:
-            return ""
-
-        html = markdown.markdown(markdown_text, extensions=extensions)
-
-        # Replace code blocks with Monaco editor containers
-        pattern = re.compile(r'<pre><code class="language-(.*?)">(.*?)</code></pre>', re.DOTALL)
-        html = pattern.sub(self._highlight_code, html)
-
-        return html
-
-    def _highlight_code(self, match):
-        """Replace code block with Monaco editor container"""
-        language = match.group(1)
-        code = match.group(2)
-
-        # Unescape HTML entities in code
-        import html
-        code = html.unescape(code)
-
-        # Map language aliases to Monaco language IDs
-        language_map = {
-            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-            'html': 'html', 'css': 'css', 'bash': 'shell', 'sh': 'shell',
-            'shell': 'shell', 'sql': 'sql', 'yaml': 'yaml', 'yml': 'yaml',
-            'json': 'json', 'xml': 'xml', 'dockerfile': 'dockerfile',
-            'docker': 'dockerfile', 'csharp': 'csharp', 'cs': 'csharp',
-            'cpp': 'cpp', 'c++': 'cpp', 'php': 'php',
-        }
-
-        monaco_language = language_map.get(language.lower(), language.lower())
-        escaped_code = html.escape(code)
-
-        return f'<div class="monaco-code-block" data-language="{monaco_language}" data-code="{escaped_code}"></div>'
+    def refresh_rendered_html(self):
+        """Convert every markdown section to HTML with Monaco code blocks"""
+        self.code_snippets = {}
+        for source_field, html_field in self.MARKDOWN_FIELDS.items():
+            html = rendering.render_markdown(getattr(self, source_field), toc=True, snippets=self.code_snippets)
+            setattr(self, html_field, html)
+        self.renderer_version = rendering.RENDERER_VERSION
 
     def __str__(self):
         return self.title
 
-class BlogPost(models.Model):
+class BlogPost(RenderedMarkdownModel):
     title = models.CharField(max_length=200, verbose_name="Tytuł")
     slug = models.SlugField(max_length=200, unique=True, blank=True, verbose_name="Slug")
     short_description = models.TextField(max_length=300, verbose_name="Krótki opis")
@@ -371,9 +389,13 @@ class BlogPost(models.Model):
     is_published = models.BooleanField(default=True, verbose_name="Opublikowany")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Data aktualizacji")
+    toc = models.JSONField(default=list, editable=False, blank=True, verbose_name="Spis treści")
+
+    RENDERED_FIELDS = RenderedMarkdownModel.RENDERED_FIELDS + ('toc',)
 
     class Meta:
         ordering = ['-published_date']
+        indexes = [models.Index(fields=['is_published', '-published_date'], name='blogpost_published_date_idx')]
         verbose_name = "Post na blogu"
         verbose_name_plural = "Posty na blogu"
 
@@ -394,46 +416,10 @@ class BlogPost(models.Model):
 
     @property
     def content_html(self):
-        if not self.content_markdown:
-            return ""
-
-        extensions = [
-            'markdown.extensions.extra',
-            'markdown.extensions.fenced_code',  # Removed codehilite for Monaco
-            'markdown.extensions.tables',
-            'markdown.extensions.toc'
-        ]
-
-        html = markdown.markdown(self.content_markdown, extensions=extensions)
-
-        # Apply syntax highlighting
-        pattern = re.compile(r'<pre><code class="language-(.*?)">(.*?)</code></pre>', re.DOTALL)
-        html = pattern.sub(self._highlight_code, html)
-
-        return html
-
-    def _highlight_code(self, match):
-        language = match.group(1)
-        code = match.group(2)
-
-        # Unescape HTML entities in code
-        import html
-        code = html.unescape(code)
-
-        # Map language aliases to Monaco language IDs
-        language_map = {
-            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-            'html': 'html', 'css': 'css', 'bash': 'shell', 'sh': 'shell',
-            'shell': 'shell', 'sql': 'sql', 'yaml': 'yaml', 'yml': 'yaml',
-            'json': 'json', 'xml': 'xml', 'dockerfile': 'dockerfile',
-            'docker': 'dockerfile', 'csharp': 'csharp', 'cs': 'csharp',
-            'cpp': 'cpp', 'c++': 'cpp', 'php': 'php',
-        }
-
-        monaco_language = language_map.get(language.lower(), language.lower())
-        escaped_code = html.escape(code)
+        return self.get_rendered_html()
 
-        return f'<div class="monaco-code-block" data-language="{monaco_language}" data-code="{escaped_code}"></div>'
+    def render_markdown(self, markdown_text, snippets=None, toc_tokens=None):
+        return rendering.render_markdown(markdown_text, toc=True, snippets=snippets, toc_tokens=toc_tokens)
 
 class Project(models.Model):
     BADGE_CHOICES = [
@@ -488,6 +474,7 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [models.Index(fields=['is_active', 'order', '-created_at'], name='project_active_order_idx')]
         verbose_name = "Projekt"
         verbose_name_plural = "Projekty"
 
@@ -519,6 +506,7 @@ class VideoPlaylist(models.Model):
 
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [models.Index(fields=['is_active', 'order', '-created_at'], name='playlist_active_order_idx')]
         verbose_name = "Kurs wideo"
         verbose_name_plural = "Kursy wideo"
 
@@ -0,0 +1,214 @@
+"""
+Full-response cache for anonymous visitors of the public content pages.
+
+A cached view tags its page with the objects it shows (``lesson:12``,
+``course_lessons:3``, ``home``, ...) through ``tag_page``. Saving or
+deleting an object bumps only the tags listed for it in ``PURGE_GRAPH``,
+so e.g. a lesson edit purges that lesson's page, its course's lesson list,
+the course detail and the home page and keeps every other page cached.
+Tags are generation counters (see ``caching``), which also covers pages
+whose URL changed with a new slug.
+
+The same generations give the pages their ETag and Last-Modified
+validators (``conditional_page``), so repeat visitors and crawlers get a
+304 without the view running at all.
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils import timezone
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+from . import caching, rendering
+from .models import (
+    Answer, BlogPost, Course, Lesson, LessonContent, PracticalTask, Project, Question, Quiz, Tag, VideoPlaylist,
+)
+
+
+def page_key(request):
+    path = hashlib.md5(request.path.encode('utf-8')).hexdigest()
+    # A new renderer version or highlighting mode changes the served HTML without any save
+    language = get_language() or settings.LANGUAGE_CODE
+    return f'page:{rendering.RENDERER_VERSION}:{settings.CODE_HIGHLIGHT_MODE}:{language}:{path}'
+
+
+def tag_page(request, *tags):
+    """
+    Declares what a page shows. Call it right after loading the objects and
+    before rendering, so an edit made while rendering leaves the entry stale.
+    """
+    if hasattr(request, 'page_cache_tags'):
+        request.page_cache_tags += tags
+        request.page_cache_generations += caching.get_tag_generations(*tags)
+
+
+def anonymous_page_cache(view):
+    """Serves whole responses of ``view`` from the cache to anonymous GET requests"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.GET or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            tags, generations, response = entry
+            if caching.get_tag_generations(*tags) == generations:
+                return response
+
+        request.page_cache_tags = ()
+        request.page_cache_generations = ()
+        response = view(request, *args, **kwargs)
+        # Untagged pages could never be purged; pages setting cookies are personal
+        if (
+            request.page_cache_tags
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        ):
+            cache.set(
+                key,
+                (request.page_cache_tags, request.page_cache_generations, response),
+                settings.PAGE_CACHE_TIMEOUT,
+            )
+        return response
+    return wrapper
+
+
+def stamp_row(key, queryset, tags, *fields, models=()):
+    """
+    Returns ``(pk, updated_at, *fields)`` of the object a page shows, or None.
+    Found rows are cached with the generations of their page tags
+    (``tags(row)``), so any edit purging the page also drops the row and a
+    warm page is validated without a query.
+
+    Misses are cached too, for ``NEGATIVE_CACHE_TIMEOUT`` and under the
+    generations of ``models``, the models whose saves could make the object
+    appear. Made-up slugs then stop reaching the database until a matching
+    object may have been created. They are only kept in the worker's own
+    bounded LRU (``set_local``), so a flood of them never writes to the
+    shared cache nor evicts anything from it.
+    """
+    key = f'stamp:{hashlib.md5(key.encode("utf-8")).hexdigest()}'
+    model_generations = caching.get_generations(*models)
+    if cache.get_local(key) == model_generations:
+        return None
+
+    entry = cache.get(key)
+    if entry is not None:
+        row, generations = entry
+        if caching.get_tag_generations(*tags(row)) == generations:
+            return row
+
+    # Generations were read first, so an object created during the query leaves a stale miss
+    row = queryset.values_list('pk', 'updated_at', *fields).first()
+    if row is None:
+        cache.set_local(key, model_generations, settings.NEGATIVE_CACHE_TIMEOUT)
+    else:
+        cache.set(key, (row, caching.get_tag_generations(*tags(row))), settings.PAGE_CACHE_TIMEOUT)
+    return row
+
+
+def conditional_page(stamp):
+    """
+    Answers conditional GETs with 304 before the view (and its template)
+    runs. ``stamp(request, *args, **kwargs)`` does at most a small query and
+    returns ``(tags, models, updated_at)`` for the page, or None when it does
+    not exist (see ``stamp_row``); the latter is answered with a 404 right
+    away. The ETag hashes the generations of those page tags and
+    models; as generations are the time of the last edit, Last-Modified is
+    the newest of them and ``updated_at``.
+    """
+    def get_stamp(request, *args, **kwargs):
+        if not hasattr(request, 'page_stamp'):
+            request.page_stamp = None
+            # Same pages as anonymous_page_cache; others depend on more than the tags
+            if request.GET or request.user.is_authenticated:
+                return None
+            found = stamp(request, *args, **kwargs)
+            if found is None:
+                raise Http404("Page does not exist")
+            tags, models, updated_at = found
+            generations = caching.get_tag_generations(*tags) + caching.get_generations(*models)
+            version = (
+                f"{get_language()}:{settings.CODE_HIGHLIGHT_MODE}:{rendering.RENDERER_VERSION}:{tags}:{generations}"
+            )
+            changed = datetime.datetime.fromtimestamp(max(generations) / 1e9, tz=datetime.timezone.utc)
+            request.page_stamp = (
+                hashlib.md5(version.encode('utf-8')).hexdigest(),
+                max(changed, updated_at) if updated_at else changed,
+            )
+        return request.page_stamp
+
+    def etag(request, *args, **kwargs):
+        found = get_stamp(request, *args, **kwargs)
+        return found and found[0]
+
+    def last_modified(request, *args, **kwargs):
+        found = get_stamp(request, *args, **kwargs)
+        return found and min(found[1], timezone.now())
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _lesson_tags(lesson_id):
+    course_id = Lesson.objects.filter(pk=lesson_id).values_list('course_id', flat=True).first()
+    return [f'lesson:{lesson_id}', f'course_lessons:{course_id}']
+
+
+def _lesson_course_ids(lesson):
+    # Both courses when the lesson was moved to another one
+    return {lesson.course_id, getattr(lesson, '_saved_course_id', None) or lesson.course_id}
+
+
+def _question_quiz_tag(question_id):
+    quiz_id = Question.objects.filter(pk=question_id).values_list('quiz_id', flat=True).first()
+    return f'quiz:{quiz_id}'
+
+
+# Saved or deleted object -> tags of the pages showing it
+PURGE_GRAPH = {
+    Course: lambda course: [
+        f'course:{course.pk}', f'course_lessons:{course.pk}', f'course_card:{course.pk}', 'home',
+    ],
+    Tag: lambda tag: [f'tag:{tag.pk}', 'home'],
+    Lesson: lambda lesson: [f'lesson:{lesson.pk}', 'home'] + [
+        tag for course_id in _lesson_course_ids(lesson)
+        for tag in (f'course_lessons:{course_id}', f'course:{course_id}')
+    ],
+    LessonContent: lambda content: [f'lesson:{content.lesson_id}'],
+    # Lessons list badges and the home page quiz count
+    Quiz: lambda quiz: [f'quiz:{quiz.pk}'] + _lesson_tags(quiz.lesson_id) + ['home'],
+    Question: lambda question: [f'quiz:{question.quiz_id}'],
+    Answer: lambda answer: [_question_quiz_tag(answer.question_id)],
+    PracticalTask: lambda task: _lesson_tags(task.lesson_id),
+    BlogPost: lambda post: [f'blogpost:{post.pk}', 'home'],
+    Project: lambda project: ['home'],
+    VideoPlaylist: lambda playlist: ['home'],
+}
+
+
+def purge(instance):
+    tags_for = PURGE_GRAPH.get(type(instance))
+    if tags_for:
+        caching.bump_tags(*tags_for(instance))
+
+
+def purge_many(model, instances):
+    """``purge`` for rows written without signals (bulk_update), in one bump"""
+    tags_for = PURGE_GRAPH.get(model)
+    if tags_for:
+        caching.bump_tags(*{tag for instance in instances for tag in tags_for(instance)})
+
+
+def purge_course_tags(course, pk_set=None):
+    """Course tags changed: its pages and the courses suggesting it by tag"""
+    caching.bump_tags(
+        f'course:{course.pk}', f'course_card:{course.pk}', 'home',
+        *(f'tag:{pk}' for pk in pk_set or ()),
+    )
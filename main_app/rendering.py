@@ -0,0 +1,155 @@
+"""
+Shared markdown rendering engine used by every model that stores HTML
+generated from markdown (lessons, questions, practical tasks, blog posts).
+
+Building a ``markdown.Markdown`` instance registers all of its extensions,
+which is far more expensive than converting a short document. Instead of
+calling ``markdown.markdown()`` per document, each thread keeps one prepared
+instance per extension profile and resets it between documents.
+"""
+import hashlib
+import html as html_lib
+import re
+import threading
+from types import MappingProxyType
+
+import markdown
+from bleach.sanitizer import Cleaner
+
+from .markdown_extensions import MonacoExtension, SectionBreakExtension
+
+# Bump whenever the HTML produced for the same markdown source changes
+# (new extension, different code block markup, ...). Rows rendered with an
+# older version are re-rendered the next time their HTML is read.
+RENDERER_VERSION = 5
+
+BASE_EXTENSIONS = (
+    'markdown.extensions.extra',
+    'markdown.extensions.fenced_code',
+)
+
+TOC_EXTENSIONS = BASE_EXTENSIONS + (
+    'markdown.extensions.tables',
+    'markdown.extensions.toc',
+)
+
+# Rendered as an HTML comment before each top-level section heading
+SECTION_MARKER = 'section'
+SECTION_BREAK = f'<!--{SECTION_MARKER}-->'
+
+# Code block containers referencing a stored CodeSnippet
+SNIPPET_RE = re.compile(r'data-snippet="([0-9a-f]{64})"')
+
+# Map language aliases to Monaco language IDs
+MONACO_LANGUAGES = MappingProxyType({
+    'py': 'python', 'js': 'javascript', 'ts': 'typescript',
+    'html': 'html', 'css': 'css', 'bash': 'shell', 'sh': 'shell',
+    'shell': 'shell', 'sql': 'sql', 'yaml': 'yaml', 'yml': 'yaml',
+    'json': 'json', 'xml': 'xml', 'dockerfile': 'dockerfile',
+    'docker': 'dockerfile', 'csharp': 'csharp', 'cs': 'csharp',
+    'cpp': 'cpp', 'c++': 'cpp', 'php': 'php',
+})
+
+# Safe subset of the markdown output allowed in question HTML
+SANITIZER_TAGS = frozenset({
+    'p', 'br', 'strong', 'em', 'u', 'code', 'pre', 'blockquote',
+    'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'a', 'div', 'span', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
+})
+SANITIZER_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    # class and data-* carry the monaco-code-block containers
+    'div': ['class', 'data-language', 'data-code'],
+    'span': ['class'],
+    'code': ['class'],
+    'pre': ['class'],
+}
+
+_local = threading.local()
+
+
+def source_hash(text):
+    """Returns a stable hash of a markdown source, used to detect edits."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def get_markdown(toc=False):
+    """Returns this thread's prepared Markdown instance for the given profile"""
+    attr = 'toc' if toc else 'base'
+    md = getattr(_local, attr, None)
+    if md is None:
+        extensions = list(TOC_EXTENSIONS if toc else BASE_EXTENSIONS)
+        extensions.append(MonacoExtension(language_map=MONACO_LANGUAGES))
+        if toc:
+            extensions.append(SectionBreakExtension(marker=SECTION_MARKER))
+        md = markdown.Markdown(extensions=extensions)
+        setattr(_local, attr, md)
+    return md
+
+
+def get_cleaner():
+    """
+    Returns this thread's bleach Cleaner. The Cleaner is built once from the
+    module-level tables and reused; bleach's parser keeps internal state, so
+    instances must not be shared between threads.
+    """
+    cleaner = getattr(_local, 'cleaner', None)
+    if cleaner is None:
+        cleaner = Cleaner(tags=SANITIZER_TAGS, attributes=SANITIZER_ATTRIBUTES, strip=False)
+        _local.cleaner = cleaner
+    return cleaner
+
+
+def sanitize_html(html):
+    """Strips everything outside the allowed tags and attributes"""
+    if not html:
+        return ""
+    return get_cleaner().clean(html)
+
+
+def render_markdown(text, toc=False, snippets=None, toc_tokens=None):
+    """
+    Convert markdown to HTML with code blocks as Monaco editor containers.
+    With a ``snippets`` dict the code of each block is collected there by
+    digest and the containers only reference it (see ``CodeSnippet``).
+    With ``toc=True`` and a ``toc_tokens`` list, the table of contents built
+    during the same pass is appended to it (see ``compact_toc``).
+    """
+    if not text:
+        return ""
+
+    md = get_markdown(toc)
+    md.code_snippets = snippets
+    try:
+        output = md.convert(text)
+        if toc and toc_tokens is not None:
+            toc_tokens.extend(compact_toc(md.toc_tokens))
+        return output
+    finally:
+        md.code_snippets = None
+        md.reset()
+
+
+def compact_toc(tokens):
+    """
+    Reduces the toc extension's tokens to what outlines need:
+    ``{"id", "title", "level"}`` plus ``"children"`` when there are any.
+    Titles are plain text.
+    """
+    entries = []
+    for token in tokens:
+        entry = {'id': token['id'], 'title': html_lib.unescape(token['name']), 'level': token['level']}
+        if token['children']:
+            entry['children'] = compact_toc(token['children'])
+        entries.append(entry)
+    return entries
+
+
+def snippet_digests(html):
+    """Returns the digests of the snippets referenced by rendered HTML, in order"""
+    return list(dict.fromkeys(SNIPPET_RE.findall(html or "")))
+
+
+def split_sections(html):
+    """Splits HTML rendered with toc=True into its top-level sections"""
+    return [section for section in html.split(SECTION_BREAK) if section.strip()]
@@ -0,0 +1,70 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from . import page_cache, similarity
+from .caching import bump_generation
+from .models import (
+    Answer, BlogPost, Course, Lesson, LessonContent, PracticalTask,
+    Project, Question, Quiz, Tag, VideoPlaylist,
+)
+
+# Models whose edits invalidate cached values (see caching.get_or_set).
+# CodeSnippet rows are immutable and need no generation.
+CACHED_MODELS = (
+    Tag, Course, Lesson, LessonContent, Quiz, Question, Answer,
+    PracticalTask, BlogPost, Project, VideoPlaylist,
+)
+
+
+def bump_model_generation(sender, instance, **kwargs):
+    bump_generation(sender)
+    page_cache.purge(instance)
+
+
+def bump_course_tags_generation(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # post_clear comes without pk_set, so remember what the clear removes
+        related = instance.course_set if reverse else instance.tags
+        instance._cleared_pks = list(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = instance._cleared_pks
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(Course, Tag)
+        if reverse:
+            # tag.course_set changed, instance is the tag
+            for course in Course.objects.filter(pk__in=pk_set or ()):
+                page_cache.purge_course_tags(course, [instance.pk])
+                similarity.rebuild_course(course.pk)
+            page_cache.purge(instance)
+        else:
+            page_cache.purge_course_tags(instance, pk_set)
+            similarity.rebuild_course(instance.pk)
+
+
+def rebuild_course_similarity(sender, instance, created, **kwargs):
+    # New courses get their tags (and similarities) through m2m_changed.
+    # Courses not loaded from the database (or with is_active deferred) are rebuilt.
+    if not created and getattr(instance, '_was_active', None) != instance.is_active:
+        similarity.rebuild_course(instance.pk)
+    instance._was_active = instance.is_active
+
+
+def remember_tag_courses(sender, instance, **kwargs):
+    # Deleting a tag removes its course links without m2m_changed
+    instance._course_ids = list(instance.course_set.values_list('pk', flat=True))
+
+
+def rebuild_tag_similarity(sender, instance, **kwargs):
+    for course_id in instance._course_ids:
+        similarity.rebuild_course(course_id)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(bump_model_generation, sender=model, dispatch_uid=f'bump_generation_save_{model.__name__}')
+    post_delete.connect(bump_model_generation, sender=model, dispatch_uid=f'bump_generation_delete_{model.__name__}')
+
+m2m_changed.connect(bump_course_tags_generation, sender=Course.tags.through, dispatch_uid='bump_generation_course_tags')
+
+post_save.connect(rebuild_course_similarity, sender=Course, dispatch_uid='similarity_course_save')
+pre_delete.connect(remember_tag_courses, sender=Tag, dispatch_uid='similarity_tag_courses')
+post_delete.connect(rebuild_tag_similarity, sender=Tag, dispatch_uid='similarity_tag_delete')
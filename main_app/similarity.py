@@ -0,0 +1,82 @@
+"""
+Precomputed "suggested courses" of the course detail page.
+
+Two active courses are similar when they share tags; their score is the
+Jaccard index of their tag sets (shared tags / all tags of both). Scores
+are stored in ``CourseSimilarity`` in both directions, so the page reads
+its top suggestions with one indexed query. A course's rows are rebuilt
+when its tags or ``is_active`` change, which only touches the courses
+sharing a tag with it.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import caching
+from .models import Course, CourseSimilarity
+
+CourseTag = Course.tags.through
+
+
+def jaccard(tags, other_tags):
+    return len(tags & other_tags) / len(tags | other_tags)
+
+
+def similar_pairs(course_id, tags, tag_sets):
+    """``(course, similar, score)`` rows of a course against ``{course_id: tags}`` in both directions"""
+    for other_id, other_tags in tag_sets.items():
+        if other_id != course_id and tags & other_tags:
+            score = jaccard(tags, other_tags)
+            yield course_id, other_id, score
+            yield other_id, course_id, score
+
+
+def _tag_sets(course_tags):
+    tag_sets = defaultdict(set)
+    for course_id, tag_id in course_tags:
+        tag_sets[course_id].add(tag_id)
+    return tag_sets
+
+
+def rebuild_course(course_id):
+    """Recomputes the similarities of one course after its tags or activity changed"""
+    with transaction.atomic():
+        rows = CourseSimilarity.objects.filter(course_id=course_id)
+        affected = set(rows.values_list('similar_id', flat=True))
+        rows.delete()
+        CourseSimilarity.objects.filter(similar_id=course_id).delete()
+
+        tags = set(CourseTag.objects.filter(
+            course_id=course_id, course__is_active=True
+        ).values_list('tag_id', flat=True))
+        if tags:
+            # Only courses sharing a tag can score above zero
+            neighbours = CourseTag.objects.filter(
+                tag_id__in=tags, course__is_active=True
+            ).exclude(course_id=course_id).values('course_id')
+            tag_sets = _tag_sets(
+                CourseTag.objects.filter(course_id__in=neighbours).values_list('course_id', 'tag_id')
+            )
+            CourseSimilarity.objects.bulk_create([
+                CourseSimilarity(course_id=course, similar_id=similar, score=score)
+                for course, similar, score in similar_pairs(course_id, tags, tag_sets)
+            ])
+            affected |= set(tag_sets)
+
+    # Pages suggesting (or no longer suggesting) this course
+    caching.bump_tags(*(f'course:{pk}' for pk in affected))
+
+
+def rebuild_all():
+    """Recomputes every similarity"""
+    tag_sets = _tag_sets(CourseTag.objects.filter(course__is_active=True).values_list('course_id', 'tag_id'))
+    rows = {}
+    for course_id, tags in tag_sets.items():
+        for course, similar, score in similar_pairs(course_id, tags, tag_sets):
+            rows[course, similar] = score
+    with transaction.atomic():
+        CourseSimilarity.objects.all().delete()
+        CourseSimilarity.objects.bulk_create(
+            [CourseSimilarity(course_id=course, similar_id=similar, score=score) for (course, similar), score in rows.items()],
+            batch_size=1000,
+        )
@@ -1,27 +1,93 @@
 document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('searchInput');
     const filterTags = document.querySelectorAll('.filter-tag');
-    const courseCards = document.querySelectorAll('.course-card');
-    
+    const matchOptions = document.querySelectorAll('.filter-match-option');
+    const grid = document.querySelector('.courses-grid');
+    const moreLink = document.querySelector('.courses-more');
+
+    // Tag filtering and paging happen on the server (/api/courses/),
+    // the search box only filters the cards already loaded
+    const selectedTags = new Set(
+        Array.from(filterTags).filter(t => t.classList.contains('active') && t.dataset.filter !== 'all')
+            .map(t => t.dataset.filter)
+    );
+    let match = document.querySelector('.filter-match-option.active')?.dataset.match || 'any';
+
     if (searchInput) {
         searchInput.addEventListener('input', filterCourses);
     }
-    
+
     filterTags.forEach(tag => {
         tag.addEventListener('click', function() {
-            filterTags.forEach(t => t.classList.remove('active'));
-            this.classList.add('active');
-            filterCourses();
+            const slug = this.dataset.filter;
+            if (slug === 'all') {
+                selectedTags.clear();
+            } else if (selectedTags.has(slug)) {
+                selectedTags.delete(slug);
+            } else {
+                selectedTags.add(slug);
+            }
+            filterTags.forEach(t => t.classList.toggle(
+                'active', t.dataset.filter === 'all' ? selectedTags.size === 0 : selectedTags.has(t.dataset.filter)
+            ));
+            loadCourses();
         });
     });
-    
+
+    matchOptions.forEach(option => {
+        option.addEventListener('click', function() {
+            match = this.dataset.match;
+            matchOptions.forEach(o => o.classList.toggle('active', o === this));
+            if (selectedTags.size > 1) {
+                loadCourses();
+            }
+        });
+    });
+
+    if (moreLink) {
+        moreLink.addEventListener('click', function(event) {
+            event.preventDefault();
+            loadCourses(this.dataset.next);
+        });
+    }
+
+    function catalogQuery(after) {
+        const params = new URLSearchParams();
+        selectedTags.forEach(slug => params.append('tag', slug));
+        if (match === 'all') {
+            params.set('match', 'all');
+        }
+        if (after) {
+            params.set('after', after);
+        }
+        return params;
+    }
+
+    async function loadCourses(after) {
+        const response = await fetch(`${grid.dataset.api}?${catalogQuery(after)}`);
+        if (!response.ok) {
+            return;
+        }
+        const data = await response.json();
+        if (!after) {
+            grid.innerHTML = '';
+            history.replaceState(null, '', `?${catalogQuery()}`);
+        }
+        grid.insertAdjacentHTML('beforeend', data.html);
+        grid.querySelectorAll('.course-card').forEach(card => card.classList.add('revealed'));
+
+        moreLink.dataset.next = data.next || '';
+        moreLink.href = data.next ? `?${catalogQuery(data.next)}` : '#';
+        moreLink.style.display = data.next ? '' : 'none';
+        filterCourses();
+    }
+
     function filterCourses() {
         const searchTerm = searchInput ? searchInput.value.toLowerCase() : '';
-        const activeFilter = document.querySelector('.filter-tag.active').dataset.filter;
         
         let visibleCount = 0;
         
-        courseCards.forEach(card => {
+        grid.querySelectorAll('.course-card').forEach(card => {
             const title = card.querySelector('.course-title').textContent.toLowerCase();
             const description = card.querySelector('.course-description').textContent.toLowerCase();
             const tags = card.dataset.tags.toLowerCase();
@@ -30,10 +96,7 @@ document.addEventListener('DOMContentLoaded', function() {
                                 description.includes(searchTerm) || 
                                 tags.includes(searchTerm);
             
-            const matchesFilter = activeFilter === 'all' || 
-                                tags.includes(activeFilter);
-            
-            if (matchesSearch && matchesFilter) {
+            if (matchesSearch) {
                 card.style.display = 'flex';
                 card.classList.add('revealed'); // Ensure revealed class for filtered cards
                 visibleCount++;
@@ -42,10 +105,9 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
         
-        const emptyMessage = document.querySelector('.course-grid-empty');
+        const emptyMessage = grid.querySelector('.course-grid-empty');
         if (visibleCount === 0) {
             if (!emptyMessage) {
-                const grid = document.querySelector('.courses-grid');
                 const message = document.createElement('div');
                 message.className = 'course-grid-empty';
                 message.innerHTML = '<p>Brak kursów spełniających kryteria wyszukiwania</p>';
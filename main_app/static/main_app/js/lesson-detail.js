@@ -78,4 +78,89 @@ document.addEventListener('DOMContentLoaded', function() {
     revealElements.forEach(element => {
         scrollRevealObserver.observe(element);
     });
-});
\ No newline at end of file
+
+    // Sectioned lessons: fetch the remaining sections as the reader scrolls
+    const sectionContainer = document.querySelector('.lesson-sections');
+    const sectionPlaceholders = Array.from(document.querySelectorAll('.lesson-section-placeholder'));
+    if (sectionContainer && sectionPlaceholders.length) {
+        let loadingSection = null;
+
+        const sectionObserver = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextSection();
+            }
+        }, {
+            rootMargin: '0px 0px 1200px 0px'
+        });
+
+        function loadNextSection() {
+            if (loadingSection) {
+                return loadingSection;
+            }
+            const placeholder = sectionPlaceholders[0];
+            if (!placeholder) {
+                return Promise.resolve(false);
+            }
+            sectionObserver.unobserve(placeholder);
+
+            loadingSection = fetch(placeholder.dataset.sectionUrl)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}`);
+                    }
+                    return response.text();
+                })
+                .then(html => {
+                    const fragment = document.createElement('template');
+                    fragment.innerHTML = html;
+                    // Code of the section's snippets, see _cache_lesson_sections
+                    fragment.content.querySelectorAll('script[type="application/json"]').forEach(script => {
+                        if (window.addCodeSnippets) {
+                            window.addCodeSnippets(JSON.parse(script.textContent));
+                        }
+                        script.remove();
+                    });
+                    placeholder.replaceWith(fragment.content);
+                    sectionPlaceholders.shift();
+
+                    if (window.initMonacoBlocks) {
+                        window.initMonacoBlocks(sectionContainer);
+                    }
+                    loadingSection = null;
+                    if (sectionPlaceholders.length) {
+                        sectionObserver.observe(sectionPlaceholders[0]);
+                    }
+                    return true;
+                })
+                .catch(err => {
+                    console.error('Błąd ładowania sekcji lekcji: ', err);
+                    loadingSection = null;
+                    return false;
+                });
+            return loadingSection;
+        }
+
+        // Links to anchors in sections that are not loaded yet
+        function revealHashTarget() {
+            const id = decodeURIComponent(window.location.hash.slice(1));
+            if (!id || document.getElementById(id) || !sectionPlaceholders.length) {
+                return;
+            }
+            loadNextSection().then(loaded => {
+                if (!loaded) {
+                    return;
+                }
+                const target = document.getElementById(id);
+                if (target) {
+                    target.scrollIntoView();
+                } else {
+                    revealHashTarget();
+                }
+            });
+        }
+
+        sectionObserver.observe(sectionPlaceholders[0]);
+        window.addEventListener('hashchange', revealHashTarget);
+        revealHashTarget();
+    }
+});
@@ -2,131 +2,245 @@
 (function() {
     'use strict';
 
-    // Wait for Monaco to load
-    function initMonaco() {
-        require.config({
-            paths: {
-                'vs': 'https://cdn.jsdelivr.net/npm/monaco-editor@0.45.0/min/vs'
-            }
-        });
+    let monacoLoaded = null;
+    let editorCounter = 0;
+    let pageSnippets = null;
 
-        require(['vs/editor/editor.main'], function() {
-            // Check if dark mode is active - check both body and html
-            const isDarkMode = document.body.classList.contains('dark-mode') ||
-                              document.documentElement.classList.contains('dark-mode');
-            const theme = isDarkMode ? 'vs-dark' : 'vs';
+    // URL of the snippet endpoint with a DIGEST placeholder
+    const snippetUrl = document.currentScript ? document.currentScript.getAttribute('data-snippet-url') : null;
 
-            console.log('Monaco initializing with theme:', theme, 'isDarkMode:', isDarkMode);
+    const monacoBase = 'https://cdn.jsdelivr.net/npm/monaco-editor@0.45.0/min/vs';
 
-            // Find all Monaco code blocks
-            const codeBlocks = document.querySelectorAll('.monaco-code-block');
+    // Pages with statically highlighted code do not include the Monaco loader
+    function loadMonacoLoader() {
+        if (typeof require !== 'undefined' && require.config) {
+            return Promise.resolve();
+        }
 
-            codeBlocks.forEach((block, index) => {
-                const language = block.getAttribute('data-language') || 'plaintext';
-                const code = block.getAttribute('data-code') || '';
+        const styles = document.createElement('link');
+        styles.rel = 'stylesheet';
+        styles.href = `${monacoBase}/editor/editor.main.css`;
+        document.head.appendChild(styles);
 
-                // Decode HTML entities
-                const decodedCode = decodeHTMLEntities(code);
+        return new Promise(function(resolve, reject) {
+            const script = document.createElement('script');
+            script.src = `${monacoBase}/loader.js`;
+            script.onload = resolve;
+            script.onerror = reject;
+            document.head.appendChild(script);
+        });
+    }
 
-                // Create container with unique ID
-                const editorId = `monaco-editor-${index}`;
-                const lineCount = decodedCode.split('\n').length;
+    // Load Monaco once, then resolve for every caller
+    function loadMonaco() {
+        if (!monacoLoaded) {
+            monacoLoaded = loadMonacoLoader().then(() => new Promise(function(resolve) {
+                require.config({
+                    paths: {
+                        'vs': monacoBase
+                    }
+                });
 
-                // Add class based on line count
-                let containerClass = 'monaco-editor-container';
-                if (lineCount === 1) {
-                    containerClass += ' single-line';
-                } else if (lineCount === 2) {
-                    containerClass += ' two-lines';
-                }
+                require(['vs/editor/editor.main'], function() {
+                    // Listen for theme changes
+                    observeThemeChanges();
+                    resolve();
+                });
+            }));
+        }
+        return monacoLoaded;
+    }
 
-                block.innerHTML = `<div id="${editorId}" class="${containerClass}"></div>`;
-
-                // Get the container
-                const container = document.getElementById(editorId);
-
-                // Adjust height based on line count
-                const lineHeight = 22;  // Increased to match Monaco's actual line height
-                let calculatedHeight;
-                if (lineCount === 1) {
-                    calculatedHeight = 55;  // Compact for single line with padding
-                } else if (lineCount === 2) {
-                    calculatedHeight = 75;  // Medium for 2 lines with padding
-                } else {
-                    const minHeight = 100;
-                    const padding = 60;  // Extra padding for editor chrome
-                    // No max height - auto-adjust to content with extra padding
-                    calculatedHeight = Math.max(minHeight, lineCount * lineHeight + padding);
-                }
+    function currentTheme() {
+        // Check if dark mode is active - check both body and html
+        const isDarkMode = document.body.classList.contains('dark-mode') ||
+                          document.documentElement.classList.contains('dark-mode');
+        return isDarkMode ? 'vs-dark' : 'vs';
+    }
 
-                container.style.height = `${calculatedHeight}px`;
-
-                // Create editor
-                const editor = monaco.editor.create(container, {
-                    value: decodedCode,
-                    language: language,
-                    theme: theme,
-                    readOnly: true,
-                    minimap: { enabled: false },
-                    scrollBeyondLastLine: false,
-                    lineNumbers: 'on',
-                    glyphMargin: false,
-                    folding: true,
-                    lineDecorationsWidth: 0,
-                    lineNumbersMinChars: 3,
-                    renderLineHighlight: 'none',
-                    overviewRulerLanes: 0,
-                    hideCursorInOverviewRuler: true,
-                    overviewRulerBorder: false,
-                    automaticLayout: true,
-                    fontSize: 14,
-                    fontFamily: "'Fira Code', 'Consolas', 'Monaco', 'Courier New', monospace",
-                    fontLigatures: true,
-                    contextmenu: false,
-                    wordWrap: 'off',
-                    // Completely disable vertical scrolling to prevent scroll blocking
-                    scrollbar: {
-                        vertical: 'hidden',
-                        horizontal: 'auto',
-                        useShadows: false,
-                        horizontalScrollbarSize: 10,
-                        alwaysConsumeMouseWheel: false,  // Don't capture mouse wheel events
-                        handleMouseWheel: false  // Don't handle mouse wheel at all
-                    }
+    // Snippets shipped with the page, keyed by digest
+    function getPageSnippets() {
+        if (pageSnippets === null) {
+            const script = document.getElementById('code-snippets');
+            pageSnippets = script ? JSON.parse(script.textContent) : {};
+        }
+        return pageSnippets;
+    }
+
+    // Code of a block: inline, shipped with the page or fetched by digest
+    function getBlockCode(block) {
+        const digest = block.getAttribute('data-snippet');
+        if (!digest) {
+            // Decode HTML entities
+            return Promise.resolve(decodeHTMLEntities(block.getAttribute('data-code') || ''));
+        }
+
+        const snippets = getPageSnippets();
+        if (digest in snippets) {
+            return Promise.resolve(snippets[digest]);
+        }
+        if (!snippetUrl) {
+            return Promise.resolve('');
+        }
+        return fetch(snippetUrl.replace('DIGEST', digest))
+            .then((response) => response.ok ? response.text() : '')
+            .then((code) => {
+                snippets[digest] = code;
+                return code;
+            });
+    }
+
+    // Statically highlighted blocks only get Monaco once the reader wants to edit them
+    function initStaticBlocks(root) {
+        root.querySelectorAll('.static-code-block:not([data-monaco-ready])').forEach((block) => {
+            block.setAttribute('data-monaco-ready', '');
+            const language = block.getAttribute('data-language') || 'plaintext';
+            const pre = block.querySelector('pre');
+            const code = pre ? pre.textContent : '';
+
+            const editBtn = document.createElement('button');
+            editBtn.className = 'monaco-copy-btn monaco-edit-btn';
+            editBtn.innerHTML = '<i class="fas fa-pen"></i>';
+            editBtn.setAttribute('aria-label', 'Edytuj kod');
+            editBtn.addEventListener('click', function() {
+                editBtn.disabled = true;
+                loadMonaco().then(function() {
+                    createEditor(block, language, code, currentTheme(), false);
                 });
+            });
 
-                // Prevent Monaco's scrollable overlay from capturing scroll events
-                // This fixes the issue where page scroll gets blocked when mouse is over code blocks
-                setTimeout(() => {
-                    const domNode = editor.getDomNode();
-                    if (domNode) {
-                        // Find Monaco's scrollable element and disable vertical scroll capture
-                        const scrollableElement = domNode.querySelector('.monaco-scrollable-element');
-                        if (scrollableElement) {
-                            scrollableElement.style.overflowY = 'hidden';
-                        }
-                    }
-                }, 150);
+            block.appendChild(editBtn);
+            addCopyButton(block, code);
+        });
+    }
 
-                // Adjust height to actual content after layout
-                setTimeout(() => {
-                    const contentHeight = editor.getContentHeight();
-                    container.style.height = `${contentHeight}px`;
-                    editor.layout();
-                }, 100);
+    // Turn every not yet initialized code block under root into an editor
+    function initMonaco(root) {
+        root = root || document;
+        initStaticBlocks(root);
+
+        const selector = '.monaco-code-block:not([data-monaco-ready])';
+        if (!root.querySelector(selector)) {
+            return;
+        }
+
+        loadMonaco().then(function() {
+            const theme = currentTheme();
 
-                // Store editor reference for theme updates
-                block.monacoEditor = editor;
+            // Find all Monaco code blocks
+            const codeBlocks = root.querySelectorAll(selector);
+
+            codeBlocks.forEach((block) => {
+                block.setAttribute('data-monaco-ready', '');
+                const language = block.getAttribute('data-language') || 'plaintext';
 
-                // Add copy button
-                addCopyButton(block, decodedCode);
+                getBlockCode(block).then((decodedCode) => {
+                    createEditor(block, language, decodedCode, theme, true);
+                });
             });
+        });
+    }
+
+    function createEditor(block, language, decodedCode, theme, readOnly) {
+        // Create container with unique ID
+        const editorId = `monaco-editor-${editorCounter++}`;
+        const lineCount = decodedCode.split('\n').length;
+
+        // Add class based on line count
+        let containerClass = 'monaco-editor-container';
+        if (lineCount === 1) {
+            containerClass += ' single-line';
+        } else if (lineCount === 2) {
+            containerClass += ' two-lines';
+        }
+
+        block.innerHTML = `<div id="${editorId}" class="${containerClass}"></div>`;
 
-            // Listen for theme changes
-            observeThemeChanges();
+        // Get the container
+        const container = document.getElementById(editorId);
+
+        // Adjust height based on line count
+        const lineHeight = 22;  // Increased to match Monaco's actual line height
+        let calculatedHeight;
+        if (lineCount === 1) {
+            calculatedHeight = 55;  // Compact for single line with padding
+        } else if (lineCount === 2) {
+            calculatedHeight = 75;  // Medium for 2 lines with padding
+        } else {
+            const minHeight = 100;
+            const padding = 60;  // Extra padding for editor chrome
+            // No max height - auto-adjust to content with extra padding
+            calculatedHeight = Math.max(minHeight, lineCount * lineHeight + padding);
+        }
+
+        container.style.height = `${calculatedHeight}px`;
+
+        // Create editor
+        const editor = monaco.editor.create(container, {
+            value: decodedCode,
+            language: language,
+            theme: theme,
+            readOnly: readOnly,
+            minimap: { enabled: false },
+            scrollBeyondLastLine: false,
+            lineNumbers: 'on',
+            glyphMargin: false,
+            folding: true,
+            lineDecorationsWidth: 0,
+            lineNumbersMinChars: 3,
+            renderLineHighlight: 'none',
+            overviewRulerLanes: 0,
+            hideCursorInOverviewRuler: true,
+            overviewRulerBorder: false,
+            automaticLayout: true,
+            fontSize: 14,
+            fontFamily: "'Fira Code', 'Consolas', 'Monaco', 'Courier New', monospace",
+            fontLigatures: true,
+            contextmenu: false,
+            wordWrap: 'off',
+            // Completely disable vertical scrolling to prevent scroll blocking
+            scrollbar: {
+                vertical: 'hidden',
+                horizontal: 'auto',
+                useShadows: false,
+                horizontalScrollbarSize: 10,
+                alwaysConsumeMouseWheel: false,  // Don't capture mouse wheel events
+                handleMouseWheel: false  // Don't handle mouse wheel at all
+            }
         });
+
+        // Prevent Monaco's scrollable overlay from capturing scroll events
+        // This fixes the issue where page scroll gets blocked when mouse is over code blocks
+        setTimeout(() => {
+            const domNode = editor.getDomNode();
+            if (domNode) {
+                // Find Monaco's scrollable element and disable vertical scroll capture
+                const scrollableElement = domNode.querySelector('.monaco-scrollable-element');
+                if (scrollableElement) {
+                    scrollableElement.style.overflowY = 'hidden';
+                }
+            }
+        }, 150);
+
+        // Adjust height to actual content after layout
+        setTimeout(() => {
+            const contentHeight = editor.getContentHeight();
+            container.style.height = `${contentHeight}px`;
+            editor.layout();
+        }, 100);
+
+        // Store editor reference for theme updates
+        block.monacoEditor = editor;
+
+        // Add copy button
+        addCopyButton(block, decodedCode);
     }
 
+    // Used by pages that insert code blocks after load (e.g. lesson sections)
+    window.initMonacoBlocks = initMonaco;
+    // Snippets shipped with a lazily loaded lesson section
+    window.addCodeSnippets = (snippets) => Object.assign(getPageSnippets(), snippets);
+
     // Decode HTML entities
     function decodeHTMLEntities(text) {
         const textarea = document.createElement('textarea');
@@ -196,8 +310,10 @@
 
     // Initialize when DOM and Monaco are ready
     if (document.readyState === 'loading') {
-        document.addEventListener('DOMContentLoaded', initMonaco);
+        document.addEventListener('DOMContentLoaded', function() {
+            initMonaco(document);
+        });
     } else {
-        initMonaco();
+        initMonaco(document);
     }
 })();
@@ -0,0 +1,51 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from main_app.caching import get_generations
+from main_app.models import Tag
+
+register = template.Library()
+
+# Card name -> (template, relations prefetched for cards that are rendered,
+# related models whose edits do not touch the object's updated_at)
+CARDS = {
+    'course': ('main_app/cards/course_card.html', ('tags',), (Tag,)),
+    'post': ('main_app/cards/post_card.html', (), ()),
+    'playlist': ('main_app/cards/playlist_card.html', (), ()),
+    'project': ('main_app/cards/project_card.html', (), ()),
+}
+
+
+def card_key(name, obj, generations):
+    version = "-".join(str(generation) for generation in generations)
+    return f'card:{name}:{obj.pk}:{obj.updated_at.timestamp()}:{version}'
+
+
+@register.simple_tag
+def cached_cards(objects, name):
+    """
+    Renders a card per object, reusing cards cached under the object's
+    updated_at. All cards of a grid are read with a single get_many, and
+    only the missing ones are rendered (and their relations prefetched).
+
+    Usage: {% cached_cards courses 'course' %}
+    """
+    template_name, prefetch, related_models = CARDS[name]
+    objects = list(objects)
+    generations = get_generations(*related_models) if related_models else ()
+    keys = [card_key(name, obj, generations) for obj in objects]
+    cards = cache.get_many(keys)
+
+    missing = [(key, obj) for key, obj in zip(keys, objects) if key not in cards]
+    if missing:
+        if prefetch:
+            prefetch_related_objects([obj for _, obj in missing], *prefetch)
+        rendered = {key: render_to_string(template_name, {name: obj}) for key, obj in missing}
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+
+    return mark_safe("".join(cards[key] for key in keys))
@@ -0,0 +1,27 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from main_app.highlighting import get_style_css, highlight_code_blocks, static_highlighting_enabled
+
+register = template.Library()
+
+
+@register.filter(name='code_blocks')
+def code_blocks(value, snippets=None):
+    """
+    Outputs stored markdown HTML, highlighting its code blocks on the server
+    when CODE_HIGHLIGHT_MODE is 'static'.
+
+    Usage: {{ lesson.content_html|code_blocks:code_snippets }}
+    """
+    if static_highlighting_enabled():
+        value = highlight_code_blocks(value, snippets)
+    return mark_safe(value or "")
+
+
+@register.simple_tag
+def code_highlight_css():
+    """Inline Pygments styles for statically highlighted code blocks"""
+    if not static_highlighting_enabled():
+        return ""
+    return mark_safe(f"<style>{get_style_css()}</style>")
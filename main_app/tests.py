@@ -5,7 +5,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from datetime import date, datetime
 from .models import (
     Tag, Course, Lesson, LessonContent, Quiz, Question, Answer,
-    PracticalTask, BlogPost, VideoPlaylist
+    PracticalTask, BlogPost, VideoPlaylist, CodeSnippet, CourseSimilarity
 )
 import shutil
 import tempfile
@@ -155,7 +155,8 @@ class LessonModelTest(TestCase):
             content_markdown="```python\nprint('Hello World')\n```"
         )
         html = lesson.content_html
-        self.assertIn("print", html)
+        self.assertIn('data-snippet="', html)
+        self.assertIn("print('Hello World')", "".join(CodeSnippet.for_html(html).values()))
 
     def test_lesson_ordering(self):
         """Test that Lessons are ordered by order field"""
@@ -179,7 +180,8 @@ class LessonModelTest(TestCase):
             order=3,
             content_markdown="> [!NOTE]\n> To jest notatka\n\nInna treść"
         )
-        self.assertIn('class="callout note"', lesson.content_markdown)
+        self.assertIn('class="callout note"', lesson.content_html)
+        self.assertEqual(lesson.content_markdown, "> [!NOTE]\n> To jest notatka\n\nInna treść")
 
     def test_lesson_special_warning_block(self):
         """Test special WARNING callout block processing"""
@@ -190,7 +192,7 @@ class LessonModelTest(TestCase):
             order=4,
             content_markdown="> [!WARNING]\n> To jest ostrzeżenie\n\nInna treść"
         )
-        self.assertIn('class="callout warning"', lesson.content_markdown)
+        self.assertIn('class="callout warning"', lesson.content_html)
 
     def test_lesson_special_danger_block(self):
         """Test special DANGER callout block processing"""
@@ -201,7 +203,7 @@ class LessonModelTest(TestCase):
             order=5,
             content_markdown="> [!DANGER]\n> To jest niebezpieczne\n\nInna treść"
         )
-        self.assertIn('class="callout danger"', lesson.content_markdown)
+        self.assertIn('class="callout danger"', lesson.content_html)
 
 
 class QuizModelTest(TestCase):
@@ -466,6 +468,609 @@ class BlogPostModelTest(TestCase):
         self.assertNotEqual(self.blog_post.slug, blog_post2.slug)
 
 
+class RenderedHtmlStorageTest(TestCase):
+    """Tests for HTML rendered from markdown and stored on the row"""
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Test Course",
+            slug="test-course",
+            short_description="Test",
+            description="Test description"
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course,
+            title="Lekcja",
+            slug="lekcja",
+            order=1,
+            content_markdown="# Nagłówek\n\nTreść lekcji"
+        )
+
+    def test_html_is_rendered_on_save(self):
+        """Test that saving stores the rendered HTML, hash and renderer version"""
+        from .rendering import RENDERER_VERSION, source_hash
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertIn("<p>Treść lekcji</p>", lesson.rendered_html)
+        self.assertEqual(lesson.source_hash, source_hash(lesson.content_markdown))
+        self.assertEqual(lesson.renderer_version, RENDERER_VERSION)
+
+    def test_toc_stored_with_rendered_html(self):
+        """Test that the table of contents is captured by the same render and stored"""
+        self.lesson.content_markdown = "# Wstęp\n\n## Zmienne & *typy*\n\n### Liczby\n\n## Pętle"
+        self.lesson.save()
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertEqual(lesson.toc, [{
+            'id': 'wstep', 'title': 'Wstęp', 'level': 1, 'children': [
+                {'id': 'zmienne-typy', 'title': 'Zmienne & typy', 'level': 2, 'children': [
+                    {'id': 'liczby', 'title': 'Liczby', 'level': 3},
+                ]},
+                {'id': 'petle', 'title': 'Pętle', 'level': 2},
+            ],
+        }])
+        self.assertIn('id="zmienne-typy"', lesson.rendered_html)
+
+    def test_blog_post_toc_filled_on_stale_read(self):
+        """Test that rows rendered before the TOC existed get it on their next read"""
+        post = BlogPost.objects.create(
+            title="Post", short_description="Opis", author_name="Autor",
+            published_date=date.today(), content_markdown="## Pierwszy\n\n## Drugi"
+        )
+        BlogPost.objects.filter(pk=post.pk).update(toc=[], renderer_version=0)
+        post = BlogPost.objects.get(pk=post.pk)
+        post.content_html
+        self.assertEqual([entry['id'] for entry in BlogPost.objects.get(pk=post.pk).toc], ['pierwszy', 'drugi'])
+
+    def test_content_html_served_from_row_without_rendering(self):
+        """Test that an up-to-date row is not re-rendered on read"""
+        from unittest import mock
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        with mock.patch.object(Lesson, 'render_markdown') as render:
+            with self.assertNumQueries(0):
+                html = lesson.content_html
+        render.assert_not_called()
+        self.assertIn("<h1", html)
+
+    def test_source_changed_outside_save_is_rerendered(self):
+        """Test that a source edit bypassing save() is picked up lazily"""
+        Lesson.objects.filter(pk=self.lesson.pk).update(content_markdown="Nowa treść")
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertIn("<p>Nowa treść</p>", lesson.content_html)
+        self.assertIn("<p>Nowa treść</p>", Lesson.objects.get(pk=self.lesson.pk).rendered_html)
+
+    def test_renderer_version_bump_rerenders(self):
+        """Test that rows rendered by an older renderer are refreshed on read"""
+        from .rendering import RENDERER_VERSION
+        Lesson.objects.filter(pk=self.lesson.pk).update(renderer_version=0, rendered_html="stale")
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertIn("<p>Treść lekcji</p>", lesson.content_html)
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).renderer_version, RENDERER_VERSION)
+
+    def test_lazy_rerender_keeps_updated_at(self):
+        """Test that writing back re-rendered HTML does not touch updated_at"""
+        Lesson.objects.filter(pk=self.lesson.pk).update(renderer_version=0)
+        before = Lesson.objects.get(pk=self.lesson.pk).updated_at
+        Lesson.objects.get(pk=self.lesson.pk).content_html
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).updated_at, before)
+
+    def test_save_with_update_fields_persists_html(self):
+        """Test that save(update_fields=...) also stores the refreshed HTML"""
+        self.lesson.content_markdown = "Zmieniona treść"
+        self.lesson.save(update_fields=['content_markdown'])
+        self.assertIn("Zmieniona treść", Lesson.objects.get(pk=self.lesson.pk).rendered_html)
+
+    def test_blog_post_and_question_are_stored(self):
+        """Test that BlogPost and Question share the stored HTML mechanism"""
+        post = BlogPost.objects.create(
+            title="Post",
+            short_description="Test",
+            author_name="Test",
+            published_date=date.today(),
+            content_markdown="Treść **posta**"
+        )
+        quiz = Quiz.objects.create(lesson=self.lesson, title="Quiz")
+        question = Question.objects.create(quiz=quiz, text="Co to jest `print`?", order=1)
+        self.assertIn("<strong>posta</strong>", BlogPost.objects.get(pk=post.pk).rendered_html)
+        self.assertIn("<code>print</code>", Question.objects.get(pk=question.pk).rendered_html)
+
+
+class RenderingEngineTest(TestCase):
+    """Tests for the shared markdown rendering engine"""
+
+    def test_markdown_instance_reused_per_thread(self):
+        """Test that the same prepared Markdown instance serves every document"""
+        from . import rendering
+        self.assertIs(rendering.get_markdown(toc=True), rendering.get_markdown(toc=True))
+        self.assertIsNot(rendering.get_markdown(toc=True), rendering.get_markdown())
+
+    def test_state_does_not_leak_between_documents(self):
+        """Test that the instance is reset between documents"""
+        from . import rendering
+        first = rendering.render_markdown("# Title\n\n[link][ref]\n\n[ref]: https://example.com", toc=True)
+        second = rendering.render_markdown("# Title\n\n[link][ref]", toc=True)
+        self.assertIn('href="https://example.com"', first)
+        self.assertNotIn('href="https://example.com"', second)
+        self.assertIn('id="title"', second)
+
+    def test_code_block_language_alias(self):
+        """Test that language aliases are mapped to Monaco language IDs"""
+        from . import rendering
+        html = rendering.render_markdown("```py\nx = '<a>'\n```")
+        self.assertIn('data-language="python"', html)
+        self.assertIn('data-code="x = &#x27;&lt;a&gt;&#x27;\n"', html)
+
+    def test_callout_rendered_from_blockquote(self):
+        """Test that callouts keep their markdown source and render inner markdown"""
+        from . import rendering
+        source = "> [!NOTE]\n> To jest *notatka*\n\nInna treść"
+        html = rendering.render_markdown(source)
+        self.assertIn('<div class="callout note">\n<p>To jest <em>notatka</em></p>\n</div>', html)
+        self.assertNotIn('<blockquote>', html)
+
+    def test_plain_blockquote_untouched(self):
+        """Test that blockquotes without a callout marker stay blockquotes"""
+        from . import rendering
+        self.assertIn('<blockquote>', rendering.render_markdown("> Zwykły cytat"))
+
+    def test_code_block_without_language(self):
+        """Test that fenced code without a language keeps the default markup"""
+        from . import rendering
+        html = rendering.render_markdown("```\n<b>kod</b>\n```")
+        self.assertIn('<pre><code>&lt;b&gt;kod&lt;/b&gt;\n</code></pre>', html)
+        self.assertNotIn('monaco-code-block', html)
+
+    def test_code_block_with_attribute_syntax(self):
+        """Test that ``{.lang}`` fences also become Monaco containers"""
+        from . import rendering
+        html = rendering.render_markdown("~~~{.js}\nlet a = 1;\n~~~")
+        self.assertIn('data-language="javascript"', html)
+
+    def test_language_table_is_frozen(self):
+        """Test that the language table cannot be modified at runtime"""
+        from . import rendering
+        with self.assertRaises(TypeError):
+            rendering.MONACO_LANGUAGES['py'] = 'other'
+
+
+class CodeSnippetTest(TestCase):
+    """Tests for content-addressed code snippets"""
+
+    CODE = "print('<b>Hello</b>')\n"
+
+    def setUp(self):
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="Kod", order=1,
+            content_markdown=f"# Kod\n\n```py\n{self.CODE}```"
+        )
+
+    def test_code_stored_once_across_lessons(self):
+        """Test that the same code in two lessons is stored as one snippet"""
+        Lesson.objects.create(
+            course=self.course, title="Kod 2", order=2,
+            content_markdown=f"Inny tekst\n\n```python\n{self.CODE}```"
+        )
+        self.assertEqual(CodeSnippet.objects.count(), 1)
+        snippet = CodeSnippet.objects.get()
+        self.assertEqual(snippet.code, self.CODE)
+        self.assertIn(f'data-snippet="{snippet.digest}"', self.lesson.content_html)
+        self.assertNotIn('data-code', self.lesson.content_html)
+
+    def test_lesson_page_embeds_snippets(self):
+        """Test that the lesson page ships its snippets as one JSON blob"""
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lesson.slug]))
+        self.assertContains(response, 'id="code-snippets"')
+        self.assertContains(response, "print(\'\\u003Cb\\u003EHello")
+
+    def test_snippet_endpoint_is_immutable(self):
+        """Test that snippets are served as plain text with an immutable Cache-Control"""
+        digest = CodeSnippet.objects.get().digest
+        response = self.client.get(reverse('code_snippet', args=[digest]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), self.CODE)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_unknown_snippet(self):
+        """Test that an unknown digest returns 404"""
+        response = self.client.get(reverse('code_snippet', args=['0' * 64]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_stale_render_stores_snippets(self):
+        """Test that re-rendering on read stores the snippets it references"""
+        CodeSnippet.objects.all().delete()
+        Lesson.objects.filter(pk=self.lesson.pk).update(renderer_version=0)
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertEqual(list(CodeSnippet.for_html(lesson.content_html).values()), [self.CODE])
+
+    def test_question_code_stays_inline(self):
+        """Test that question HTML keeps its code inline"""
+        quiz = Quiz.objects.create(lesson=self.lesson, title="Quiz")
+        question = Question.objects.create(quiz=quiz, text=f"```py\n{self.CODE}```")
+        self.assertIn('data-code="', question.text_html)
+
+
+@override_settings(CODE_HIGHLIGHT_MODE='static')
+class StaticHighlightingTest(TestCase):
+    """Tests for server-side highlighting of code blocks"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="Kod", order=1,
+            content_markdown="# Kod\n\n```py\ndef hello():\n    return '<b>'\n```"
+        )
+
+    def test_lesson_page_skips_monaco(self):
+        """Test that the lesson page ships highlighted code and no Monaco loader"""
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lesson.slug]))
+        self.assertContains(response, 'class="monaco-code-block static-code-block"')
+        self.assertContains(response, '<span class="k">def</span>')
+        self.assertContains(response, '&#39;&lt;b&gt;&#39;')
+        self.assertNotContains(response, 'vs/loader.js')
+        self.assertNotContains(response, 'id="code-snippets"')
+
+    @override_settings(CODE_HIGHLIGHT_MODE='monaco')
+    def test_monaco_mode_unchanged(self):
+        """Test that Monaco mode keeps empty containers and the loader"""
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lesson.slug]))
+        self.assertNotContains(response, 'static-code-block')
+        self.assertContains(response, 'vs/loader.js')
+
+    def test_highlighted_blocks_are_cached(self):
+        """Test that a block is highlighted once per language and code"""
+        from unittest import mock
+        from . import highlighting
+        snippets = CodeSnippet.for_html(self.lesson.content_html)
+        with mock.patch.object(highlighting, 'highlight_code', wraps=highlighting.highlight_code) as highlight:
+            first = highlighting.highlight_code_blocks(self.lesson.content_html, snippets)
+            second = highlighting.highlight_code_blocks(self.lesson.content_html, snippets)
+        self.assertEqual(first, second)
+        self.assertEqual(highlight.call_count, 1)
+
+    def test_inline_question_code_highlighted(self):
+        """Test that inline question code is highlighted and unknown languages fall back to text"""
+        from .highlighting import highlight_code_blocks
+        quiz = Quiz.objects.create(lesson=self.lesson, title="Quiz")
+        question = Question.objects.create(quiz=quiz, text="```nieznany\nx < 1\n```")
+        html = highlight_code_blocks(question.text_html)
+        self.assertIn('<div class="highlight"><pre>', html)
+        self.assertIn('x &lt; 1', html)
+
+    def test_missing_snippet_left_for_browser(self):
+        """Test that a container whose snippet is unknown is left untouched"""
+        from .highlighting import highlight_code_blocks
+        self.assertEqual(highlight_code_blocks(self.lesson.content_html, {}), self.lesson.content_html)
+
+
+@override_settings(LESSON_SECTION_THRESHOLD=0, LESSON_INITIAL_SECTIONS=1)
+class LessonSectionsTest(TestCase):
+    """Tests for sectioned delivery of long lessons"""
+
+    def setUp(self):
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course,
+            title="Długa lekcja",
+            content_markdown=(
+                "# Tytuł\n\nWstęp\n\n## Pierwsza\n\nTreść 1\n\n"
+                "> ## Cytat\n\n## Druga\n\nTreść 2\n\n## Trzecia\n\nTreść 3"
+            ),
+            order=1
+        )
+
+    def section_url(self, index, version=None):
+        url = reverse('lesson_section', args=[self.course.slug, self.lesson.slug, index])
+        return f"{url}?v={version if version is not None else self.lesson.section_version}"
+
+    def test_sections_split_on_top_level_headings(self):
+        """Test that sections start at top-level headings only, not at nested ones"""
+        sections = self.lesson.get_sections()
+        self.assertEqual(len(sections), 4)
+        self.assertIn('Wstęp', sections[0])
+        self.assertIn('Cytat', sections[1])
+        self.assertIn('id="trzecia"', sections[3])
+
+    def test_lesson_page_renders_placeholders(self):
+        """Test that only the first sections are inlined and the rest are placeholders"""
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lesson.slug]))
+        self.assertContains(response, 'Wstęp')
+        self.assertNotContains(response, 'Treść 3')
+        self.assertContains(response, 'class="lesson-section-placeholder"', count=3)
+        self.assertContains(response, self.section_url(3))
+
+    @override_settings(LESSON_SECTION_THRESHOLD=10 ** 6)
+    def test_short_lesson_not_sectioned(self):
+        """Test that lessons below the threshold are rendered in full"""
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lesson.slug]))
+        self.assertContains(response, 'Treść 3')
+        self.assertNotContains(response, 'lesson-section-placeholder')
+
+    def test_highlight_mode_in_section_version(self):
+        """Test that switching the highlighting mode changes the immutable section URLs"""
+        version = self.lesson.section_version
+        with override_settings(CODE_HIGHLIGHT_MODE='static'):
+            self.assertNotEqual(self.lesson.section_version, version)
+            response = self.client.get(self.section_url(2, version))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_section_endpoint_is_immutable(self):
+        """Test that a section with the current version is cacheable forever"""
+        response = self.client.get(self.section_url(2))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Treść 2')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_outdated_version_not_cached(self):
+        """Test that an outdated version gets the current section without caching"""
+        response = self.client.get(self.section_url(2, version='0-stale'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Treść 2')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_section_out_of_range(self):
+        """Test that a section index past the end returns 404"""
+        response = self.client.get(self.section_url(10))
+        self.assertEqual(response.status_code, 404)
+
+    def test_section_ships_its_snippets(self):
+        """Test that a deferred section carries the code of its own code blocks only"""
+        import json
+        import re
+        self.lesson.content_markdown += "\n\n```py\nprint('druga')\n```\n\n## Czwarta\n\n```py\nprint(4)\n```"
+        self.lesson.save()
+        response = self.client.get(self.section_url(3))
+        blob = re.search(r'<script type="application/json">(.*?)</script>', response.content.decode(), re.S)
+        self.assertEqual(list(json.loads(blob.group(1)).values()), ["print('druga')\n"])
+        # Cached sections keep their snippets
+        self.assertContains(self.client.get(self.section_url(3)), 'application/json')
+        self.assertNotContains(self.client.get(self.section_url(2)), 'application/json')
+
+
+class RerenderCommandTest(TestCase):
+    """Tests for the rerender management command"""
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Test Course",
+            slug="test-course",
+            short_description="Test",
+            description="Test"
+        )
+        self.other_course = Course.objects.create(
+            title="Other Course",
+            slug="other-course",
+            short_description="Test",
+            description="Test"
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="Lekcja", slug="lekcja", order=1,
+            content_markdown="```py\nprint(1)\n```"
+        )
+        self.other_lesson = Lesson.objects.create(
+            course=self.other_course, title="Lekcja", slug="lekcja", order=1,
+            content_markdown="Inna lekcja"
+        )
+        self.task = PracticalTask.objects.create(
+            lesson=self.lesson, title="Zadanie", content_markdown="Treść", hints_markdown="**Wskazówka**"
+        )
+        Lesson.objects.update(rendered_html="", renderer_version=0)
+        PracticalTask.objects.update(hints_html="", renderer_version=0)
+
+    def rerender(self, *args, **kwargs):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('rerender', *args, workers=1, stdout=out, **kwargs)
+        return out.getvalue()
+
+    def test_rerender_purges_cached_pages(self):
+        """Test that re-rendered rows are not served from the anonymous page cache"""
+        from django.core.cache import cache
+        cache.clear()
+        url = reverse('lesson_detail', args=[self.course.slug, self.lesson.slug])
+        self.assertContains(self.client.get(url), 'monaco-code-block')
+        # Written without signals, like a renderer change
+        Lesson.objects.filter(pk=self.lesson.pk).update(
+            content_markdown="Nowa treść", rendered_html="", source_hash="", renderer_version=0
+        )
+        self.assertNotContains(self.client.get(url), "Nowa treść")
+        self.rerender('--stale', '--model', 'lesson')
+        self.assertContains(self.client.get(url), "Nowa treść")
+
+    def test_renderer_version_in_page_key(self):
+        """Test that pages cached by another renderer version are not served"""
+        from unittest import mock
+        from django.test import RequestFactory
+        from .page_cache import page_key
+        request = RequestFactory().get('/course/test-course/lekcja/')
+        key = page_key(request)
+        with mock.patch('main_app.rendering.RENDERER_VERSION', 999):
+            self.assertNotEqual(page_key(request), key)
+        with override_settings(CODE_HIGHLIGHT_MODE='static'):
+            self.assertNotEqual(page_key(request), key)
+
+    def test_rerender_stores_code_snippets(self):
+        """Test that the snippets referenced by re-rendered rows are stored"""
+        CodeSnippet.objects.all().delete()
+        self.rerender('--model', 'lesson')
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertEqual(list(CodeSnippet.for_html(lesson.rendered_html).values()), ["print(1)\n"])
+
+    def test_rerender_all_models(self):
+        """Test that every stale row is re-rendered and written back"""
+        from .rendering import RENDERER_VERSION
+        output = self.rerender()
+        self.assertIn("Re-rendered", output)
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertIn('monaco-code-block', lesson.rendered_html)
+        self.assertEqual(lesson.renderer_version, RENDERER_VERSION)
+        task = PracticalTask.objects.get(pk=self.task.pk)
+        self.assertIn("<strong>Wskazówka</strong>", task.hints_html)
+        self.assertEqual(task.renderer_version, RENDERER_VERSION)
+
+    def test_rerender_filtered_by_model_and_course(self):
+        """Test that --model and --course limit the re-rendered rows"""
+        self.rerender(model=['lesson'], course='test-course')
+        self.assertEqual(Lesson.objects.get(pk=self.other_lesson.pk).rendered_html, "")
+        self.assertNotEqual(Lesson.objects.get(pk=self.lesson.pk).rendered_html, "")
+        self.assertEqual(PracticalTask.objects.get(pk=self.task.pk).hints_html, "")
+
+    def test_rerender_stale_only(self):
+        """Test that --stale skips rows rendered by the current renderer"""
+        from .rendering import RENDERER_VERSION
+        Lesson.objects.filter(pk=self.other_lesson.pk).update(renderer_version=RENDERER_VERSION)
+        self.rerender(model=['lesson'], stale=True)
+        self.assertEqual(Lesson.objects.get(pk=self.other_lesson.pk).rendered_html, "")
+        self.assertNotEqual(Lesson.objects.get(pk=self.lesson.pk).rendered_html, "")
+
+    def test_rerender_keeps_updated_at(self):
+        """Test that bulk re-rendering does not touch updated_at"""
+        before = Lesson.objects.get(pk=self.lesson.pk).updated_at
+        self.rerender(model=['lesson'])
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).updated_at, before)
+
+    def test_rerender_with_process_pool(self):
+        """Test rendering across worker processes"""
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('rerender', model=['lesson'], workers=2, chunk_size=1, stdout=StringIO())
+        self.assertIn('monaco-code-block', Lesson.objects.get(pk=self.lesson.pk).rendered_html)
+
+
+class BenchmarkRenderingCommandTest(TestCase):
+    """Tests for the benchmark_rendering management command"""
+
+    def run_benchmark(self, **kwargs):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command(
+            'benchmark_rendering', iterations=2, target=['lesson'], kind=['code'], size=['small'],
+            stdout=out, **kwargs
+        )
+        return out.getvalue()
+
+    def test_results_saved_and_compared(self):
+        """Test that results are written as JSON and can be compared with a later run"""
+        import json
+        path = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.run_benchmark(output=path)
+        with open(path) as f:
+            report = json.load(f)
+        stats = report['results']['lesson/code/small']
+        for key in ('p50_ms', 'p90_ms', 'p99_ms', 'peak_alloc_bytes', 'output_bytes'):
+            self.assertIn(key, stats)
+        self.assertGreater(stats['output_bytes'], 0)
+
+        output = self.run_benchmark(compare=path, threshold=1000)
+        self.assertIn("Compared with", output)
+        self.assertNotIn("REGRESSION", output)
+
+    def test_fail_on_regression(self):
+        """Test that a slower run than the baseline fails with --fail-on-regression"""
+        import json
+        from django.core.management.base import CommandError
+        path = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        with open(path, 'w') as f:
+            json.dump({'results': {'lesson/code/small': {
+                'p50_ms': 0.000001, 'peak_alloc_bytes': 1, 'output_bytes': 1,
+            }}}, f)
+        with self.assertRaises(CommandError):
+            self.run_benchmark(compare=path, fail_on_regression=True)
+
+
+
+class BenchmarkQueriesCommandTest(TestCase):
+    """Tests for the benchmark_queries management command"""
+
+    def test_seeded_queries_measured(self):
+        """Test that every benchmarked query returns rows from the seeded tables and has a plan"""
+        from main_app.management.commands.benchmark_queries import QUERIES, measure, seed
+        seed(40, lambda line: None)
+        for name, queryset_for in QUERIES.items():
+            self.assertTrue(list(queryset_for()), name)
+            stats = measure(queryset_for, 2)
+            self.assertGreaterEqual(stats['p90_ms'], stats['p50_ms'])
+            self.assertTrue(stats['plan'])
+
+    def test_indexes_declared(self):
+        """Test that the hot filter/order paths have composite indexes"""
+        self.assertEqual(Lesson._meta.indexes[0].fields, ['course', 'order'])
+        self.assertEqual(Course._meta.indexes[0].fields, ['is_active', '-created_at'])
+        self.assertEqual(BlogPost._meta.indexes[0].fields, ['is_published', '-published_date'])
+
+
+class WarmCacheCommandTest(TestCase):
+    """Tests for the warm_cache management command"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title="Pierwsza", order=1, content_markdown="Treść")
+        Quiz.objects.create(lesson=self.lesson, title="Quiz")
+        PracticalTask.objects.create(lesson=self.lesson, title="Zadanie", content_markdown="Treść")
+        self.post = BlogPost.objects.create(
+            title="Post", short_description="Opis", author_name="Autor",
+            published_date=date.today(), content_markdown="Treść posta"
+        )
+
+    def warm(self, **kwargs):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('warm_cache', concurrency=1, verbosity=2, stdout=out, stderr=StringIO(), **kwargs)
+        return out.getvalue()
+
+    def test_all_public_pages_warmed(self):
+        """Test that every public page is requested and later served from the cache"""
+        output = self.warm()
+        for url in (
+            reverse('home'), reverse('course_detail', args=['python']), reverse('course_lessons', args=['python']),
+            self.lesson.get_absolute_url(), reverse('quiz_detail', args=['python', self.lesson.slug]),
+            reverse('practical_task_detail', args=['python', self.lesson.slug]),
+            reverse('blog_post_detail', args=[self.post.slug]),
+        ):
+            self.assertIn(f"200 {url} ", output)
+        self.assertIn("Warmed 8/8 pages", output)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.lesson.get_absolute_url())
+
+    def test_access_log_orders_by_popularity(self):
+        """Test that pages with the most hits in the access log are warmed first"""
+        lesson_url = self.lesson.get_absolute_url()
+        path = os.path.join(tempfile.mkdtemp(), 'access.log')
+        line = '1.2.3.4 - - [17/Oct/2026:10:00:00 +0000] "GET {} HTTP/1.1" 200 512 "-" "Mozilla"\n'
+        with open(path, 'w') as f:
+            f.write(line.format(lesson_url) * 3 + line.format('/blog/' + self.post.slug + '/?ref=x') * 2)
+        lines = [line.split()[1] for line in self.warm(access_log=path).splitlines() if line.startswith("  ")]
+        self.assertEqual(lines[:3], [lesson_url, reverse('blog_post_detail', args=[self.post.slug]), '/'])
+
+    def test_time_budget(self):
+        """Test that no new pages are started once the time budget is used up"""
+        output = self.warm(time_budget=0)
+        self.assertIn("8 pages left cold", output)
+        self.assertIn("Warmed 0/8 pages", output)
+
+    def test_inactive_course_skipped(self):
+        """Test that pages of inactive courses are not warmed"""
+        self.course.is_active = False
+        self.course.save()
+        self.assertIn("Warmed 3/3 pages", self.warm())
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class VideoPlaylistModelTest(TestCase):
     """Tests for VideoPlaylist model"""
@@ -657,8 +1262,8 @@ class ViewsTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'main_app/quiz_detail.html')
-        self.assertEqual(response.context['quiz'], self.quiz)
-        self.assertIn(self.question, response.context['questions'])
+        self.assertEqual(response.context['quiz']['title'], self.quiz.title)
+        self.assertIn(self.question.id, [question['id'] for question in response.context['questions']])
 
     def test_quiz_submit_get_redirects(self):
         """Test that GET request to quiz_submit redirects"""
@@ -1029,6 +1634,283 @@ class CourseDetailViewTest(TestCase):
         self.assertEqual(self.course.get_absolute_url(), expected_url)
 
 
+class CourseSimilarityTest(TestCase):
+    """Tests for the precomputed course similarities"""
+
+    def setUp(self):
+        self.tags = [Tag.objects.create(name=f"Tag {i}", slug=f"tag-{i}") for i in range(4)]
+        self.course = self.create_course("main", 0, 1, 2)
+
+    def create_course(self, slug, *tag_indexes):
+        course = Course.objects.create(
+            title=slug, slug=slug, short_description="Opis", description="Opis", is_active=True
+        )
+        course.tags.add(*(self.tags[i] for i in tag_indexes))
+        return course
+
+    def suggested(self):
+        response = self.client.get(reverse('course_detail', args=[self.course.slug]))
+        return [course.slug for course in response.context['suggested_courses']]
+
+    def test_ranked_by_jaccard(self):
+        """Test that suggestions are ordered by tag overlap and skip courses without shared tags"""
+        self.create_course("one-of-four", 0, 3)
+        self.create_course("two-of-three", 0, 1)
+        self.create_course("same", 0, 1, 2)
+        self.create_course("unrelated", 3)
+        self.assertEqual(self.suggested(), ["same", "two-of-three", "one-of-four"])
+        score = CourseSimilarity.objects.get(course=self.course, similar__slug="two-of-three").score
+        self.assertAlmostEqual(score, 2 / 3)
+        self.assertFalse(CourseSimilarity.objects.filter(course=self.course, similar__slug="unrelated").exists())
+
+    def test_rebuilt_on_tag_and_activity_changes(self):
+        """Test that tag edits, deactivation and tag deletion update the similarities"""
+        other = self.create_course("other", 3)
+        self.assertEqual(self.suggested(), [])
+
+        other.tags.add(self.tags[0])
+        self.assertEqual(self.suggested(), ["other"])
+        self.tags[0].course_set.remove(other)
+        self.assertEqual(self.suggested(), [])
+
+        other.tags.add(self.tags[1])
+        other.is_active = False
+        other.save()
+        self.assertEqual(self.suggested(), [])
+        other.is_active = True
+        other.save()
+        self.assertEqual(self.suggested(), ["other"])
+
+        self.tags[1].delete()
+        self.assertEqual(self.suggested(), [])
+
+    def test_save_without_activity_change_skips_rebuild(self):
+        """Test that saving a course reads its previous activity from the loaded row, not a query"""
+        course = Course.objects.get(pk=self.course.pk)
+        course.title = "Nowy tytuł"
+        with self.assertNumQueries(1):
+            course.save()
+
+    def test_rebuilt_on_clear(self):
+        """Test that clearing the m2m from either side drops the similarities and purges the pages"""
+        other = self.create_course("other", 0)
+        self.assertEqual(self.suggested(), ["other"])
+        self.tags[0].course_set.clear()
+        self.assertEqual(self.suggested(), [])
+        self.assertFalse(CourseSimilarity.objects.exists())
+
+        other.tags.add(self.tags[1], self.tags[2])
+        self.create_course("third", 1)
+        self.assertEqual(self.suggested(), ["other", "third"])
+        other.tags.clear()
+        self.assertEqual(self.suggested(), ["third"])
+        self.assertFalse(CourseSimilarity.objects.filter(course=other).exists())
+
+    def test_suggestions_in_one_query(self):
+        """Test that suggestions are read with a single query however many courses share tags"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for i in range(10):
+            self.create_course(f"course-{i}", i % 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('course_detail', args=[self.course.slug]))
+        self.assertEqual(len([q for q in queries if 'main_app_coursesimilarity' in q['sql']]), 1)
+
+    def test_rebuild_all(self):
+        """Test that a full rebuild produces the same rows as the incremental updates"""
+        from main_app.similarity import rebuild_all
+        self.create_course("a", 0, 3)
+        self.create_course("b", 1, 3)
+        rows = set(CourseSimilarity.objects.values_list('course_id', 'similar_id', 'score'))
+        rebuild_all()
+        self.assertEqual(set(CourseSimilarity.objects.values_list('course_id', 'similar_id', 'score')), rows)
+
+
+class CourseLessonsQueryCountTest(TestCase):
+    """Tests that the lesson listing costs the same number of queries for any course size"""
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+
+    def add_lessons(self, count):
+        start = self.course.lessons.count()
+        for i in range(start, start + count):
+            lesson = Lesson.objects.create(
+                course=self.course, title=f"Lekcja {i}", slug=f"lekcja-{i}", order=i, content_markdown="Treść"
+            )
+            if i % 2 == 0:
+                Quiz.objects.create(lesson=lesson, title="Quiz")
+            if i % 3 == 0:
+                PracticalTask.objects.create(lesson=lesson, title="Zadanie", content_markdown="Treść")
+
+    def get_listing(self):
+        from django.core.cache import cache
+        cache.clear()
+        # Page stamp, course and lessons with their badge flags
+        with self.assertNumQueries(3):
+            return self.client.get(reverse('course_lessons', args=[self.course.slug]))
+
+    def test_query_count_constant(self):
+        """Test that 1 and 40 lessons are listed with the same queries"""
+        self.add_lessons(1)
+        self.get_listing()
+        self.add_lessons(39)
+        response = self.get_listing()
+        self.assertContains(response, 'class="lesson-card"', count=40)
+
+    def test_badges(self):
+        """Test that quiz and task badges come from the annotations"""
+        self.add_lessons(6)
+        response = self.get_listing()
+        self.assertContains(response, "fa-solid fa-question", count=3)
+        self.assertContains(response, "fa-solid fa-code", count=2)
+        self.assertContains(response, self.course.lessons.get(order=5).get_absolute_url())
+
+    def test_markdown_not_loaded(self):
+        """Test that the listing does not load the lesson markdown"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.add_lessons(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('course_lessons', args=[self.course.slug]))
+        self.assertFalse(any('content_markdown' in query['sql'] for query in queries))
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Visits every public route with a cold cache at growing data sizes and
+    checks that no page needs more queries as the data grows. Set
+    QUERY_BUDGET_REPORT to a file path to save the query counts and timings.
+    """
+
+    SCALES = (10, 100, 1000)
+
+    # Routes not worth measuring, with the reason
+    SKIPPED = {}
+
+    def setUp(self):
+        from django.core.cache import cache
+        self.cache = cache
+        self.tags = [Tag.objects.create(name=f"Tag {i}", slug=f"tag-{i}") for i in range(5)]
+        self.course = self.add_course(0)
+        self.other_courses = 0
+        self.snippet = CodeSnippet.objects.create(digest='a' * 64, code="print(1)").digest
+
+    def add_course(self, i):
+        course = Course.objects.create(
+            title=f"Kurs {i}", slug=f"kurs-{i}", short_description="Opis", description="Opis", is_active=True
+        )
+        course.tags.set(self.tags[i % 5:i % 5 + 2])
+        return course
+
+    def grow(self, scale):
+        """Tops the data up to ``scale`` lessons in the course, scale / 10 other courses and posts"""
+        start = self.course.lessons.count()
+        lessons = Lesson.objects.bulk_create([
+            Lesson(
+                course=self.course, title=f"Lekcja {i}", slug=f"lekcja-{i}", order=i,
+                content_markdown=f"# Lekcja {i}\n\n## Wstęp\n\nTreść\n\n```py\nprint({i})\n```\n\n## Koniec\n\nTreść"
+            )
+            for i in range(start, scale)
+        ])
+        quizzes = Quiz.objects.bulk_create([Quiz(lesson=lesson, title="Quiz") for lesson in lessons[::2]])
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, text=f"Pytanie {i}?", order=i) for quiz in quizzes for i in range(3)
+        ])
+        Answer.objects.bulk_create([
+            Answer(question=question, text=f"Odpowiedź {i}", is_correct=i == 0, order=i)
+            for question in questions for i in range(3)
+        ])
+        PracticalTask.objects.bulk_create([
+            PracticalTask(lesson=lesson, title="Zadanie", slug=f"zadanie-{lesson.order}", content_markdown="Napisz `print`")
+            for lesson in lessons[::3]
+        ])
+
+        while self.other_courses < scale // 10:
+            self.other_courses += 1
+            course = self.add_course(self.other_courses)
+            Lesson.objects.create(course=course, title="Lekcja", slug="lekcja", order=0, content_markdown="Treść")
+            BlogPost.objects.create(
+                title=f"Post {self.other_courses}", short_description="Opis", author_name="Autor",
+                published_date=date.today(), content_markdown="Treść posta"
+            )
+            VideoPlaylist.objects.create(
+                title=f"Playlista {self.other_courses}", description="Opis", thumbnail="playlists/x.jpg",
+                youtube_playlist_url="https://www.youtube.com/playlist?list=x"
+            )
+
+    def routes(self):
+        """Route name -> (method, URL, POST data)"""
+        lesson = Lesson.objects.get(course=self.course, slug="lekcja-0")
+        question = Question.objects.filter(quiz__lesson=lesson).first()
+        post = BlogPost.objects.order_by('pk').first()
+        lesson_args = [self.course.slug, lesson.slug]
+        return {
+            'home': ('get', reverse('home'), None),
+            'courses': ('get', reverse('courses'), None),
+            'courses_api': ('get', reverse('courses_api') + '?tag=tag-0&tag=tag-1', None),
+            'course_detail': ('get', reverse('course_detail', args=[self.course.slug]), None),
+            'course_lessons': ('get', reverse('course_lessons', args=[self.course.slug]), None),
+            'lesson_detail': ('get', reverse('lesson_detail', args=lesson_args), None),
+            'lesson_section': ('get', reverse('lesson_section', args=lesson_args + [0]), None),
+            'quiz_detail': ('get', reverse('quiz_detail', args=lesson_args), None),
+            'quiz_submit': ('post', reverse('quiz_submit', args=lesson_args), {f'question_{question.id}': '1'}),
+            'practical_task_detail': ('get', reverse('practical_task_detail', args=lesson_args), None),
+            'code_snippet': ('get', reverse('code_snippet', args=[self.snippet]), None),
+            'blog_post_detail': ('get', reverse('blog_post_detail', args=[post.slug]), None),
+            'privacy_policy': ('get', reverse('privacy_policy'), None),
+            'import_course': ('post', reverse('import_course'), {}),
+            'cache_stats_api': ('get', reverse('cache_stats_api'), None),
+        }
+
+    def measure(self, method, url, data):
+        import time
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.cache.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data) if data is not None else self.client.get(url)
+        self.assertLess(response.status_code, 500, url)
+        return len(queries), (time.perf_counter() - started) * 1000, [query['sql'] for query in queries]
+
+    def test_every_route_covered(self):
+        """Test that every named route of main_app is measured or skipped on purpose"""
+        from main_app.urls import urlpatterns
+        names = {pattern.name for pattern in urlpatterns}
+        self.grow(self.SCALES[0])
+        self.assertEqual(names - set(self.SKIPPED), set(self.routes()))
+
+    def test_query_counts_flat_as_data_grows(self):
+        """Test that no route needs more queries with 100 or 1000 lessons than with 10"""
+        import json
+        report = {}
+        baseline = {}
+        for scale in self.SCALES:
+            self.grow(scale)
+            report[scale] = {}
+            for name, (method, url, data) in self.routes().items():
+                # The first visit may store rendered HTML, only the second is measured
+                self.measure(method, url, data)
+                count, elapsed_ms, queries = self.measure(method, url, data)
+                report[scale][name] = {'queries': count, 'ms': round(elapsed_ms, 2)}
+                if name in baseline:
+                    self.assertLessEqual(
+                        count, baseline[name],
+                        f"{name} needs {count} queries at {scale} lessons, {baseline[name]} at "
+                        f"{self.SCALES[0]}:\n" + "\n".join(queries)
+                    )
+                else:
+                    baseline[name] = count
+
+        path = os.environ.get('QUERY_BUDGET_REPORT')
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
 class CourseFilteringTest(TestCase):
     """Tests for course filtering by tags"""
 
@@ -1088,6 +1970,80 @@ class CourseFilteringTest(TestCase):
         self.assertIn(self.tag_web, tags)
 
 
+class CourseCatalogTest(TestCase):
+    """Tests for the server-side tag filters and keyset pagination of the catalog"""
+
+    def setUp(self):
+        from django.utils import timezone
+        self.python = Tag.objects.create(name="Python", slug="python")
+        self.web = Tag.objects.create(name="Web", slug="web")
+        self.courses = []
+        for i in range(7):
+            course = Course.objects.create(
+                title=f"Kurs {i}", slug=f"kurs-{i}", short_description="Opis", description="Opis", is_active=True
+            )
+            # Even courses are about Python, every third about the web
+            course.tags.add(*[tag for tag, has in ((self.python, i % 2 == 0), (self.web, i % 3 == 0)) if has])
+            self.courses.append(course)
+        # Same creation time for all, so the id decides the order within it
+        Course.objects.update(created_at=timezone.now())
+
+    def slugs(self, query=''):
+        data = self.client.get(reverse('courses_api') + query).json()
+        return [course['slug'] for course in data['courses']], data['next']
+
+    def test_filter_any_and_all(self):
+        """Test that tags match any of them by default and all of them with match=all"""
+        any_slugs, _ = self.slugs('?tag=python&tag=web')
+        self.assertEqual(any_slugs, ["kurs-6", "kurs-4", "kurs-3", "kurs-2", "kurs-0"])
+        all_slugs, _ = self.slugs('?tag=python&tag=web&match=all')
+        self.assertEqual(all_slugs, ["kurs-6", "kurs-0"])
+        self.assertEqual(self.slugs('?tag=python&tag=unknown&match=all')[0], [])
+        self.assertEqual(len(self.slugs('?tag=python&tag=unknown')[0]), 4)
+
+    @override_settings(COURSES_PAGE_SIZE=3)
+    def test_keyset_pages(self):
+        """Test that following the cursors visits every course once, newest first"""
+        seen = []
+        query = ''
+        while True:
+            slugs, next_cursor = self.slugs(query)
+            seen += slugs
+            if not next_cursor:
+                break
+            query = f'?after={next_cursor}'
+        self.assertEqual(seen, [f"kurs-{i}" for i in reversed(range(7))])
+        self.assertEqual(self.slugs('?after=garbage')[0][:3], ["kurs-6", "kurs-5", "kurs-4"])
+
+    @override_settings(COURSES_PAGE_SIZE=3)
+    def test_html_page(self):
+        """Test that the catalog page shows the selected tags and links the next page"""
+        response = self.client.get(reverse('courses') + '?tag=python')
+        self.assertEqual([c.slug for c in response.context['courses']], ["kurs-6", "kurs-4", "kurs-2"])
+        self.assertEqual(response.context['selected_tags'], ["python"])
+        self.assertContains(response, f"tag=python&amp;after={response.context['next_cursor']}")
+
+    @override_settings(COURSES_PAGE_SIZE=3)
+    def test_queries_bounded_by_page_size(self):
+        """Test that a filtered page needs the same queries with more courses"""
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.slugs('?tag=python&tag=web&match=all')
+            return len(queries)
+
+        small = count_queries()
+        for i in range(7, 50):
+            Course.objects.create(
+                title=f"Kurs {i}", slug=f"kurs-{i}", short_description="Opis", description="Opis", is_active=True
+            ).tags.add(self.python, self.web)
+        self.assertEqual(count_queries(), small)
+
+
 class EdgeCasesTest(TestCase):
     """Tests for edge cases and error handling"""
 
@@ -1300,10 +2256,120 @@ class CacheMechanismTest(TestCase):
         # First request - should cache
         response1 = self.client.get(reverse('home'))
 
-        # Check cache is set
-        self.assertIsNotNone(cache.get('stats_total_courses'))
-        self.assertIsNotNone(cache.get('stats_total_lessons'))
-        self.assertIsNotNone(cache.get('stats_total_quizzes'))
+        # Check the statistics are cached as one object
+        generations, fresh_until, stats = cache.get('home_stats')
+        self.assertEqual(set(stats), {'total_courses', 'total_lessons', 'total_quizzes'})
+
+    def test_home_view_statistics_follow_edits(self):
+        """Test that cached statistics are invalidated as soon as a course changes"""
+        self.client.get(reverse('home'))
+        course = Course.objects.create(
+            title="Test Course", slug="test-course", short_description="Test", description="Test", is_active=True
+        )
+        self.assertEqual(self.client.get(reverse('home')).context['total_courses'], 1)
+
+        course.is_active = False
+        course.save()
+        self.assertEqual(self.client.get(reverse('home')).context['total_courses'], 0)
+
+    def test_generation_bumped_by_signals(self):
+        """Test that saving, deleting and retagging bump model generations"""
+        from .caching import get_generations
+        before = get_generations(Course, Tag)
+        course = Course.objects.create(
+            title="Test Course", slug="test-course", short_description="Test", description="Test"
+        )
+        after_save = get_generations(Course, Tag)
+        self.assertNotEqual(before[0], after_save[0])
+        self.assertEqual(before[1], after_save[1])
+
+        course.tags.add(Tag.objects.create(name="Python", slug="python"))
+        after_tags = get_generations(Course)
+        self.assertNotEqual(after_save[0], after_tags[0])
+
+        course.delete()
+        self.assertNotEqual(after_tags, get_generations(Course))
+
+    def test_get_or_set_recomputes_after_bump(self):
+        """Test that a cached value is recomputed only after its model generation changes"""
+        from unittest import mock
+        from .caching import bump_generation, get_or_set
+        compute = mock.Mock(side_effect=[1, 2])
+        self.assertEqual(get_or_set('test_value', (Lesson,), compute), 1)
+        self.assertEqual(get_or_set('test_value', (Lesson,), compute), 1)
+        bump_generation(Quiz)
+        self.assertEqual(get_or_set('test_value', (Lesson,), compute), 1)
+        bump_generation(Lesson)
+        self.assertEqual(get_or_set('test_value', (Lesson,), compute), 2)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_home_statistics_single_query(self):
+        """Test that the statistics are computed with one aggregate query"""
+        from .views import _home_stats
+        course = Course.objects.create(
+            title="Test Course", slug="test-course", short_description="Test", description="Test", is_active=True
+        )
+        for i in range(2):
+            lesson = Lesson.objects.create(course=course, title=f"Lekcja {i}", order=i)
+            Quiz.objects.create(lesson=lesson, title=f"Quiz {i}")
+        Lesson.objects.create(course=course, title="Bez quizu", order=3)
+        with self.assertNumQueries(1):
+            stats = _home_stats()
+        self.assertEqual(stats, {'total_courses': 1, 'total_lessons': 3, 'total_quizzes': 2})
+
+    @override_settings(CACHE_REFRESH_IN_BACKGROUND=True)
+    def test_stale_statistics_refreshed_in_background(self):
+        """Test that stale statistics are served while one background refresh runs"""
+        from unittest import mock
+        from . import caching
+        compute = mock.Mock(side_effect=[1, 2])
+        self.assertEqual(caching.get_or_refresh('test_stats', (Course,), compute, 60), 1)
+
+        caching.bump_generation(Course)
+        with mock.patch.object(caching.threading, 'Thread') as thread:
+            self.assertEqual(caching.get_or_refresh('test_stats', (Course,), compute, 60), 1)
+            # A second reader neither waits nor starts another refresh
+            self.assertEqual(caching.get_or_refresh('test_stats', (Course,), compute, 60), 1)
+        self.assertEqual(thread.call_count, 1)
+
+        tag_generation = caching.get_tag_generations('test_stats')
+        with mock.patch.object(caching.connections, 'close_all'):
+            thread.call_args.kwargs['target']()
+        self.assertEqual(caching.get_or_refresh('test_stats', (Course,), compute, 60), 2)
+        self.assertNotEqual(caching.get_tag_generations('test_stats'), tag_generation)
+
+    def test_statistics_refreshed_after_soft_timeout(self):
+        """Test that statistics are recomputed once the soft timeout has passed"""
+        from unittest import mock
+        from . import caching
+        compute = mock.Mock(side_effect=[1, 2])
+        caching.get_or_refresh('test_stats', (Course,), compute, 60)
+        with mock.patch.object(caching.time, 'time', return_value=caching.time.time() + 61):
+            self.assertEqual(caching.get_or_refresh('test_stats', (Course,), compute, 60), 2)
+
+    def test_refresh_lock_is_exclusive(self):
+        """Test that a refresh lock is held by one holder at a time and freed on close"""
+        import hashlib
+        import subprocess
+        import sys
+        from django.conf import settings
+        from . import caching
+        lock = caching.try_lock('refresh:test_stats')
+        self.assertIsNotNone(lock)
+        self.assertIsNone(caching.try_lock('refresh:test_stats'))
+        # Another process sees the same lock
+        script = (
+            "import fcntl, os, sys; fd = os.open(sys.argv[1], os.O_RDWR)\n"
+            "try: fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)\nexcept BlockingIOError: sys.exit(1)"
+        )
+        path = os.path.join(
+            settings.CACHE_LOCK_DIR, hashlib.md5(b'refresh:test_stats').hexdigest() + '.lock'
+        )
+        self.assertEqual(subprocess.run([sys.executable, '-c', script, path]).returncode, 1)
+        os.close(lock)
+        lock = caching.try_lock('refresh:test_stats')
+        self.assertIsNotNone(lock)
+        os.close(lock)
 
     def test_home_view_only_counts_active_courses(self):
         """Test that statistics only count active courses"""
@@ -1327,6 +2393,511 @@ class CacheMechanismTest(TestCase):
         self.assertEqual(response.context['total_courses'], 1)
 
 
+class TwoTierCacheTest(TestCase):
+    """Tests for the per-process LRU in front of the shared cache"""
+
+    def setUp(self):
+        from django.core.cache import cache, caches
+        cache.clear()
+        self.cache = cache
+        self.shared = caches['shared']
+
+    def test_listed_keys_served_locally(self):
+        """Test that keys with a local prefix are served from memory after the first read"""
+        self.cache.set('page:test', "strona")
+        self.shared.delete('page:test')
+        self.assertEqual(self.cache.get('page:test'), "strona")
+        self.assertGreaterEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_other_keys_stay_shared(self):
+        """Test that keys without a local prefix are always read from the shared cache"""
+        self.cache.set('session-like', "dane")
+        self.shared.delete('session-like')
+        self.assertIsNone(self.cache.get('session-like'))
+
+    def test_delete_clears_both_tiers(self):
+        """Test that deleting a key removes it from the local tier too"""
+        self.cache.set('page:test', "strona")
+        self.cache.delete('page:test')
+        self.assertIsNone(self.cache.get('page:test'))
+
+    def test_hit_and_miss_counts(self):
+        """Test that both tiers count their hits and misses"""
+        before = self.cache.stats()
+        self.cache.get_many(['page:a', 'card:b'])
+        self.cache.set('card:b', "karta")
+        self.cache.get('card:b')
+        after = self.cache.stats()
+        self.assertEqual(after['shared_misses'] - before['shared_misses'], 2)
+        self.assertEqual(after['local_misses'] - before['local_misses'], 2)
+        self.assertEqual(after['local_hits'] - before['local_hits'], 1)
+
+    def test_eviction_by_size(self):
+        """Test that the local tier evicts least recently used entries by total size"""
+        from main_app.cache_backends import LocalTier, _MISSING
+        tier = LocalTier(max_bytes=1000, max_entry_bytes=600)
+        tier.set('a', "x" * 400, 60)
+        tier.set('b', "y" * 400, 60)
+        tier.get('a')
+        tier.set('c', "z" * 400, 60)
+        self.assertIs(tier.get('b'), _MISSING)
+        self.assertEqual(tier.get('a'), "x" * 400)
+        self.assertLessEqual(tier.stats()['local_bytes'], 1000)
+
+        tier.set('big', "w" * 700, 60)
+        self.assertIs(tier.get('big'), _MISSING)
+
+    def test_local_ttl(self):
+        """Test that expired local entries are dropped"""
+        from main_app.cache_backends import LocalTier, _MISSING
+        tier = LocalTier(max_bytes=1000, max_entry_bytes=1000)
+        tier.set('a', "x", -1)
+        self.assertIs(tier.get('a'), _MISSING)
+        self.assertEqual(tier.stats()['local_bytes'], 0)
+
+    def test_home_served_without_shared_cache(self):
+        """Test that a warm home page needs neither the database nor the shared cache"""
+        from unittest import mock
+        self.client.get(reverse('home'))
+        with mock.patch.object(self.shared, 'get', side_effect=AssertionError), \
+                mock.patch.object(self.shared, 'get_many', side_effect=AssertionError), \
+                self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+
+class CounterFileCacheTest(TestCase):
+    """Tests for the file store of the generation counters"""
+
+    def setUp(self):
+        from main_app.cache_backends import CounterFileCache
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.counters = CounterFileCache(self.directory, {})
+
+    def test_add_only_creates(self):
+        """Test that add() keeps the first value and set() replaces it"""
+        self.assertTrue(self.counters.add('generation:a', 1))
+        self.assertFalse(self.counters.add('generation:a', 2))
+        self.assertEqual(self.counters.get('generation:a'), 1)
+        self.counters.set_many({'generation:a': 3, 'generation:b': 4}, None)
+        self.assertEqual(self.counters.get_many(['generation:a', 'generation:b', 'generation:c']), {
+            'generation:a': 3, 'generation:b': 4,
+        })
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.tmp')], [])
+
+    def test_concurrent_add_agrees(self):
+        """Test that of many threads adding the same key exactly one wins"""
+        import threading
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(self.counters.add('generation:x', i)))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+    def test_never_expires(self):
+        """Test that timeouts are ignored and delete/clear remove counters"""
+        self.counters.set('generation:a', 1, timeout=-1)
+        self.assertTrue(self.counters.has_key('generation:a'))
+        self.counters.delete('generation:a')
+        self.assertIsNone(self.counters.get('generation:a'))
+        self.counters.set('generation:b', 1)
+        self.counters.clear()
+        self.assertIsNone(self.counters.get('generation:b'))
+
+
+class CacheMetricsTest(TestCase):
+    """Tests for the cache counters per view and key prefix"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from main_app import cache_metrics
+        cache.clear()
+        cache_metrics.reset()
+        self.metrics = cache_metrics
+
+    def login_staff(self):
+        from django.contrib.auth.models import User
+        User.objects.create_user(username="admin", password="haslo12345", is_staff=True)
+        self.client.login(username="admin", password="haslo12345")
+
+    def test_key_prefix(self):
+        """Test that keys are grouped by the part before the first colon"""
+        self.assertEqual(self.metrics.key_prefix('page:pl:abc'), 'page')
+        self.assertEqual(self.metrics.key_prefix('home_stats'), 'home_stats')
+        self.assertEqual(self.metrics.key_prefix('django.contrib.sessions.cached_db' + 'a' * 32), 'other')
+
+    def test_page_cache_counted_per_view(self):
+        """Test that hits, misses, writes and fill time are counted under the view"""
+        self.client.get(reverse('home'))
+        self.client.get(reverse('home'))
+        page = self.metrics.snapshot()['views']['home']['prefixes']['page']
+        self.assertEqual(page['misses'], 1)
+        self.assertEqual(page['hits'], 1)
+        self.assertEqual(page['sets'], 1)
+        self.assertEqual(page['fills'], 1)
+        self.assertGreater(page['bytes'], 0)
+        self.assertGreater(page['fill_ms'], 0)
+        self.assertEqual(self.metrics.snapshot()['views']['home']['requests'], 2)
+
+    def test_written_bytes_without_extra_pickling(self):
+        """Test that locally kept values count their pickled size and others an estimate"""
+        import pickle
+        from unittest import mock
+        from django.core.cache import cache
+        value = ('a' * 500, {'x': b'b' * 100})
+        with mock.patch.object(self.metrics, 'approximate_size', wraps=self.metrics.approximate_size) as estimate:
+            cache.set('card:test', value)
+            estimate.assert_not_called()
+            cache.set('other_key', value)
+            self.assertEqual(estimate.call_args_list[0], mock.call(value))
+        prefixes = self.metrics.snapshot()['views'][self.metrics.NO_VIEW]['prefixes']
+        self.assertEqual(prefixes['card']['bytes'], len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(prefixes['other_key']['bytes'], 601)
+
+    def test_merged_across_workers(self):
+        """Test that the published counters of every worker are summed"""
+        import time
+        from django.core.cache import cache
+        self.client.get(reverse('home'))
+        other = {'views': {'home': {'requests': 5, 'time_ms': 10.0, 'prefixes': {'page': {'hits': 5}}}}, 'tiers': {}}
+        cache.set('cache_metrics:inny:1', other)
+        cache.set('cache_metrics:workers', {'inny:1': time.time()})
+        stats = self.metrics.merged()
+        self.assertEqual(stats['workers'], 2)
+        self.assertEqual(stats['views']['home']['requests'], 6)
+        self.assertEqual(stats['views']['home']['prefixes']['page']['hits'], 5)
+
+    def test_json_endpoint_requires_staff_or_token(self):
+        """Test that the JSON counters are only available to staff or with the token"""
+        from unittest import mock
+        url = reverse('cache_stats_api')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with mock.patch.dict(os.environ, {'CACHE_METRICS_TOKEN': 'sekret'}):
+            self.assertEqual(self.client.get(url, HTTP_X_METRICS_TOKEN='zly').status_code, 403)
+            response = self.client.get(url, HTTP_X_METRICS_TOKEN='sekret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
+
+    def test_admin_page(self):
+        """Test that staff see the counters on an admin page and others are sent to the login"""
+        url = reverse('cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.get(reverse('home'))
+        self.login_staff()
+        response = self.client.get(url)
+        self.assertContains(response, "Statystyki cache")
+        self.assertContains(response, "home")
+
+
+class AnonymousPageCacheTest(TestCase):
+    """Tests for the full-page cache of public pages"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.other_course = Course.objects.create(
+            title="Django", slug="django", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title="Pierwsza", order=1, content_markdown="Treść")
+        self.other_lesson = Lesson.objects.create(course=self.course, title="Druga", order=2, content_markdown="Inna")
+        self.post = BlogPost.objects.create(
+            title="Post", short_description="Opis", author_name="Autor",
+            published_date=date.today(), content_markdown="Treść posta"
+        )
+        self.urls = {
+            'home': reverse('home'),
+            'course': reverse('course_detail', args=[self.course.slug]),
+            'other_course': reverse('course_detail', args=[self.other_course.slug]),
+            'lessons': reverse('course_lessons', args=[self.course.slug]),
+            'lesson': self.lesson.get_absolute_url(),
+            'other_lesson': self.other_lesson.get_absolute_url(),
+            'post': reverse('blog_post_detail', args=[self.post.slug]),
+        }
+
+    def is_cached(self, url):
+        """Whether the page is served without touching the database"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries) == 0
+
+    def warm(self):
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def test_repeated_request_served_from_cache(self):
+        """Test that every cached page is served without queries on the second request"""
+        self.warm()
+        for name, url in self.urls.items():
+            self.assertTrue(self.is_cached(url), name)
+
+    def test_lesson_save_purges_dependent_pages_only(self):
+        """Test that saving a lesson purges its page, the lessons list, the course and home only"""
+        self.warm()
+        self.lesson.title = "Zmieniona"
+        self.lesson.save()
+        purged = {name for name, url in self.urls.items() if not self.is_cached(url)}
+        self.assertEqual(purged, {'home', 'course', 'lessons', 'lesson'})
+        self.assertContains(self.client.get(self.urls['lessons']), "Zmieniona")
+
+    def test_blog_post_save_purges_post_and_home(self):
+        """Test that saving a blog post purges only its page and the home page"""
+        self.warm()
+        self.post.save()
+        purged = {name for name, url in self.urls.items() if not self.is_cached(url)}
+        self.assertEqual(purged, {'home', 'post'})
+
+    def test_course_tags_purge_suggesting_courses(self):
+        """Test that tagging a course purges the detail pages of courses sharing the tag"""
+        tag = Tag.objects.create(name="Web", slug="web")
+        self.course.tags.add(tag)
+        self.warm()
+        self.other_course.tags.add(tag)
+        self.assertFalse(self.is_cached(self.urls['course']))
+        self.assertFalse(self.is_cached(self.urls['other_course']))
+        self.assertTrue(self.is_cached(self.urls['post']))
+
+    def test_moved_lesson_purges_both_courses(self):
+        """Test that moving a lesson to another course purges the pages of both courses"""
+        self.warm()
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        lesson.course = self.other_course
+        lesson.save()
+        self.assertFalse(self.is_cached(self.urls['course']))
+        self.assertFalse(self.is_cached(self.urls['other_course']))
+        self.assertNotContains(self.client.get(self.urls['lessons']), "Pierwsza")
+
+    def test_renamed_lesson_old_url_not_served(self):
+        """Test that a cached page disappears when its object changes slug"""
+        self.warm()
+        self.lesson.slug = "nowy-slug"
+        self.lesson.save()
+        self.assertEqual(self.client.get(self.urls['lesson']).status_code, 404)
+
+    def test_authenticated_and_query_requests_bypass_cache(self):
+        """Test that logged-in users and requests with a query string are never served cached pages"""
+        from django.contrib.auth.models import User
+        self.warm()
+        self.assertFalse(self.is_cached(self.urls['home'] + '?ref=newsletter'))
+        User.objects.create_user('user', password='haslo-testowe')
+        self.client.login(username='user', password='haslo-testowe')
+        self.assertFalse(self.is_cached(self.urls['home']))
+
+
+class CardFragmentCacheTest(TestCase):
+    """Tests for cached course, post, playlist and project cards"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.tag = Tag.objects.create(name="Python", slug="python")
+        for i in range(5):
+            course = Course.objects.create(
+                title=f"Kurs {i}", slug=f"kurs-{i}", short_description="Opis", description="Opis", is_active=True
+            )
+            course.tags.add(self.tag)
+        self.course = Course.objects.get(slug="kurs-0")
+
+    def test_cached_cards_skip_tag_queries(self):
+        """Test that a page of cached cards needs no per-course tag queries"""
+        self.client.get(reverse('courses'))
+        # Only the course list and the filter tags are queried
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('courses'))
+        self.assertContains(response, 'data-tags="python "', count=5)
+
+    def test_course_edit_rerenders_its_card(self):
+        """Test that a card changes with its object's updated_at"""
+        self.client.get(reverse('courses'))
+        self.course.title = "Nowy tytuł"
+        self.course.save()
+        self.assertContains(self.client.get(reverse('courses')), "Nowy tytuł")
+
+    def test_tag_rename_rerenders_course_cards(self):
+        """Test that related tag edits invalidate course cards"""
+        self.client.get(reverse('courses'))
+        self.tag.name = "Python 3"
+        self.tag.save()
+        self.assertContains(self.client.get(reverse('courses')), '<span class="tag">Python 3</span>', count=5)
+
+    def test_home_post_cards(self):
+        """Test that home page post cards are rendered with all their fields"""
+        BlogPost.objects.create(
+            title="Post", short_description="Opis", author_name="Jan Autor",
+            published_date=date.today(), content_markdown="Treść"
+        )
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'class="post-card"')
+        self.assertContains(response, 'Jan Autor')
+
+
+
+class ConditionalGetTest(TestCase):
+    """Tests for ETag and Last-Modified validators of content pages"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title="Pierwsza", order=1, content_markdown="Treść")
+        self.url = self.lesson.get_absolute_url()
+
+    def test_pages_send_validators(self):
+        """Test that content pages are sent with an ETag and Last-Modified"""
+        post = BlogPost.objects.create(
+            title="Post", short_description="Opis", author_name="Autor",
+            published_date=date.today(), content_markdown="Treść"
+        )
+        for url in (
+            reverse('home'), reverse('course_detail', args=[self.course.slug]),
+            reverse('course_lessons', args=[self.course.slug]), self.url,
+            reverse('blog_post_detail', args=[post.slug]),
+        ):
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('ETag'), url)
+            self.assertTrue(response.has_header('Last-Modified'), url)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """Test that a repeated request with If-None-Match is answered before rendering"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_rerender_changes_validators(self):
+        """Test that re-rendering or a new renderer version never revalidates the old page"""
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch('main_app.rendering.RENDERER_VERSION', 999):
+            self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+        Lesson.objects.filter(pk=self.lesson.pk).update(renderer_version=0)
+        call_command('rerender', '--stale', workers=1, stdout=StringIO())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_returns_304(self):
+        """Test that If-Modified-Since with the sent Last-Modified gets a 304"""
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        """Test that editing the lesson or its content changes the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        self.lesson.content_markdown = "Zmieniona"
+        self.lesson.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Zmieniona")
+
+        etag = response['ETag']
+        LessonContent.objects.create(lesson=self.lesson, text_content="<p>Materiał</p>")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_slug_change_drops_old_url(self):
+        """Test that the old URL of a renamed lesson is not validated any more"""
+        etag = self.client.get(self.url)['ETag']
+        self.lesson.slug = "nowa"
+        self.lesson.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+    def test_unknown_page_is_404(self):
+        """Test that pages which do not exist still return 404"""
+        response = self.client.get(reverse('course_detail', args=['brak']))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_authenticated_user_gets_no_validators(self):
+        """Test that personalised pages of logged-in users are not validated"""
+        from django.contrib.auth.models import User
+        User.objects.create_user(username="jan", password="haslo12345")
+        self.client.login(username="jan", password="haslo12345")
+        self.assertFalse(self.client.get(self.url).has_header('ETag'))
+
+
+class NegativeCacheTest(TestCase):
+    """Tests for cached 404s of unknown slugs"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+
+    def assertCached404(self, url):
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_slugs_skip_database(self):
+        """Test that repeated requests for unknown slugs are answered without queries"""
+        self.assertCached404(reverse('course_detail', args=['brak']))
+        self.assertCached404(reverse('course_lessons', args=['brak']))
+        self.assertCached404(reverse('lesson_detail', args=['python', 'brak']))
+        self.assertCached404(reverse('blog_post_detail', args=['brak']))
+
+    def test_misses_not_written_to_shared_cache(self):
+        """Test that cached 404s stay in the worker and are bounded"""
+        from unittest import mock
+        from django.core.cache import cache, caches
+        with mock.patch.object(caches['shared'], 'set') as shared_set:
+            for i in range(200):
+                self.assertCached404(reverse('course_detail', args=[f'brak-{i}']))
+        self.assertFalse(any(call.args[0].startswith('stamp:') for call in shared_set.call_args_list))
+        self.assertLessEqual(cache.local_only.stats()['local_bytes'], cache.local_only.max_bytes)
+
+    def test_created_course_drops_miss(self):
+        """Test that creating or activating a course with the slug makes its page available"""
+        url = reverse('course_detail', args=['nowy'])
+        self.assertCached404(url)
+        course = Course.objects.create(
+            title="Nowy", slug="nowy", short_description="Opis", description="Opis", is_active=False
+        )
+        self.assertCached404(url)
+        course.is_active = True
+        course.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_created_lesson_drops_miss(self):
+        """Test that creating a lesson with the slug makes its page available"""
+        url = reverse('lesson_detail', args=['python', 'nowa'])
+        self.assertCached404(url)
+        Lesson.objects.create(course=self.course, title="Nowa", slug="nowa", order=1, content_markdown="Treść")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_published_post_drops_miss(self):
+        """Test that publishing a blog post with the slug makes its page available"""
+        url = reverse('blog_post_detail', args=['nowy-post'])
+        self.assertCached404(url)
+        BlogPost.objects.create(
+            title="Nowy post", slug="nowy-post", short_description="Opis", author_name="Autor",
+            published_date=date.today(), content_markdown="Treść"
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class VideoPlaylistFilteringTest(TestCase):
     """Tests for VideoPlaylist filtering and display"""
@@ -1441,7 +3012,7 @@ class AdditionalMarkdownTest(TestCase):
         html = lesson.content_html
         # Should still render without crashing, defaulting to text
         self.assertIsNotNone(html)
-        self.assertIn("code here", html)
+        self.assertIn("code here", "".join(CodeSnippet.for_html(html).values()))
 
     def test_blog_post_with_tables(self):
         """Test blog post with Markdown tables"""
@@ -1535,6 +3106,84 @@ class QuizScoringEdgeCasesTest(TestCase):
         self.assertEqual(response.context['correct_answers'], 0)
 
 
+class QuizPayloadCacheTest(TestCase):
+    """Tests for the cached quiz payload behind quiz_detail and quiz_submit"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.course = Course.objects.create(
+            title="Python", slug="python", short_description="Opis", description="Opis", is_active=True
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title="Lekcja", slug="lekcja", order=1)
+        self.quiz = Quiz.objects.create(lesson=self.lesson, title="Quiz")
+        self.question = Question.objects.create(quiz=self.quiz, text="Ile to `2 + 2`?", order=1)
+        self.wrong = Answer.objects.create(question=self.question, text="3", order=1)
+        self.right = Answer.objects.create(question=self.question, text="4", is_correct=True, order=2)
+        self.other_question = Question.objects.create(quiz=self.quiz, text="Drugie?", order=2)
+        self.other_right = Answer.objects.create(question=self.other_question, text="Tak", is_correct=True)
+        self.detail_url = reverse('quiz_detail', args=['python', 'lekcja'])
+        self.submit_url = reverse('quiz_submit', args=['python', 'lekcja'])
+
+    def test_warm_quiz_served_without_queries(self):
+        """Test that both quiz views render from the payload without touching the database"""
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url)
+        self.assertContains(response, "<code>2 + 2</code>")
+        with self.assertNumQueries(0):
+            response = self.client.post(self.submit_url, {f'question_{self.question.id}': self.right.id})
+        self.assertEqual(response.context['correct_answers'], 1)
+
+    def test_answer_of_other_question_does_not_count(self):
+        """Test that a correct answer posted under another question is not scored"""
+        response = self.client.post(self.submit_url, {f'question_{self.question.id}': self.other_right.id})
+        self.assertEqual(response.context['correct_answers'], 0)
+
+    def test_edits_rebuild_payload(self):
+        """Test that editing a question or an answer is visible on the next request"""
+        self.client.get(self.detail_url)
+        self.question.text = "Ile to 2 * 2?"
+        self.question.save()
+        self.assertContains(self.client.get(self.detail_url), "Ile to 2 * 2?")
+
+        self.wrong.is_correct = True
+        self.wrong.save()
+        response = self.client.post(self.submit_url, {f'question_{self.question.id}': self.wrong.id})
+        self.assertEqual(response.context['correct_answers'], 1)
+
+    def test_unrelated_edits_keep_payload(self):
+        """Test that edits outside the quiz, its lesson and course card do not rebuild the payload"""
+        other_lesson = Lesson.objects.create(course=self.course, title="Inna", slug="inna", order=2)
+        other_quiz = Quiz.objects.create(lesson=other_lesson, title="Inny quiz")
+        self.client.get(self.detail_url)
+
+        other_lesson.title = "Inna lekcja"
+        other_lesson.save()
+        Question.objects.create(quiz=other_quiz, text="Obce pytanie", order=1)
+        with self.assertNumQueries(0):
+            self.client.get(self.detail_url)
+
+    def test_bulk_answer_import_rebuilds_payload(self):
+        """Test that answers added by the admin XML import are visible on the next request"""
+        from django.contrib.auth.models import User
+        self.client.get(self.detail_url)
+        User.objects.create_superuser('admin', 'admin@example.com', 'haslo')
+        self.client.login(username='admin', password='haslo')
+        self.client.post(reverse('admin:quiz_import_xml', args=[self.quiz.pk]), {
+            'xml_content': '<questions><question order="3"><text>Nowe pytanie</text>'
+                           '<answers><answer correct="true">Nowa odpowiedź</answer></answers>'
+                           '</question></questions>',
+        })
+        self.assertContains(self.client.get(self.detail_url), "Nowa odpowiedź")
+
+    def test_result_marks_selected_and_correct_answers(self):
+        """Test that the result page marks the wrong selection and the correct answer"""
+        response = self.client.post(self.submit_url, {f'question_{self.question.id}': self.wrong.id})
+        self.assertContains(response, 'class="answer-result incorrect "')
+        self.assertContains(response, 'class="answer-result  correct"', count=2)
+
+
 class QuizXMLImportTest(TestCase):
     """Tests for Quiz XML import functionality"""
 
@@ -1735,6 +3384,113 @@ print("Hello")
             ET.fromstring(xml_content)
 
 
+class QuestionSanitizationTest(TestCase):
+    """Tests for question HTML sanitized once at write time"""
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Test Course",
+            slug="test-course",
+            short_description="Test",
+            description="Test",
+            is_active=True
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course,
+            title="Test Lesson",
+            slug="test-lesson",
+            order=1
+        )
+        self.quiz = Quiz.objects.create(
+            lesson=self.lesson,
+            title="Test Quiz"
+        )
+
+    def test_sanitized_html_stored_on_save(self):
+        """Test that unsafe markup is escaped before the HTML is stored"""
+        question = Question.objects.create(
+            quiz=self.quiz,
+            text="Co robi <script>alert(1)</script>?\n\n```js\nalert('<b>')\n```",
+            order=1
+        )
+        stored = Question.objects.get(pk=question.pk).rendered_html
+        self.assertNotIn("<script>", stored)
+        self.assertIn("&lt;script&gt;", stored)
+        self.assertIn('class="monaco-code-block"', stored)
+        self.assertIn('data-code="alert(&#x27;&lt;b&gt;&#x27;)\n"', stored)
+
+    def test_text_html_does_not_sanitize_on_read(self):
+        """Test that reading text_html reuses the stored HTML"""
+        from unittest import mock
+        from . import rendering
+        question = Question.objects.create(quiz=self.quiz, text="**Pytanie**", order=1)
+        question = Question.objects.get(pk=question.pk)
+        with mock.patch.object(rendering, 'sanitize_html') as sanitize:
+            self.assertIn("<strong>Pytanie</strong>", question.text_html)
+        sanitize.assert_not_called()
+
+    def test_admin_xml_import_stores_html_and_answers(self):
+        """Test that the admin XML import writes rendered questions and their answers"""
+        from django.contrib.auth.models import User
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'haslo')
+        self.client.force_login(admin_user)
+        xml_content = '''<questions>
+  <question order="1">
+    <text>Co wypisze `print(1)`?</text>
+    <answers>
+      <answer correct="true" order="1">1</answer>
+      <answer correct="false" order="2">0</answer>
+    </answers>
+  </question>
+  <question order="2">
+    <text>Pytanie bez odpowiedzi</text>
+    <answers></answers>
+  </question>
+</questions>'''
+        response = self.client.post(
+            reverse('admin:quiz_import_xml', args=[self.quiz.pk]),
+            {'xml_content': xml_content}
+        )
+        self.assertEqual(response.status_code, 302)
+        question = Question.objects.get(quiz=self.quiz)
+        self.assertIn("<code>print(1)</code>", question.rendered_html)
+        self.assertEqual(question.answers.count(), 2)
+        self.assertTrue(question.answers.get(order=1).is_correct)
+
+    def test_import_course_stores_question_html(self):
+        """Test that the course import API writes rendered questions and answers"""
+        import json
+        from unittest import mock
+        payload = {
+            'course': {'title': 'Importowany kurs', 'tags': ['Python']},
+            'lessons': [{
+                'title': 'Lekcja 1',
+                'content_markdown': '# Lekcja',
+                'quiz': {'questions': [
+                    {'text': '**Pytanie 1**', 'answers': [
+                        {'text': 'Tak', 'is_correct': True},
+                        {'text': 'Nie'},
+                    ]},
+                    {'text': 'Pytanie 2', 'answers': [{'text': 'A', 'is_correct': True}]},
+                ]},
+            }],
+        }
+        with mock.patch.dict(os.environ, {'COURSE_IMPORT_TOKEN': 'sekret'}):
+            response = self.client.post(
+                reverse('import_course'),
+                data=json.dumps(payload),
+                content_type='application/json',
+                HTTP_X_IMPORT_TOKEN='sekret'
+            )
+        self.assertEqual(response.status_code, 200)
+        questions = Question.objects.filter(quiz__lesson__course__slug='importowany-kurs')
+        self.assertEqual(questions.count(), 2)
+        first = questions.get(order=0)
+        self.assertIn("<strong>Pytanie 1</strong>", first.rendered_html)
+        self.assertEqual(first.answers.count(), 2)
+        self.assertEqual(Answer.objects.filter(question__in=questions).count(), 3)
+
+
 def tearDownModule():
     """Clean up temporary media files after all tests"""
     try:
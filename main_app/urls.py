@@ -7,10 +7,14 @@ urlpatterns = [
     path('course/<slug:slug>/', views.course_detail, name='course_detail'),
     path('course/<slug:course_slug>/lessons/', views.course_lessons, name='course_lessons'),
     path('course/<slug:course_slug>/<slug:lesson_slug>/', views.lesson_detail, name='lesson_detail'),
+    path('course/<slug:course_slug>/<slug:lesson_slug>/section/<int:index>/', views.lesson_section, name='lesson_section'),
     path('course/<slug:course_slug>/<slug:lesson_slug>/quiz/', views.quiz_detail, name='quiz_detail'),
     path('course/<slug:course_slug>/<slug:lesson_slug>/quiz/submit/', views.quiz_submit, name='quiz_submit'),
     path('course/<slug:course_slug>/<slug:lesson_slug>/task/', views.practical_task_detail, name='practical_task_detail'),
+    path('snippet/<str:digest>/', views.code_snippet, name='code_snippet'),
     path('blog/<slug:slug>/', views.blog_post_detail, name='blog_post_detail'),
     path('polityka-prywatnosci/', views.privacy_policy, name='privacy_policy'),
+    path('api/courses/', views.courses_api, name='courses_api'),
     path('api/import-course/', views.import_course, name='import_course'),
+    path('api/cache-stats/', views.cache_stats, name='cache_stats_api'),
 ]
@@ -1,16 +1,46 @@
+import datetime
 import json
 import os
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.html import json_script
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.text import slugify
-from .models import Course, Tag, Lesson, Quiz, Question, Answer, PracticalTask, BlogPost, VideoPlaylist, Project
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from . import cache_metrics, caching, rendering
+from .highlighting import highlight_code_blocks, static_highlighting_enabled
+from .page_cache import anonymous_page_cache, conditional_page, stamp_row, tag_page
+from .templatetags.cards import cached_cards
+from .models import (
+    Course, CourseSimilarity, Tag, Lesson, Quiz, Question, Answer, PracticalTask, BlogPost, VideoPlaylist, Project,
+    CodeSnippet,
+)
 
 logger = logging.getLogger(__name__)
 
+def _home_stats():
+    """Counts active courses and their lessons and quizzes in one query"""
+    return Course.objects.filter(is_active=True).aggregate(
+        total_courses=Count('id', distinct=True),
+        total_lessons=Count('lessons', distinct=True),
+        total_quizzes=Count('lessons__quiz', distinct=True),
+    )
+
+def _home_stamp(request):
+    return ('home', 'home_stats'), (), None
+
+@conditional_page(_home_stamp)
+@anonymous_page_cache
 def home(request):
+    tag_page(request, 'home', 'home_stats')
+
     # Optimize with prefetch_related to avoid N+1 queries
     featured_courses = Course.objects.filter(
         is_active=True
@@ -18,55 +48,138 @@ def home(request):
 
     recent_posts = BlogPost.objects.filter(
         is_published=True
-    ).only('id', 'title', 'slug', 'short_description', 'published_date').order_by('-published_date')[:6]
+    ).only(
+        'id', 'title', 'slug', 'short_description', 'author_name', 'published_date', 'updated_at'
+    ).order_by('-published_date')[:6]
 
     video_playlists = VideoPlaylist.objects.filter(
         is_active=True
-    ).only('id', 'title', 'youtube_playlist_url', 'thumbnail', 'description', 'order').order_by('order', '-created_at')[:6]
+    ).only(
+        'id', 'title', 'youtube_playlist_url', 'thumbnail', 'description', 'order', 'updated_at'
+    ).order_by('order', '-created_at')[:6]
 
     projects = Project.objects.filter(
         is_active=True
     ).order_by('order', '-created_at')[:6]
 
-    # Calculate real statistics for hero section (cached for performance)
-    from django.core.cache import cache
-
-    total_courses = cache.get('stats_total_courses')
-    if total_courses is None:
-        total_courses = Course.objects.filter(is_active=True).count()
-        cache.set('stats_total_courses', total_courses, 3600)  # Cache for 1 hour
-
-    total_lessons = cache.get('stats_total_lessons')
-    if total_lessons is None:
-        total_lessons = Lesson.objects.filter(course__is_active=True).count()
-        cache.set('stats_total_lessons', total_lessons, 3600)
-
-    total_quizzes = cache.get('stats_total_quizzes')
-    if total_quizzes is None:
-        total_quizzes = Quiz.objects.filter(lesson__course__is_active=True).count()
-        cache.set('stats_total_quizzes', total_quizzes, 3600)
+    # Statistics for the hero section, refreshed in the background when stale
+    stats = caching.get_or_refresh(
+        'home_stats', (Course, Lesson, Quiz), _home_stats, settings.HOME_STATS_SOFT_TIMEOUT
+    )
 
     return render(request, 'main_app/index.html', {
         'featured_courses': featured_courses,
         'recent_posts': recent_posts,
         'video_playlists': video_playlists,
         'projects': projects,
-        'total_courses': total_courses,
-        'total_lessons': total_lessons,
-        'total_quizzes': total_quizzes,
+        'total_courses': stats['total_courses'],
+        'total_lessons': stats['total_lessons'],
+        'total_quizzes': stats['total_quizzes'],
         'is_home_page': True
     })
 
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _catalog_cursor(course):
+    """Keyset position of a course in the catalog: microseconds of created_at and the id"""
+    return f'{(course.created_at - _EPOCH) // datetime.timedelta(microseconds=1)}-{course.pk}'
+
+
+def _parse_catalog_cursor(value):
+    try:
+        micros, pk = value.split('-')
+        return _EPOCH + datetime.timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def _catalog_page(request, tag_ids):
+    """
+    One page of the active courses, newest first, filtered by the ``tag``
+    slugs of the query string: courses having any of them, or all of them
+    with ``match=all``. ``tag_ids`` maps the known slugs to tag ids.
+
+    Each tag is an EXISTS on the course/tag table and the page a keyset seek
+    on (created_at, id) after the ``after`` cursor, so a page costs the same
+    however many courses the catalog has. Returns the selected slugs, the
+    courses and the cursor of the next page (None on the last one).
+    """
+    selected = list(dict.fromkeys(request.GET.getlist('tag')))
+    # Unknown slugs become None: no course has them, and __in ignores them
+    ids = [tag_ids.get(slug) for slug in selected]
+    courses = Course.objects.filter(is_active=True)
+    if request.GET.get('match') == 'all':
+        for tag_id in ids:
+            courses = courses.filter(Exists(Course.tags.through.objects.filter(course=OuterRef('pk'), tag_id=tag_id)))
+    elif ids:
+        courses = courses.filter(Exists(Course.tags.through.objects.filter(course=OuterRef('pk'), tag_id__in=ids)))
+
+    cursor = _parse_catalog_cursor(request.GET.get('after'))
+    if cursor:
+        created_at, pk = cursor
+        courses = courses.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    size = settings.COURSES_PAGE_SIZE
+    page = list(courses.order_by('-created_at', '-pk')[:size + 1])
+    next_cursor = _catalog_cursor(page[size - 1]) if len(page) > size else None
+    return selected, page[:size], next_cursor
+
+
 def courses(request):
-    active_courses = Course.objects.filter(is_active=True).prefetch_related('tags')
-    all_tags = Tag.objects.all()
-    
+    all_tags = list(Tag.objects.all())
+    selected, page, next_cursor = _catalog_page(request, {tag.slug: tag.pk for tag in all_tags})
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['after'] = next_cursor
+        next_query = query.urlencode()
+
+    # Tags are prefetched by cached_cards, only for cards missing from the cache
     return render(request, 'main_app/courses.html', {
-        'courses': active_courses,
+        'courses': page,
         'tags': all_tags,
+        'selected_tags': selected,
+        'match_all': request.GET.get('match') == 'all',
+        'next_cursor': next_cursor,
+        'next_query': next_query,
         'is_home_page': False
     })
 
+
+def courses_api(request):
+    """A page of the course catalog as JSON, with the rendered cards for courses.js"""
+    slugs = request.GET.getlist('tag')
+    tag_ids = dict(Tag.objects.filter(slug__in=slugs).values_list('slug', 'pk')) if slugs else {}
+    selected, page, next_cursor = _catalog_page(request, tag_ids)
+    return JsonResponse({
+        'tags': selected,
+        'courses': [
+            {
+                'slug': course.slug,
+                'title': course.title,
+                'short_description': course.short_description,
+                'icon': course.icon,
+                'url': reverse('course_lessons', args=[course.slug]),
+            }
+            for course in page
+        ],
+        'html': cached_cards(page, 'course'),
+        'next': next_cursor,
+    })
+
+def _course_stamp(request, slug):
+    course = stamp_row(
+        f'course:{slug}', Course.objects.filter(slug=slug, is_active=True), lambda row: [f'course:{row[0]}'],
+        models=(Course,),
+    )
+    if course is None:
+        return None
+    # Suggested courses and their tags may change with any course or tag edit
+    return (f'course:{course[0]}',), (Course, Tag), course[1]
+
+@conditional_page(_course_stamp)
+@anonymous_page_cache
 def course_detail(request, slug):
     # Optimize with prefetch_related for tags and lessons
     course = get_object_or_404(
@@ -75,13 +188,19 @@ def course_detail(request, slug):
         is_active=True
     )
 
-    # Optimize suggested courses query
-    suggested_courses = Course.objects.filter(
-        tags__in=course.tags.all(),
-        is_active=True
-    ).exclude(
-        id=course.id
-    ).prefetch_related('tags').distinct()[:3]
+    # Most similar courses by tags, precomputed (see similarity.py)
+    suggested_courses = [
+        row.similar for row in CourseSimilarity.objects.filter(course=course).select_related('similar').only(
+            'similar__title', 'similar__slug', 'similar__icon', 'similar__short_description'
+        ).order_by('-score', 'similar')[:3]
+    ]
+
+    tag_page(
+        request,
+        f'course:{course.pk}',
+        *(f'tag:{tag.pk}' for tag in course.tags.all()),
+        *(f'course_card:{suggested.pk}' for suggested in suggested_courses),
+    )
 
     return render(request, 'main_app/course_detail.html', {
         'course': course,
@@ -89,15 +208,77 @@ def course_detail(request, slug):
         'is_home_page': False
     })
 
+def _course_lessons_stamp(request, course_slug):
+    course = stamp_row(
+        f'course_lessons:{course_slug}',
+        Course.objects.filter(slug=course_slug, is_active=True),
+        lambda row: [f'course_lessons:{row[0]}'],
+        models=(Course,),
+    )
+    if course is None:
+        return None
+    return (f'course_lessons:{course[0]}',), (), course[1]
+
+@conditional_page(_course_lessons_stamp)
+@anonymous_page_cache
 def course_lessons(request, course_slug):
     course = get_object_or_404(Course, slug=course_slug, is_active=True)
-    lessons = course.lessons.all().order_by('order')
+    tag_page(request, f'course_lessons:{course.pk}')
+    # Badge flags as subqueries and no markdown columns: one query for any number
+    # of lessons. The related manager also sets lesson.course for get_absolute_url.
+    lessons = course.lessons.annotate(
+        has_quiz=Exists(Quiz.objects.filter(lesson=OuterRef('pk'))),
+        has_task=Exists(PracticalTask.objects.filter(lesson=OuterRef('pk'))),
+    ).only('title', 'slug', 'order', 'course_id').order_by('order')
     return render(request, 'main_app/course_lessons.html', {
         'course': course,
         'lessons': lessons,
         'is_home_page': False
     })
 
+def _lesson_section_key(course_slug, lesson_slug, version, index):
+    return f'lesson_section:{course_slug}:{lesson_slug}:{version}:{index}'
+
+
+def _cache_lesson_sections(course_slug, lesson_slug, version, sections):
+    """
+    Caches the sections as served, with code already highlighted in static
+    mode. Each section carries the code of its snippets in a JSON script, so
+    a deferred section needs no request per code block.
+    """
+    snippets = CodeSnippet.for_html(*sections)
+    served = []
+    for section in sections:
+        section_snippets = {
+            digest: snippets[digest] for digest in rendering.snippet_digests(section) if digest in snippets
+        }
+        if static_highlighting_enabled():
+            section = highlight_code_blocks(section, snippets)
+        if section_snippets:
+            section += json_script(section_snippets)
+        served.append(section)
+    sections = served
+    cache.set_many({
+        _lesson_section_key(course_slug, lesson_slug, version, index): section
+        for index, section in enumerate(sections)
+    }, settings.LESSON_SECTION_CACHE_TIMEOUT)
+    return sections
+
+
+def _lesson_stamp(request, course_slug, lesson_slug):
+    lesson = stamp_row(
+        f'lesson:{course_slug}:{lesson_slug}',
+        Lesson.objects.filter(course__slug=course_slug, slug=lesson_slug, course__is_active=True),
+        lambda row: [f'lesson:{row[0]}', f'course_card:{row[2]}'],
+        'course_id',
+        models=(Course, Lesson),
+    )
+    if lesson is None:
+        return None
+    return (f'lesson:{lesson[0]}', f'course_card:{lesson[2]}'), (), lesson[1]
+
+@conditional_page(_lesson_stamp)
+@anonymous_page_cache
 def lesson_detail(request, course_slug, lesson_slug):
     # Optimize with select_related to avoid extra query for course
     lesson = get_object_or_404(
@@ -106,33 +287,144 @@ def lesson_detail(request, course_slug, lesson_slug):
         slug=lesson_slug,
         course__is_active=True
     )
+    tag_page(request, f'lesson:{lesson.pk}', f'course_card:{lesson.course_id}')
+
+    # Very large lessons ship only their first sections, the rest is fetched while scrolling
+    initial_sections = None
+    deferred_section_urls = []
+    code_snippets = None
+    if len(lesson.content_html) > settings.LESSON_SECTION_THRESHOLD:
+        sections = lesson.get_sections()
+        if len(sections) > settings.LESSON_INITIAL_SECTIONS:
+            version = lesson.section_version
+            last_key = _lesson_section_key(course_slug, lesson_slug, version, len(sections) - 1)
+            if cache.get(last_key) is None:
+                _cache_lesson_sections(course_slug, lesson_slug, version, sections)
+
+            initial_sections = sections[:settings.LESSON_INITIAL_SECTIONS]
+            code_snippets = CodeSnippet.for_html(*initial_sections)
+            deferred_section_urls = [
+                reverse('lesson_section', args=[course_slug, lesson_slug, index]) + f'?v={version}'
+                for index in range(settings.LESSON_INITIAL_SECTIONS, len(sections))
+            ]
+
     return render(request, 'main_app/lesson_detail.html', {
         'course': lesson.course,
         'lesson': lesson,
+        'initial_sections': initial_sections,
+        'deferred_section_urls': deferred_section_urls,
+        'code_snippets': code_snippets if code_snippets is not None else CodeSnippet.for_html(lesson.content_html),
         'is_home_page': False
     })
 
-def quiz_detail(request, course_slug, lesson_slug):
-    # Optimize with select_related and prefetch_related
-    lesson = get_object_or_404(
-        Lesson.objects.select_related('course'),
-        course__slug=course_slug,
-        slug=lesson_slug
-    )
+def lesson_section(request, course_slug, lesson_slug, index):
+    """Returns one section of a sectioned lesson as an HTML fragment"""
+    version = request.GET.get('v', '')
+    section = cache.get(_lesson_section_key(course_slug, lesson_slug, version, index)) if version else None
+
+    if section is None:
+        lesson = get_object_or_404(
+            Lesson.objects.select_related('course'),
+            course__slug=course_slug,
+            slug=lesson_slug,
+            course__is_active=True
+        )
+        sections = lesson.get_sections()
+        if index >= len(sections):
+            raise Http404("Section does not exist for this lesson")
+        section = _cache_lesson_sections(course_slug, lesson_slug, lesson.section_version, sections)[index]
+
+        if version != lesson.section_version:
+            # Outdated or missing version: serve the current section, but do not let it be cached
+            response = HttpResponse(section)
+            patch_cache_control(response, no_cache=True)
+            return response
+
+    # The URL carries the content version, so the response never changes
+    response = HttpResponse(section)
+    patch_cache_control(response, public=True, max_age=settings.LESSON_SECTION_CACHE_TIMEOUT, immutable=True)
+    return response
+
+def code_snippet(request, digest):
+    """Returns the code of a snippet referenced by a code block container"""
+    snippet = get_object_or_404(CodeSnippet, digest=digest)
+    response = HttpResponse(snippet.code, content_type='text/plain; charset=utf-8')
+    # The digest is the content, so the response can be cached forever
+    patch_cache_control(response, public=True, max_age=settings.CODE_SNIPPET_MAX_AGE, immutable=True)
+    return response
+
+def _build_quiz_payload(course_slug, lesson_slug):
+    """Returns ``(tags, their generations, payload)``, or None without a quiz"""
+    lesson = Lesson.objects.select_related('course', 'quiz').filter(
+        course__slug=course_slug, slug=lesson_slug
+    ).first()
+    if lesson is None or not hasattr(lesson, 'quiz'):
+        return None
+
+    quiz = lesson.quiz
+    tags = (f'quiz:{quiz.pk}', f'lesson:{lesson.pk}', f'course_card:{lesson.course_id}')
+    # Read before the questions, so an edit made meanwhile leaves the entry stale
+    generations = caching.get_tag_generations(*tags)
+    questions = []
+    for question in quiz.questions.prefetch_related('answers').order_by('order'):
+        answers = [
+            {'id': answer.id, 'text': answer.text, 'is_correct': answer.is_correct}
+            for answer in question.answers.all()
+        ]
+        questions.append({
+            'id': question.id,
+            'text_html': question.text_html,
+            'explanation': question.explanation,
+            'answers': answers,
+            'correct_answer_id': next((answer['id'] for answer in answers if answer['is_correct']), None),
+        })
+
+    return tags, generations, {
+        'course': {'slug': lesson.course.slug, 'title': lesson.course.title, 'icon': lesson.course.icon},
+        'lesson': {'slug': lesson.slug, 'title': lesson.title},
+        'quiz': {'title': quiz.title, 'description': quiz.description},
+        'questions': questions,
+        # answer id -> (question id, is correct), for scoring a submission
+        'answers': {
+            str(answer['id']): (question['id'], answer['is_correct'])
+            for question in questions for answer in question['answers']
+        },
+    }
 
-    # Check if quiz exists
-    if not hasattr(lesson, 'quiz'):
-        from django.http import Http404
+def _quiz_payload(course_slug, lesson_slug):
+    """
+    Everything the quiz pages show, built once and cached under the tags of
+    its quiz, lesson and course card. Saving that quiz or one of its
+    questions or answers bumps ``quiz:<pk>`` (see ``page_cache.PURGE_GRAPH``),
+    so edits elsewhere keep the payload. Raises 404 for lessons without a
+    quiz; like ``stamp_row``, those misses are only kept in the worker's
+    local LRU, under the generations of the models that could add the quiz.
+    """
+    key = f'quiz:{rendering.RENDERER_VERSION}:{course_slug}:{lesson_slug}'
+    model_generations = caching.get_generations(Course, Lesson, Quiz)
+    if cache.get_local(key) == model_generations:
         raise Http404("Quiz does not exist for this lesson")
 
-    quiz = lesson.quiz
-    questions = quiz.questions.prefetch_related('answers').order_by('order')
+    entry = cache.get(key)
+    if entry is not None:
+        tags, generations, payload = entry
+        if caching.get_tag_generations(*tags) == generations:
+            return payload
+
+    entry = _build_quiz_payload(course_slug, lesson_slug)
+    if entry is None:
+        cache.set_local(key, model_generations, settings.NEGATIVE_CACHE_TIMEOUT)
+        raise Http404("Quiz does not exist for this lesson")
+    cache.set(key, entry, settings.GENERATION_CACHE_TIMEOUT)
+    return entry[2]
 
+def quiz_detail(request, course_slug, lesson_slug):
+    payload = _quiz_payload(course_slug, lesson_slug)
     return render(request, 'main_app/quiz_detail.html', {
-        'course': lesson.course,
-        'lesson': lesson,
-        'quiz': quiz,
-        'questions': questions,
+        'course': payload['course'],
+        'lesson': payload['lesson'],
+        'quiz': payload['quiz'],
+        'questions': payload['questions'],
         'is_home_page': False
     })
 
@@ -140,60 +432,37 @@ def quiz_submit(request, course_slug, lesson_slug):
     if request.method != 'POST':
         return redirect('quiz_detail', course_slug=course_slug, lesson_slug=lesson_slug)
 
-    # Optimize with select_related
-    lesson = get_object_or_404(
-        Lesson.objects.select_related('course'),
-        course__slug=course_slug,
-        slug=lesson_slug
-    )
-
-    # Check if quiz exists
-    if not hasattr(lesson, 'quiz'):
-        from django.http import Http404
-        raise Http404("Quiz does not exist for this lesson")
-
-    quiz = lesson.quiz
-    questions = quiz.questions.prefetch_related('answers').order_by('order')
-
-    # Create a dictionary of all answers for O(1) lookup instead of querying in loop
-    all_answer_ids = [request.POST.get(f'question_{q.id}') for q in questions if request.POST.get(f'question_{q.id}')]
-    answers_dict = {
-        str(answer.id): answer
-        for answer in Answer.objects.filter(id__in=all_answer_ids).select_related('question')
-    }
+    payload = _quiz_payload(course_slug, lesson_slug)
+    questions = payload['questions']
 
     total_questions = len(questions)
     correct_answers = 0
     results = []
 
     for question in questions:
-        selected_answer_id = request.POST.get(f'question_{question.id}')
-        selected_answer = None
-        is_correct = False
-
-        if selected_answer_id and selected_answer_id in answers_dict:
-            selected_answer = answers_dict[selected_answer_id]
-            is_correct = selected_answer.is_correct
-            if is_correct:
-                correct_answers += 1
-
-        # Use prefetched answers instead of filter
-        correct_answer = next((a for a in question.answers.all() if a.is_correct), None)
+        selected_answer_id = request.POST.get(f'question_{question["id"]}')
+        selected = payload['answers'].get(selected_answer_id)
+        # Answers of other questions do not count
+        if selected is None or selected[0] != question['id']:
+            selected_answer_id = None
+        is_correct = selected_answer_id is not None and selected[1]
+        if is_correct:
+            correct_answers += 1
 
         results.append({
             'question': question,
-            'selected_answer': selected_answer,
+            'selected_answer_id': int(selected_answer_id) if selected_answer_id else None,
             'is_correct': is_correct,
-            'correct_answer': correct_answer
+            'correct_answer_id': question['correct_answer_id']
         })
 
     score = round((correct_answers / total_questions) * 100) if total_questions > 0 else 0
     incorrect_answers = total_questions - correct_answers
 
     return render(request, 'main_app/quiz_result.html', {
-        'course': lesson.course,
-        'lesson': lesson,
-        'quiz': quiz,
+        'course': payload['course'],
+        'lesson': payload['lesson'],
+        'quiz': payload['quiz'],
         'results': results,
         'total_questions': total_questions,
         'correct_answers': correct_answers,
@@ -213,7 +482,6 @@ def practical_task_detail(request, course_slug, lesson_slug):
 
     # Check if practical task exists
     if not hasattr(lesson, 'practicaltask'):
-        from django.http import Http404
         raise Http404("Practical task does not exist for this lesson")
 
     task = lesson.practicaltask
@@ -224,14 +492,28 @@ def practical_task_detail(request, course_slug, lesson_slug):
         'course': lesson.course,
         'lesson': lesson,
         'task': task,
+        'code_snippets': CodeSnippet.for_html(*(getattr(task, field) for field in task.MARKDOWN_FIELDS.values())),
         'pygments_style': pygments_css,
         'is_home_page': False
     })
 
+def _blog_post_stamp(request, slug):
+    post = stamp_row(
+        f'blogpost:{slug}', BlogPost.objects.filter(slug=slug, is_published=True), lambda row: [f'blogpost:{row[0]}'],
+        models=(BlogPost,),
+    )
+    if post is None:
+        return None
+    return (f'blogpost:{post[0]}',), (), post[1]
+
+@conditional_page(_blog_post_stamp)
+@anonymous_page_cache
 def blog_post_detail(request, slug):
     blog_post = get_object_or_404(BlogPost, slug=slug, is_published=True)
+    tag_page(request, f'blogpost:{blog_post.pk}')
     return render(request, 'main_app/blog_post_detail.html', {
         'blog_post': blog_post,
+        'code_snippets': CodeSnippet.for_html(blog_post.content_html),
         'is_home_page': False
     })
 
@@ -242,6 +524,14 @@ def privacy_policy(request):
     })
 
 
+def cache_stats(request):
+    """Cache counters of all workers as JSON, for staff or monitoring with X-Metrics-Token"""
+    token = request.headers.get('X-Metrics-Token', '')
+    expected_token = os.environ.get('CACHE_METRICS_TOKEN', '')
+    if not request.user.is_staff and not (expected_token and token == expected_token):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse(cache_metrics.merged())
+
 def _unique_slug(base_slug, model_class, exclude_id=None):
     slug = base_slug
     counter = 1
@@ -287,85 +577,95 @@ def import_course(request):
         if not course_data.get('title') or not lessons_data:
             return JsonResponse({'error': 'Missing course title or lessons'}, status=400)
 
-        # Create or get tags
-        tags = []
-        for tag_name in course_data.get('tags', []):
-            tag_slug = slugify(tag_name)
-            tag, _ = Tag.objects.get_or_create(
-                slug=tag_slug,
-                defaults={'name': tag_name}
-            )
-            tags.append(tag)
-
-        # Create course as draft (is_active=False)
-        course_slug = _unique_slug(
-            slugify(course_data['title']),
-            Course
-        )
-        course = Course.objects.create(
-            title=course_data['title'],
-            slug=course_slug,
-            short_description=course_data.get('short_description', ''),
-            description=course_data.get('description', ''),
-            icon=course_data.get('icon', 'fas fa-code'),
-            is_active=False,
-        )
-        course.tags.set(tags)
+        with transaction.atomic():
+            # Create or get tags
+            tags = []
+            for tag_name in course_data.get('tags', []):
+                tag_slug = slugify(tag_name)
+                tag, _ = Tag.objects.get_or_create(
+                    slug=tag_slug,
+                    defaults={'name': tag_name}
+                )
+                tags.append(tag)
 
-        # Create lessons with quizzes and tasks
-        for lesson_data in lessons_data:
-            lesson_slug = _unique_slug(
-                slugify(lesson_data.get('title', 'lekcja')),
-                Lesson
+            # Create course as draft (is_active=False)
+            course_slug = _unique_slug(
+                slugify(course_data['title']),
+                Course
             )
-            lesson = Lesson.objects.create(
-                course=course,
-                title=lesson_data['title'],
-                slug=lesson_slug,
-                order=lesson_data.get('order', 0),
-                content_markdown=lesson_data.get('content_markdown', ''),
+            course = Course.objects.create(
+                title=course_data['title'],
+                slug=course_slug,
+                short_description=course_data.get('short_description', ''),
+                description=course_data.get('description', ''),
+                icon=course_data.get('icon', 'fas fa-code'),
+                is_active=False,
             )
-
-            # Create quiz if provided
-            quiz_data = lesson_data.get('quiz')
-            if quiz_data and quiz_data.get('questions'):
-                quiz = Quiz.objects.create(
-                    lesson=lesson,
-                    title=quiz_data.get('title', f'Quiz - {lesson.title}'),
-                    description=quiz_data.get('description', ''),
+            course.tags.set(tags)
+
+            # Create lessons with quizzes and tasks, answers are inserted in one batch
+            new_answers = []
+            for lesson_data in lessons_data:
+                lesson_slug = _unique_slug(
+                    slugify(lesson_data.get('title', 'lekcja')),
+                    Lesson
+                )
+                lesson = Lesson.objects.create(
+                    course=course,
+                    title=lesson_data['title'],
+                    slug=lesson_slug,
+                    order=lesson_data.get('order', 0),
+                    content_markdown=lesson_data.get('content_markdown', ''),
                 )
-                for q_idx, q_data in enumerate(quiz_data['questions']):
-                    question = Question.objects.create(
-                        quiz=quiz,
-                        text=q_data.get('text', ''),
-                        order=q_data.get('order', q_idx),
-                        explanation=q_data.get('explanation', ''),
+
+                # Create quiz if provided
+                quiz_data = lesson_data.get('quiz')
+                if quiz_data and quiz_data.get('questions'):
+                    quiz = Quiz.objects.create(
+                        lesson=lesson,
+                        title=quiz_data.get('title', f'Quiz - {lesson.title}'),
+                        description=quiz_data.get('description', ''),
                     )
-                    for a_idx, a_data in enumerate(q_data.get('answers', [])):
-                        Answer.objects.create(
-                            question=question,
-                            text=a_data.get('text', ''),
-                            is_correct=a_data.get('is_correct', False),
-                            order=a_data.get('order', a_idx),
+                    for q_idx, q_data in enumerate(quiz_data['questions']):
+                        # Renders and sanitizes the question HTML once, on save
+                        question = Question.objects.create(
+                            quiz=quiz,
+                            text=q_data.get('text', ''),
+                            order=q_data.get('order', q_idx),
+                            explanation=q_data.get('explanation', ''),
+                        )
+                        new_answers.extend(
+                            Answer(
+                                question=question,
+                                text=a_data.get('text', ''),
+                                is_correct=a_data.get('is_correct', False),
+                                order=a_data.get('order', a_idx),
+                            )
+                            for a_idx, a_data in enumerate(q_data.get('answers', []))
                         )
 
-            # Create practical task if provided
-            task_data = lesson_data.get('practical_task')
-            if task_data and task_data.get('title'):
-                task_slug = _unique_slug(
-                    slugify(task_data.get('title', 'zadanie')),
-                    PracticalTask
-                )
-                PracticalTask.objects.create(
-                    lesson=lesson,
-                    title=task_data['title'],
-                    slug=task_slug,
-                    content_markdown=task_data.get('content_markdown', ''),
-                    instructions_markdown=task_data.get('instructions_markdown', ''),
-                    example_markdown=task_data.get('example_markdown', ''),
-                    hints_markdown=task_data.get('hints_markdown', ''),
-                    solution_markdown=task_data.get('solution_markdown', ''),
-                )
+                # Create practical task if provided
+                task_data = lesson_data.get('practical_task')
+                if task_data and task_data.get('title'):
+                    task_slug = _unique_slug(
+                        slugify(task_data.get('title', 'zadanie')),
+                        PracticalTask
+                    )
+                    PracticalTask.objects.create(
+                        lesson=lesson,
+                        title=task_data['title'],
+                        slug=task_slug,
+                        content_markdown=task_data.get('content_markdown', ''),
+                        instructions_markdown=task_data.get('instructions_markdown', ''),
+                        example_markdown=task_data.get('example_markdown', ''),
+                        hints_markdown=task_data.get('hints_markdown', ''),
+                        solution_markdown=task_data.get('solution_markdown', ''),
+                    )
+
+            Answer.objects.bulk_create(new_answers)
+            # bulk_create sends no post_save signals
+            caching.bump_generation(Answer)
+            caching.bump_tags(*{f'quiz:{answer.question.quiz_id}' for answer in new_answers})
 
         logger.info(f"Imported draft course: {course.title} (slug: {course.slug})")
 
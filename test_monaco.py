@@ -1,35 +1,25 @@
 #!/usr/bin/env python
 import os
 import django
-import re
-import html
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'szybkie_kursiki.settings')
 django.setup()
 
+from main_app import rendering
 from main_app.models import Lesson
 
 # Test the highlighting function directly
 def test_highlight():
     print("Testing Monaco Editor integration...\n")
 
-    # Create a mock match object for testing
-    class MockMatch:
-        def group(self, n):
-            if n == 1:
-                return "python"
-            elif n == 2:
-                return 'print("Hello World")'
-
     lesson = Lesson.objects.first()
     if not lesson:
         print("No lesson found in database")
         return
 
-    match = MockMatch()
-    result = lesson._highlight_code(match)
+    result = rendering.render_markdown('```python\nprint("Hello World")\n```')
 
-    print("Result from _highlight_code:")
+    print("Result from render_markdown:")
     print(result)
     print()
 